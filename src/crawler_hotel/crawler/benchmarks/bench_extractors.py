@@ -0,0 +1,290 @@
+# benchmarks/bench_extractors.py
+# Benchmark từng hàm của utils/data_extractor.py + utils/review_extractor.py trên corpus benchmarks/fixtures
+# (tạo bằng benchmarks/make_fixtures.py – tự sinh corpus tổng hợp nếu thư mục rỗng).
+#
+# Chạy từ thư mục crawler:
+#   python -m benchmarks.bench_extractors                          → in bảng thời gian + bộ nhớ
+#   python -m benchmarks.bench_extractors --save                   → lưu benchmarks/results/<commit>.json
+#   python -m benchmarks.bench_extractors --compare <commit|file>  → exit 1 nếu hàm nào chậm / tốn RAM hơn ngưỡng
+#   python -m benchmarks.bench_extractors --archive <kho HTML>     → chạy trên trang Booking thật trong kho HTML_ARCHIVE
+#
+# Mặc định là corpus TỔNG HỢP (xem giới hạn ở make_fixtures): dùng để bắt regression giữa các commit;
+# số tuyệt đối chỉ đáng tin khi đo trên kho (--archive). Báo cáo ghi rõ nguồn corpus ("source").
+# Thời gian: median + min của --repeat lần chạy. Bộ nhớ: một lần chạy riêng dưới tracemalloc
+# (peak_kb = đỉnh trong lúc gọi hàm, retained_kb / retained_blocks = phần còn giữ lại sau khi gọi).
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.make_fixtures import (
+    DEFAULT_FIXTURE_DIR, ARCHIVE_FIXTURE_DIR, ensure_fixtures, export_from_archive, corpus_source,
+)
+from utils.html_parser import make_soup, resolve_parser
+from utils.data_extractor import HotelPage
+from utils.review_extractor import extract_reviews_from_page, extract_hotel_name_from_soup
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_THRESHOLD = 0.15   # +15%
+MIN_DELTA_MS = 1.0         # Bỏ qua chênh lệch tuyệt đối nhỏ hơn (nhiễu đo)
+MIN_DELTA_KB = 64
+
+
+def _hotel_field(field):
+    # HotelPage mới mỗi lần → cached_property không che mất chi phí thật
+    return lambda html, soup: getattr(HotelPage.from_soup(soup), field)
+
+
+def _hotel_all(html, soup):
+    page = HotelPage.from_soup(soup)
+    page.hotel_data()
+    return page.evaluation_categories
+
+
+HOTEL_FUNCS = {
+    "parse": lambda html, soup: make_soup(html),
+    "hotel.name": _hotel_field("name"),
+    "hotel.address": _hotel_field("address"),
+    "hotel.description": _hotel_field("description"),
+    "hotel.rating": _hotel_field("rating"),
+    "hotel.number_rating": _hotel_field("number_rating"),
+    "hotel.evaluation_categories": _hotel_field("evaluation_categories"),
+    "hotel.all": _hotel_all,
+}
+
+REVIEW_FUNCS = {
+    "parse": lambda html, soup: make_soup(html),
+    "reviews.extract": lambda html, soup: extract_reviews_from_page(soup),
+    "reviews.hotel_name": lambda html, soup: extract_hotel_name_from_soup(soup),
+}
+
+
+# =============================================================================
+# ĐO
+# =============================================================================
+
+def _time_ms(func, html, soup, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html, soup)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _memory(func, html, soup):
+    """(peak_kb, retained_kb, retained_blocks) của MỘT lần gọi"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = func(html, soup)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    del result
+    return (peak - base) / 1024, max(current - base, 0) / 1024, blocks
+
+
+def _cases(fixture_dir):
+    """{case: {"hotel": path, "reviews": [path, ...]}} theo quy ước tên của make_fixtures"""
+    cases = {}
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.html"))):
+        name = os.path.basename(path)
+        if name.endswith("_hotel.html"):
+            cases.setdefault(name[:-len("_hotel.html")], {"hotel": None, "reviews": []})["hotel"] = path
+        elif name.endswith("_reviews.html"):
+            case = re.sub(r"(_p\d+)?_reviews\.html$", "", name)
+            cases.setdefault(case, {"hotel": None, "reviews": []})["reviews"].append(path)
+    return cases
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _measure_files(paths, funcs, repeat):
+    """Cộng dồn qua mọi file của một case (vd. 12 trang review của khách sạn lớn)"""
+    totals = {}
+    for path in paths:
+        html = _read(path)
+        soup = make_soup(html)
+        for fname, func in funcs.items():
+            samples = _time_ms(func, html, soup, repeat)
+            peak_kb, retained_kb, blocks = _memory(func, html, soup)
+            entry = totals.setdefault(fname, {"median_ms": 0.0, "min_ms": 0.0, "peak_kb": 0.0,
+                                              "retained_kb": 0.0, "retained_blocks": 0, "files": 0})
+            entry["median_ms"] += statistics.median(samples)
+            entry["min_ms"] += min(samples)
+            entry["peak_kb"] = max(entry["peak_kb"], peak_kb)
+            entry["retained_kb"] += retained_kb
+            entry["retained_blocks"] += blocks
+            entry["files"] += 1
+    return totals
+
+
+def corpus_digest(fixture_dir):
+    digest = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.html"))):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def _git_commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                         stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True,
+                                             stderr=subprocess.DEVNULL).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def archive_fixtures(archive_dir, fixture_dir=ARCHIVE_FIXTURE_DIR, per_size=2):
+    """Xuất lại corpus từ kho HTML vào thư mục riêng (xoá bản xuất cũ để không lẫn crawl đã bị thay)"""
+    if os.path.isdir(fixture_dir):
+        shutil.rmtree(fixture_dir)
+    if not export_from_archive(archive_dir, fixture_dir, per_size):
+        raise SystemExit(f"Kho {archive_dir} không có crawl hoàn tất nào để benchmark")
+    return fixture_dir
+
+
+def run(fixture_dir=DEFAULT_FIXTURE_DIR, repeat=7):
+    ensure_fixtures(fixture_dir)
+    commit, dirty = _git_commit()
+    results = {}
+    for case, files in _cases(fixture_dir).items():
+        if files["hotel"]:
+            for fname, entry in _measure_files([files["hotel"]], HOTEL_FUNCS, repeat).items():
+                results[f"{case}/hotel:{fname}"] = entry
+        if files["reviews"]:
+            for fname, entry in _measure_files(files["reviews"], REVIEW_FUNCS, repeat).items():
+                results[f"{case}/reviews:{fname}"] = entry
+    return {
+        "commit": commit, "dirty": dirty, "created": time.time(),
+        "python": platform.python_version(), "parser": resolve_parser(),
+        "corpus": corpus_digest(fixture_dir), "source": corpus_source(fixture_dir),
+        "repeat": repeat, "results": results,
+    }
+
+
+# =============================================================================
+# LƯU + SO SÁNH
+# =============================================================================
+
+def save(report, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    name = report["commit"] + ("-dirty" if report["dirty"] else "")
+    path = os.path.join(results_dir, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load(ref, results_dir=RESULTS_DIR):
+    """ref: đường dẫn file .json hoặc commit đã --save"""
+    path = ref if ref.endswith(".json") else os.path.join(results_dir, f"{ref}.json")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Trả về list regression: (key, metric, base, current, tỉ lệ)"""
+    regressions = []
+    for key, cur in current["results"].items():
+        base = baseline["results"].get(key)
+        if not base:
+            continue
+        # min_ms ổn định hơn median giữa hai lần chạy (ít bị GC / tiến trình khác chen vào)
+        checks = (("min_ms", MIN_DELTA_MS), ("peak_kb", MIN_DELTA_KB))
+        for metric, min_delta in checks:
+            if base[metric] <= 0:
+                continue
+            ratio = cur[metric] / base[metric] - 1
+            if ratio > threshold and cur[metric] - base[metric] > min_delta:
+                regressions.append((key, metric, base[metric], cur[metric], ratio))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    print(f"commit {report['commit']}{' (dirty)' if report['dirty'] else ''} | parser {report['parser']} "
+          f"| corpus {report['corpus']} ({report.get('source', 'synthetic')}) | python {report['python']} "
+          f"| repeat {report['repeat']}")
+    if report.get("source", "synthetic") != "archive":
+        print("LƯU Ý: corpus có trang tổng hợp → chỉ so sánh giữa các commit; số thật: --archive <kho HTML>")
+    header = f"{'case/function':52} {'median ms':>10} {'min ms':>9} {'peak KB':>9} {'kept KB':>9} {'blocks':>8}"
+    if baseline:
+        header += f" {'Δ min':>8} {'Δ peak':>8}"
+    print(header)
+    print("-" * len(header))
+    for key, r in report["results"].items():
+        line = (f"{key[:52]:52} {r['median_ms']:10.2f} {r['min_ms']:9.2f} {r['peak_kb']:9.0f} "
+                f"{r['retained_kb']:9.0f} {r['retained_blocks']:8d}")
+        base = baseline["results"].get(key) if baseline else None
+        if base:
+            line += f" {_pct(r['min_ms'], base['min_ms']):>8} {_pct(r['peak_kb'], base['peak_kb']):>8}"
+        print(line)
+
+
+def _pct(current, base):
+    return f"{(current / base - 1) * 100:+.0f}%" if base else "n/a"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extractor trên corpus HTML đã ghi")
+    parser.add_argument("--fixtures", default=None, help="Thư mục corpus (mặc định benchmarks/fixtures)")
+    parser.add_argument("--archive", metavar="ARCHIVE_DIR",
+                        help="Xuất trang thật từ kho HTML (core/html_archive) rồi benchmark trên đó")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--save", action="store_true", help="Lưu kết quả vào benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", metavar="COMMIT_OR_FILE", help="So với kết quả đã lưu, exit 1 nếu regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Ngưỡng regression (0.15 = +15%%)")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)  # data_extractor log INFO mỗi lần đọc tên khách sạn
+    if args.archive:
+        fixture_dir = archive_fixtures(args.archive, args.fixtures or ARCHIVE_FIXTURE_DIR)
+    else:
+        fixture_dir = args.fixtures or DEFAULT_FIXTURE_DIR
+    report = run(fixture_dir, args.repeat)
+    baseline = load(args.compare) if args.compare else None
+    print_report(report, baseline)
+
+    if args.save:
+        print(f"\nĐã lưu {save(report)}")
+    if baseline is None:
+        return 0
+
+    for field in ("corpus", "parser"):
+        if baseline.get(field) != report[field]:
+            print(f"\nCẢNH BÁO: {field} khác baseline ({baseline.get(field)} → {report[field]}), so sánh có thể không công bằng")
+    regressions = compare(baseline, report, args.threshold)
+    if not regressions:
+        print(f"\nOK: không có regression > {args.threshold:.0%} so với {baseline['commit']}")
+        return 0
+    print(f"\nREGRESSION so với {baseline['commit']} (ngưỡng {args.threshold:.0%}):")
+    for key, metric, base, cur, ratio in regressions:
+        print(f"   {key:52} {metric:10} {base:10.2f} → {cur:10.2f} ({ratio:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
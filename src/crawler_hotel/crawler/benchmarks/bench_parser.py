@@ -0,0 +1,65 @@
+# benchmarks/bench_parser.py
+# So sánh thời gian parse + extract mỗi trang cho từng backend parser trên các trang HTML đã ghi lại.
+# Chạy từ thư mục crawler:  python -m benchmarks.bench_parser [thư_mục_fixtures] [số_lần_lặp]
+#   (mặc định benchmarks/fixtures – corpus của benchmarks/make_fixtures.py)
+#   - *_hotel.html  : trang khách sạn → HotelPage (mọi field + evaluation_categories)
+#   - *_reviews.html: trang/fragment review → extract_reviews_from_page
+
+import os
+import sys
+import time
+
+from benchmarks.make_fixtures import DEFAULT_FIXTURE_DIR, ensure_fixtures
+from utils.html_parser import available_backends, make_soup
+from utils.data_extractor import HotelPage
+from utils.review_extractor import extract_reviews_from_page
+
+
+def _best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_page(path, backend, repeat):
+    """Trả về (parse_ms, extract_ms) của một file cho một backend"""
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+
+    parse = _best_of(lambda: make_soup(html, backend), repeat)
+    soup = make_soup(html, backend)
+    if path.endswith("_reviews.html"):
+        extract = _best_of(lambda: extract_reviews_from_page(soup), repeat)
+    else:
+        def run():
+            page = HotelPage.from_soup(soup)  # Page mới mỗi lần → không dính cache của lần trước
+            page.hotel_data()
+            page.evaluation_categories
+        extract = _best_of(run, repeat)
+    return parse * 1000, extract * 1000
+
+
+def main(fixture_dir=DEFAULT_FIXTURE_DIR, repeat=3):
+    if fixture_dir == DEFAULT_FIXTURE_DIR:
+        ensure_fixtures(fixture_dir)
+    files = sorted(os.path.join(fixture_dir, f) for f in os.listdir(fixture_dir) if f.endswith(".html"))
+    if not files:
+        print(f"Không có file .html trong {fixture_dir}")
+        return
+
+    backends = available_backends()
+    print(f"{'file':40} {'backend':12} {'KB':>7} {'parse ms':>10} {'extract ms':>11}")
+    print("-" * 84)
+    for path in files:
+        size_kb = os.path.getsize(path) / 1024
+        for backend in backends:
+            parse_ms, extract_ms = bench_page(path, backend, repeat)
+            print(f"{os.path.basename(path)[:40]:40} {backend:12} {size_kb:7.0f} {parse_ms:10.1f} {extract_ms:11.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FIXTURE_DIR,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,208 @@
+# benchmarks/make_fixtures.py
+# Tạo corpus HTML cho benchmark extractor: trang khách sạn + các trang review, theo quy ước tên
+#   <case>_hotel.html, <case>_pNN_reviews.html   (giống bench_parser: *_hotel.html / *_reviews.html)
+#
+# Hai nguồn:
+#   python -m benchmarks.make_fixtures [thư_mục]                 → corpus tổng hợp, cố định theo seed
+#   python -m benchmarks.make_fixtures [thư_mục] --from-archive <kho HTML_ARCHIVE>
+#                                                                 → trang Booking thật đã ghi bởi core/html_archive
+#                                                                   (mặc định vào benchmarks/fixtures_archive)
+#
+# Corpus tổng hợp dùng đúng selector mà utils/data_extractor.py và utils/review_extractor.py đọc,
+# gồm khách sạn nhỏ / vừa / rất lớn và cả header mới (data-capla-component-boundary) lẫn cũ (hp_hotel_name).
+# GIỚI HẠN: trang tổng hợp nhỏ và "sạch" hơn trang Booking thật (ít script / markup thừa, không có biến thể layout lạ)
+# → số đo chỉ dùng để so GIỮA các commit, không phản ánh thời gian parse thật. Cần số thật: chạy trên kho HTML
+# (python -m benchmarks.bench_extractors --archive <kho>, ghi vào ARCHIVE_FIXTURE_DIR, không lẫn corpus tổng hợp).
+
+import os
+import random
+import shutil
+import sys
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ARCHIVE_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures_archive")
+ARCHIVE_CASE_PREFIX = "rec-"
+SEED = 2025
+
+# case → (layout header, số trang review, hệ số độ lớn trang khách sạn)
+CASES = {
+    "small-new": ("new", 1, 1),
+    "small-old": ("old", 1, 1),
+    "medium-new": ("new", 4, 4),
+    "medium-old": ("old", 4, 4),
+    "huge-new": ("new", 12, 24),
+}
+REVIEWS_PER_PAGE = 10
+
+_CATEGORIES = ["Nhân viên phục vụ", "Tiện nghi", "Sạch sẽ", "Thoải mái", "Đáng giá tiền", "Địa điểm", "WiFi miễn phí"]
+_WORDS = ("phòng sạch sẽ nhân viên thân thiện vị trí thuận tiện bữa sáng ngon hồ bơi rộng view biển đẹp "
+          "giá hợp lý gần chợ đêm yên tĩnh giường êm máy lạnh hơi ồn thang máy chậm wifi yếu").split()
+_NAMES = ["Minh", "Lan", "Hùng", "Trang", "Quân", "Hoa", "Tuấn", "Linh", "Nam", "Thảo"]
+_ROOMS = ["Phòng Deluxe Giường Đôi", "Phòng Superior 2 Giường Đơn", "Suite Nhìn Ra Biển", "Phòng Gia Đình"]
+_TRAVELERS = ["Cặp đôi", "Gia đình", "Khách lẻ", "Nhóm"]
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _score(rng, low, high):
+    """Điểm kiểu Booking VN: '8,6'"""
+    return f"{rng.randint(low, high) / 10:.1f}".replace(".", ",")
+
+
+def _noise(rng, blocks):
+    """DOM 'nặng' như trang thật: danh sách tiện nghi, bảng phòng, JSON nhúng trong script"""
+    parts = []
+    for i in range(blocks):
+        items = "".join(f'<li class="a5a5a75131"><span class="db29ecfbe2">{_sentence(rng, 4)}</span></li>'
+                        for _ in range(25))
+        parts.append(f'<div class="e50d7535fa" data-testid="facility-group-{i}"><ul class="c807d72881">{items}</ul></div>')
+        rows = "".join(f'<tr class="js-rt-block-row"><td class="hprt-table-cell">{rng.choice(_ROOMS)}</td>'
+                       f'<td><span class="prco-valign-middle-helper">VND {rng.randint(5, 90) * 100_000:,}</span></td></tr>'
+                       for _ in range(15))
+        parts.append(f'<table class="hprt-table"><tbody>{rows}</tbody></table>')
+        parts.append(f'<script type="application/json">{{"b_blocks":[{",".join(str(rng.random()) for _ in range(300))}]}}</script>')
+    return "\n".join(parts)
+
+
+def hotel_page(rng, name, layout, scale, total_reviews):
+    if layout == "new":
+        header = ('<div data-capla-component-boundary="b-property-web-property-page/PropertyHeaderName">'
+                  f'<h2 class="d2fee87262 pp-header__title">{name}</h2></div>')
+    else:
+        header = f'<div id="hp_hotel_name" class="hp__hotel-name-wrapper"><h2 class="d2fee87262 pp-header__title">{name}</h2></div>'
+    subscores = "".join(
+        '<div data-testid="review-subscore"><div class="a0fe5d9a3e">'
+        f'<span class="be887614c2 d96a4619c0">{category}</span>'
+        f'<div class="ccb65902b2 bdc1ea4a28 f87e152973">{_score(rng, 70, 99)}</div>'
+        '</div></div>'
+        for category in _CATEGORIES
+    )
+    description = "\n".join(f"<br>{_sentence(rng, 20)}" for _ in range(6 * scale))
+    return f"""<!DOCTYPE html><html lang="vi"><head><meta charset="utf-8"><title>{name} – Booking.com</title></head>
+<body><div id="bodyconstraint">
+{header}
+<div class="b99b6ef58f cb4b7a25d9 b06461926f">{rng.randint(1, 300)} Trần Phú, Lộc Thọ, Nha Trang, Việt Nam  Vị trí xuất sắc – hiển thị bản đồ</div>
+<p data-testid="property-description">{description}</p>
+<div data-testid="review-score-component" class="a3b8729ab1">
+  <div class="a3b8729ab1 dff2e52086">Đạt điểm {_score(rng, 70, 96)}</div>
+  <div class="abf093bdfe"><span class="a3332d346a eaa8455879">{total_reviews:,} đánh giá</span></div>
+</div>
+{subscores}
+{_noise(rng, 4 * scale)}
+</div></body></html>
+"""
+
+
+def review_card(rng):
+    day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(2022, 2025)
+    score = _score(rng, 50, 100)
+    negative = f'<div data-testid="review-negative-text">{_sentence(rng, rng.randint(3, 25))}</div>' if rng.random() < 0.6 else ""
+    return f"""<div data-testid="review-card" class="d799cd346c"><div class="c402485c8b">
+  <div class="e1f827110f"><div data-testid="review-avatar"><img role="presentation" src="https://cf.bstatic.com/static/img/avatar/{rng.randint(1, 999)}.png"></div>
+    <div class="b08850ce41 f546354b44">{rng.choice(_NAMES)} {rng.choice("ABCDEGHKLMNPT")}.</div>
+    <span class="d838fb5f41 aea5eccb71">Việt Nam</span></div>
+  <div data-testid="review-stay-info">
+    <span data-testid="review-room-name">{rng.choice(_ROOMS)}</span>
+    <span data-testid="review-num-nights">{rng.randint(1, 7)} đêm</span>
+    <span data-testid="review-stay-date">tháng {month}/{year}</span>
+    <span data-testid="review-traveler-type">{rng.choice(_TRAVELERS)}</span>
+  </div>
+  <div role="group" aria-label="Nội dung đánh giá">
+    <span data-testid="review-date">Đánh giá ngày {day} tháng {month} {year}</span>
+    <h4 data-testid="review-title">{_sentence(rng, 3)}</h4>
+    <div data-testid="review-score"><div class="ac4a7896c7">Đạt điểm {score}</div><div aria-hidden="true">{score}</div></div>
+    <div data-testid="review-positive-text">{_sentence(rng, rng.randint(5, 60))}</div>
+    {negative}
+  </div>
+</div></div>"""
+
+
+def review_page(rng, name, page):
+    cards = "\n".join(review_card(rng) for _ in range(REVIEWS_PER_PAGE))
+    return f"""<!DOCTYPE html><html lang="vi"><head><meta charset="utf-8"></head><body>
+<h2 id=":r1b:-title">Đánh giá của khách về {name} – trang {page}</h2>
+<div data-testid="review-list">{cards}</div>
+<div class="a6dd3ac8a7"><button aria-label="Trang sau" type="button"></button><span aria-current="page">{page}</span></div>
+</body></html>
+"""
+
+
+def generate(fixture_dir=DEFAULT_FIXTURE_DIR, seed=SEED):
+    """Ghi corpus tổng hợp. Cùng seed → cùng nội dung (so sánh giữa các commit là công bằng)"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    rng = random.Random(seed)
+    written = []
+    for case, (layout, review_pages, scale) in CASES.items():
+        name = f"Khách sạn {case.replace('-', ' ').title()} Nha Trang"
+        files = {f"{case}_hotel.html": hotel_page(rng, name, layout, scale, review_pages * REVIEWS_PER_PAGE)}
+        for page in range(1, review_pages + 1):
+            files[f"{case}_p{page:02d}_reviews.html"] = review_page(rng, name, page)
+        for filename, html in files.items():
+            with open(os.path.join(fixture_dir, filename), "w", encoding="utf-8") as f:
+                f.write(html)
+            written.append(filename)
+    return written
+
+
+def export_from_archive(archive_dir, fixture_dir=DEFAULT_FIXTURE_DIR, per_size=2):
+    """
+    Chép trang thật từ kho HTML (core/html_archive): chọn `per_size` khách sạn nhỏ / vừa / lớn nhất
+    theo số trang review đã ghi.
+    """
+    from core.html_archive import latest_crawls, read_record
+
+    crawls = sorted(latest_crawls(archive_dir).values(), key=lambda c: len(c["reviews"]))
+    if not crawls:
+        return []
+    middle = len(crawls) // 2
+    picked = {
+        "small": crawls[:per_size],
+        "medium": crawls[max(middle - per_size // 2, 0):][:per_size],
+        "huge": crawls[-per_size:],
+    }
+    os.makedirs(fixture_dir, exist_ok=True)
+    written = []
+    for size, group in picked.items():
+        for i, crawl in enumerate(group, 1):
+            case = f"{ARCHIVE_CASE_PREFIX}{size}{i}"
+            files = {f"{case}_hotel.html": read_record(*crawl["hotel"])}
+            entries = sorted(crawl["reviews"], key=lambda item: (item[1]["page"] or 0, item[1]["fetched_at"]))
+            for page, (day_dir, entry) in enumerate(entries, 1):
+                files[f"{case}_p{page:02d}_reviews.html"] = read_record(day_dir, entry)
+            for filename, html in files.items():
+                with open(os.path.join(fixture_dir, filename), "w", encoding="utf-8") as f:
+                    f.write(html)
+                written.append(filename)
+    return written
+
+
+def corpus_source(fixture_dir):
+    """"synthetic" / "archive" / "mixed" theo tên file (trang từ kho HTML có tiền tố ARCHIVE_CASE_PREFIX)"""
+    names = [f for f in os.listdir(fixture_dir) if f.endswith(".html")] if os.path.isdir(fixture_dir) else []
+    recorded = sum(f.startswith(ARCHIVE_CASE_PREFIX) for f in names)
+    if recorded == 0:
+        return "synthetic"
+    return "archive" if recorded == len(names) else "mixed"
+
+
+def ensure_fixtures(fixture_dir=DEFAULT_FIXTURE_DIR):
+    """Tạo corpus tổng hợp nếu thư mục chưa có file .html nào"""
+    if not os.path.isdir(fixture_dir) or not any(f.endswith(".html") for f in os.listdir(fixture_dir)):
+        generate(fixture_dir)
+    return fixture_dir
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    from_archive = "--from-archive" in args
+    default_dir = ARCHIVE_FIXTURE_DIR if from_archive else DEFAULT_FIXTURE_DIR
+    target = args[0] if args and not args[0].startswith("--") else default_dir
+    if from_archive:
+        files = export_from_archive(args[args.index("--from-archive") + 1], target)
+    else:
+        if "--clean" in args and os.path.isdir(target):
+            shutil.rmtree(target)
+        files = generate(target)
+    print(f"Đã ghi {len(files)} file vào {target}")
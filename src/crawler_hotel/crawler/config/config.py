@@ -19,6 +19,12 @@ CRAWLER_AGAIN_ROOT_DIR = r"D:\private\crawler-booking-2025\src\crawler_hotel\cra
 TIMEOUT_ERROR_DIR_ROOT = r"D:\private\crawler-booking-2025\src\crawler_hotel\crawler\output_error_link"
 HOTEL_LINKS_DIR = r"D:\private\crawler-booking-2025\src\data_final"
 SUCCESS_JSON_DIR = ROOT_DIR  # data_final chính là nơi chứa success JSON theo tỉnh
+CRAWL_FRONTIER_DB = r"D:\private\crawler-booking-2025\src\crawler_hotel\crawler\frontier\frontier.db"
+HTML_ARCHIVE_DIR = r"D:\private\crawler-booking-2025\src\crawler_hotel\crawler\html_archive"
+REVIEW_CHECKPOINT_DIR = r"D:\private\crawler-booking-2025\src\crawler_hotel\crawler\review_checkpoints"
+PARQUET_DATASET_DIR = r"D:\private\crawler-booking-2025\src\crawler_hotel\parquet_dataset"
+SESSION_CACHE_DIR = r"D:\private\crawler-booking-2025\src\crawler_hotel\crawler\session_cache"
+DEAD_LETTER_DIR = r"D:\private\crawler-booking-2025\src\crawler_hotel\crawler\dead_letter"
 
 os.makedirs(ERROR_LINK_DIR, exist_ok=True)
 
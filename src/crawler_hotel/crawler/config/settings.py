@@ -8,11 +8,147 @@ BASE_INPUT_DIR_MODE2 = r"D:\private\crawler-booking-2025\src\crawler_province\ho
 OUTPUT_DIR_MODE1 = "data_range_province"
 OUTPUT_DIR_MODE2 = "data_one_provnce"
 
+OUTPUT_DIR = OUTPUT_DIR_MODE1  # Mặc định cho crawler_process/* (parallel_by_url, province_worker)
+
 LOGS_DIR = "logs"
 
 # Cấu hình chạy
 MAX_WORKERS = 1
 MAX_RUNTIME_MINUTES = None  # None = không giới hạn
 
+# Trình duyệt Edge của crawler_process/* (utils/driver_utils.create_driver)
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+HEADLESS = False
+IMPLICIT_WAIT = 5
+SCREEN_WIDTH = 1920   # Màn hình được chia lưới cho cửa sổ của các worker
+SCREEN_HEIGHT = 1080
+
+# Pool driver dùng chung cho mọi range / tỉnh (mode 1)
+USE_DRIVER_POOL = True
+DRIVER_RECYCLE_PAGES = 300  # Khởi động lại phiên Edge sau N trang khách sạn (None = không bao giờ)
+DRIVER_RECYCLE_RSS_MB = 1500  # ... hoặc khi RSS cả cây process Edge vượt N MB (cần psutil, None = tắt)
+DRIVER_RECYCLE_KEEP_COOKIES = True  # Chuyển cookie sang phiên mới → bỏ qua warm-up trang chủ
+
+# Cache cookie + ngôn ngữ theo worker (config.SESSION_CACHE_DIR): phiên mới nạp cookie thay vì warm-up trang chủ,
+# chỉ warm-up lại khi trang cho thấy phiên hết hạn
+SESSION_CACHE = True
+SESSION_CACHE_MAX_AGE_HOURS = 24  # Cookie cache cũ hơn → warm-up lại (None = chỉ theo hạn của từng cookie)
+
 # Tạo thư mục logs
-os.makedirs(LOGS_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(LOGS_DIR, exist_ok=True)
+
+# Backend lấy review: "selenium" (click "Trang sau") hoặc "http" (fragment reviewlist qua requests)
+REVIEW_FETCH_BACKEND = "selenium"
+REVIEW_LIST_URL = "https://www.booking.com/reviewlist.vi.html"  # Đổi sang server local để test
+REVIEW_LIST_PARAMS = {"cc1": "vn", "type": "total", "sort": "f_recent_desc", "lang": "vi", "r_lang": "vi"}
+REVIEW_HTTP_ROWS = 10
+REVIEW_HTTP_TIMEOUT = 15
+REVIEW_HTTP_POOL_SIZE = 10
+
+# Engine crawl: "selenium" (BookingCrawler, 1 trình duyệt / worker) hoặc "async" (asyncio + aiohttp, không trình duyệt)
+CRAWL_ENGINE = "selenium"
+ASYNC_MAX_CONNECTIONS = 40   # Tổng số request đồng thời (pool kết nối dùng chung)
+ASYNC_PER_HOST_LIMIT = 20    # Semaphore cho mỗi host
+ASYNC_HOTEL_CONCURRENCY = 10 # Số khách sạn xử lý song song
+ASYNC_REVIEW_PAGE_BATCH = 4  # Số trang review tải song song mỗi lô (sau trang 1), dừng ở lô có trang rỗng
+
+# Parser HTML cho mọi extractor: "auto" (lxml nếu đã cài, không thì html.parser), "lxml" hoặc "html.parser"
+HTML_PARSER = "auto"
+
+# Crawl incremental: đọc JSON đã lưu trong SUCCESS_JSON_DIR, dừng phân trang ở trang toàn review cũ
+# rồi gộp review mới vào chính file đó
+INCREMENTAL_REVIEWS = False
+
+# Xếp lịch theo chi phí ước lượng (utils/crawl_cost): khách sạn nhiều review chạy trước (longest-job-first)
+SCHEDULE_BY_COST = True
+SCHEDULE_DEFAULT_REVIEWS = 30  # Số review giả định khi chưa có JSON cũ / số liệu từ trang tìm kiếm
+
+# Pre-flight (utils/preflight): GET thuần mọi URL trong hàng đợi trước khi mở trình duyệt → loại khách sạn đã gỡ / bị chuyển hướng
+# Lượt chặn trước crawl: ≈ số URL / PREFLIGHT_RPS giây (10.000 URL ≈ 40 phút ở 4 req/s) → bật khi danh sách link đã cũ
+PREFLIGHT = False
+PREFLIGHT_WORKERS = 8          # Số luồng HTTP đồng thời
+PREFLIGHT_RPS = 4.0            # Token bucket RIÊNG của preflight (không giảm rate / mở breaker của crawl)
+PREFLIGHT_BURST = 8
+PREFLIGHT_TIMEOUT = 10
+PREFLIGHT_SKIP_NO_SCORE = False  # True → bỏ cả trang khách sạn (HTTP 200) không có review-score-component
+PREFLIGHT_BASE_URL = None      # Đổi sang server local để test, ví dụ "http://127.0.0.1:8766"
+
+# Frontier SQLite (config.CRAWL_FRONTIER_DB): worker lease URL từ DB thay cho hàng đợi trong RAM (mode 1 + pool)
+USE_FRONTIER = False
+FRONTIER_LEASE_SECONDS = 900  # URL in-flight quá hạn lease (worker chết) → được lease lại
+
+# Coordinator (core/coordinator): một máy giữ frontier và phát URL qua HTTP, worker node ở nhiều máy (main_worker_node.py)
+COORDINATOR_HOST = "0.0.0.0"
+COORDINATOR_PORT = 8775  # 8765 là cổng mặc định của serve_recorded_fragments (utils/review_http)
+COORDINATOR_URL = "http://127.0.0.1:8775"  # Địa chỉ coordinator mà worker node kết nối tới
+COORDINATOR_POLL_SECONDS = 10  # Hết URL pending nhưng máy khác còn in-flight → chờ rồi hỏi lại (lease hết hạn được trả về)
+
+# Checkpoint phân trang review (config.REVIEW_CHECKPOINT_DIR): ghi mỗi N trang + khi timeout / dừng. 0 = tắt
+REVIEW_CHECKPOINT_EVERY = 5
+
+# Chờ theo tín hiệu DOM (thay cho sleep cố định) trong phân trang / bộ lọc review
+REVIEW_PAGE_TIMEOUT = 10    # Chờ review card đầu tiên đổi sau khi bấm "Trang sau"
+REVIEW_FILTER_TIMEOUT = 5   # Chờ danh sách review đổi sau khi chọn ngôn ngữ / sắp xếp
+# Delay lịch sự giữa 2 request tới booking.com – CHỈ áp dụng qua utils/rate_limiter
+# Token bucket dùng chung cho mọi worker process (Manager)
+RATE_LIMIT_RPS = 1.0         # Ngân sách request/giây toàn cục
+RATE_LIMIT_BURST = 3         # Số request được bắn liền nhau
+RATE_LIMIT_MIN_RPS = 0.1     # Sàn khi bị giảm tốc
+RATE_LIMIT_BACKOFF = 0.5     # Nhân rate khi gặp timeout / 429 / captcha
+RATE_LIMIT_RECOVER = 0.02    # Cộng lại rate sau mỗi request thành công
+POLITENESS_JITTER = 0.3      # Jitter ngẫu nhiên thêm sau mỗi token
+# Circuit breaker trên cùng bucket: tỉ lệ lỗi trong cửa sổ vượt ngưỡng → mọi worker tạm dừng
+BREAKER_WINDOW_SECONDS = 120  # Cửa sổ đếm request
+BREAKER_MIN_REQUESTS = 10     # Ít request hơn thì không xét (tránh ngắt vì 1–2 lỗi đầu)
+BREAKER_FAILURE_RATE = 0.5    # Tỉ lệ timeout / 429 / captcha để ngắt mạch
+BREAKER_OPEN_SECONDS = 180    # Thời gian ngắt (0 = tắt breaker), sau đó chạy lại từ RATE_LIMIT_MIN_RPS
+
+# Chính sách retry theo loại lỗi (utils/retry_policy): retries = số lần thử lại,
+# chờ ngẫu nhiên trong [base, min(cap, base * 2^(lần thử - 1))]. Hết lượt → dead-letter (config.DEAD_LETTER_DIR)
+RETRY_POLICY = {
+    "timeout":      {"retries": 3, "base": 4.0, "cap": 30.0},     # Tải trang / mạng quá hạn → giảm rate chung
+    "element_timeout": {"retries": 1, "base": 2.0, "cap": 4.0},   # Trang đã tải nhưng thiếu phần tử chờ (không giảm rate)
+    "captcha":      {"retries": 2, "base": 30.0, "cap": 120.0},  # Breaker + refresh phiên làm phần lớn việc
+    "removed":      {"retries": 0},                              # Trang đã gỡ / chuyển về kết quả tìm kiếm
+    "parse_error":  {"retries": 1, "base": 2.0, "cap": 2.0},
+    "driver_crash": {"retries": 2, "base": 2.0, "cap": 10.0},    # Khởi động lại phiên Edge trước khi thử lại
+    "unknown":      {"retries": 1, "base": 4.0, "cap": 8.0},
+}
+
+# Chặn tài nguyên không cần thiết trong trình duyệt crawl (CDP Network.setBlockedURLs)
+RESOURCE_BLOCK_PROFILE = "text_only"  # Tên profile trong RESOURCE_BLOCK_PROFILES ("none" = không chặn)
+RESOURCE_BLOCK_STATS = False          # Đếm request bị chặn + ước lượng byte tiết kiệm (đọc performance log)
+RESOURCE_BLOCK_PROFILES = {
+    "none": [],
+    # Chỉ ảnh + font + media: an toàn nhất
+    "no_media": [
+        "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico", "*.ico?*",
+        "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+        "*.mp4*", "*.webm*",
+    ],
+    # no_media + bản đồ + tracker / quảng cáo bên thứ ba (script của booking.com / bstatic.com vẫn được tải)
+    "text_only": [
+        "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico", "*.ico?*",
+        "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+        "*.mp4*", "*.webm*",
+        "*maps.googleapis.com*", "*maps.gstatic.com*", "*api.mapbox.com*",
+        "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+        "*googleadservices.com*", "*facebook.net*", "*connect.facebook.com*",
+        "*hotjar.com*", "*bat.bing.com*", "*criteo.*", "*tiktok.com*", "*clarity.ms*",
+    ],
+}
+
+# Lưu HTML thô mọi trang đã tải vào config.HTML_ARCHIVE_DIR (replay: python -m core.html_archive <kho> <output>)
+HTML_ARCHIVE = False
+
+# Định dạng output mỗi khách sạn: "json" (1 file JSON / khách sạn), "parquet" (dataset config.PARQUET_DATASET_DIR) hoặc "both"
+# Lưu ý: kiểm tra hợp lệ / crawl lại theo thư mục JSON cần "json" hoặc "both"
+OUTPUT_FORMAT = "json"
+PARQUET_ROW_GROUP_ROWS = 50_000   # Số review buffer trong RAM trước khi flush ra file Parquet
+PARQUET_COMPRESSION = "zstd"
+
+# Telemetry: histogram thời gian từng giai đoạn + bộ đếm, gộp mọi worker → <TELEMETRY_DIR>/<run>/metrics.json, metrics.prom
+TELEMETRY = True
+TELEMETRY_DIR = os.path.join(LOGS_DIR, "telemetry")
+TELEMETRY_FLUSH_SECONDS = 15   # Worker ghi snapshot tối đa mỗi N giây
+TELEMETRY_HTTP_PORT = None     # Ví dụ 9108 → http://127.0.0.1:9108/metrics trong lúc chạy
@@ -0,0 +1,240 @@
+# core/async_engine.py
+# Engine crawl bất đồng bộ: asyncio + aiohttp, KHÔNG dùng trình duyệt.
+# Trang khách sạn và các trang reviewlist được tải song song qua một pool kết nối chung,
+# mỗi host bị giới hạn bởi một semaphore riêng. Kết quả ghi đúng schema JSON của BookingCrawler._save_hotel.
+
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+from config.config import ERROR_LINK_DIR
+from config.settings import (
+    ASYNC_MAX_CONNECTIONS, ASYNC_PER_HOST_LIMIT, ASYNC_HOTEL_CONCURRENCY, ASYNC_REVIEW_PAGE_BATCH,
+    REVIEW_LIST_URL, REVIEW_LIST_PARAMS, REVIEW_HTTP_ROWS, REVIEW_HTTP_TIMEOUT,
+    INCREMENTAL_REVIEWS,
+)
+from utils.data_extractor import HotelPage
+from utils.review_extractor import extract_review_page, split_new_reviews
+from utils.incremental import stored_hotel_path, load_stored_hotel, seen_fingerprints, merge_reviews
+from utils.html_parser import make_soup
+from utils.review_http import USER_AGENT, hotel_pagename
+from utils.file_utils import hotel_json_path
+from core.html_archive import begin_crawl, archive_page, complete_crawl, KIND_HOTEL, KIND_REVIEWS
+from core.parquet_sink import write_hotel, writes_json, flush_parquet_sink
+from utils.rate_limiter import throttle, report_throttled, report_ok, is_blocked_response
+from utils.telemetry import timed, incr, observe
+
+
+def _extract_hotel_page(html):
+    """Parse một lần và đọc mọi field trong cùng thread executor"""
+    page = HotelPage(html)
+    return page.hotel_data(), page.evaluation_categories
+
+
+def _timed_parse(func, html):
+    with timed("parse"):
+        return func(html)
+
+
+def _archive_hotel_page(full_url, province_name, html):
+    begin_crawl(full_url, province_name)
+    archive_page(KIND_HOTEL, full_url, html)
+
+
+def _load_stored(province_name, url):
+    stored_path = stored_hotel_path(province_name, url) if INCREMENTAL_REVIEWS else None
+    return stored_path, (load_stored_hotel(stored_path) if stored_path else None)
+
+
+def _write_output(province_name, full_url, hotel_data, new_reviews, filename, complete):
+    """Ghi DB + JSON + dòng done của kho HTML; chạy trong thread executor"""
+    with timed("save"):
+        write_hotel(province_name, full_url, hotel_data, new_reviews)
+        if writes_json():
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(hotel_data, f, ensure_ascii=False, indent=4)
+    if complete:
+        complete_crawl(full_url)
+
+
+class AsyncBookingEngine:
+    """Crawl nhiều khách sạn cùng lúc trên một event loop"""
+
+    def __init__(self, stop_event=None, max_connections=ASYNC_MAX_CONNECTIONS,
+                 per_host_limit=ASYNC_PER_HOST_LIMIT, hotel_concurrency=ASYNC_HOTEL_CONCURRENCY,
+                 list_url=REVIEW_LIST_URL, rows=REVIEW_HTTP_ROWS, timeout=REVIEW_HTTP_TIMEOUT,
+                 review_batch=ASYNC_REVIEW_PAGE_BATCH):
+        self.stop_event = stop_event
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.hotel_concurrency = hotel_concurrency
+        self.list_url = list_url
+        self.rows = rows
+        self.review_batch = review_batch
+        self.timeout = timeout
+        self.session = None
+        self._host_semaphores = {}
+        self.logger = logging.getLogger("AsyncEngine")
+
+    def _stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def fetch_text(self, url, params=None):
+        async with self._host_semaphore(url):
+            # Bucket dùng chung là blocking → chờ token trong thread executor, không chặn event loop
+            await asyncio.get_running_loop().run_in_executor(None, throttle, self.stop_event)
+            start = time.perf_counter()
+            try:
+                async with self.session.get(url, params=params) as resp:
+                    text = await resp.text()
+                    observe("page_load" if params is None else "review_page_http", time.perf_counter() - start)
+                    if is_blocked_response(resp.status, text):
+                        report_throttled(f"HTTP {resp.status}")
+                    else:
+                        report_ok()
+                    resp.raise_for_status()
+                    return text
+            except asyncio.TimeoutError:
+                report_throttled("HTTP timeout")
+                raise
+
+    async def _parse(self, func, html):
+        """Parse HTML ngoài event loop để không chặn các request đang chờ"""
+        return await self._blocking(_timed_parse, func, html)
+
+    async def _blocking(self, func, *args):
+        """Ghi file / DB / kho HTML trong thread executor: một lần lưu không làm đứng mọi request đang bay"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def fetch_review_page(self, hotel_url, offset):
+        """(reviews, số review-card trong fragment)"""
+        params = dict(REVIEW_LIST_PARAMS)
+        params.update({"pagename": hotel_pagename(hotel_url), "offset": offset, "rows": self.rows})
+        html = await self.fetch_text(self.list_url, params=params)
+        await self._blocking(archive_page, KIND_REVIEWS, self.list_url, html, hotel_url, offset // self.rows + 1)
+        return await self._parse(lambda h: extract_review_page(make_soup(h)), html)
+
+    async def crawl_reviews(self, hotel_url, total_rating=None, seen=None):
+        """
+        Trang 1 trước, sau đó từng lô `review_batch` offset song song (mỗi trang tiến `rows`),
+        dừng ở trang đầu tiên không còn review-card nào, hoặc (incremental với `seen`, tải tuần tự)
+        một trang chỉ toàn review đã lưu.
+        total_rating đếm review MỌI ngôn ngữ còn reviewlist lọc r_lang=vi → chỉ dùng làm cận trên của offset.
+        """
+        limit = int(total_rating) if isinstance(total_rating, str) and total_rating.isdigit() else None
+        reviews = []
+        offset = 0
+        batch = 1
+        while not self._stopped():
+            offsets = [offset + i * self.rows for i in range(batch)]
+            if limit is not None:
+                offsets = [o for o in offsets if o < limit]
+            if not offsets:
+                break
+            pages = await asyncio.gather(*(self.fetch_review_page(hotel_url, o) for o in offsets))
+            finished = False
+            for page_reviews, cards in pages:
+                if not cards:
+                    finished = True
+                    break
+                fresh, page_all_seen = split_new_reviews(page_reviews, seen)
+                reviews.extend(fresh)
+                if page_all_seen:
+                    finished = True
+                    break
+            if finished:
+                break
+            offset += len(offsets) * self.rows
+            batch = 1 if seen is not None else self.review_batch
+        return reviews
+
+    async def crawl_hotel(self, url, province_name, output_dir):
+        full_url = url + "?lang=vi"
+        html = await self.fetch_text(full_url)
+        await self._blocking(_archive_hotel_page, full_url, province_name.strip(), html)
+        (name, address, description, rating, number_rating), evaluation_categories = \
+            await self._parse(_extract_hotel_page, html)
+        stored_path, stored = await self._blocking(_load_stored, province_name.strip(), url)
+        reviews = await self.crawl_reviews(full_url, number_rating, seen_fingerprints(stored) if stored else None)
+        new_reviews = reviews
+        if stored:
+            reviews = merge_reviews(reviews, stored.get("reviews"))
+
+        hotel_data = {
+            "name": name,
+            "address": address,
+            "description": description,
+            "rating": rating,
+            "total_rating": number_rating,
+            "evaluation_categories": evaluation_categories,
+            "reviews": reviews,
+        }
+
+        filename = stored_path if stored else hotel_json_path(output_dir, province_name.strip(), full_url)
+        await self._blocking(_write_output, province_name.strip(), full_url, hotel_data, new_reviews,
+                             filename, not stored)
+        incr("hotels_ok")
+        incr("reviews_saved", len(new_reviews))
+        self.logger.info(f"Saved: {name} ({len(reviews)} reviews)")
+
+    def _save_failed_url_only(self, url, province_name):
+        error_province_dir = os.path.join(ERROR_LINK_DIR, province_name.strip())
+        os.makedirs(error_province_dir, exist_ok=True)
+        with open(os.path.join(error_province_dir, "link.txt"), "a", encoding="utf-8") as f:
+            f.write(url.strip() + "\n")
+        self.logger.warning(f"FAILED → Ghi vào link.txt: {url}")
+
+    async def _run_task(self, task, hotel_slots, stats):
+        label, province_name, output_dir, url = task
+        async with hotel_slots:
+            if self._stopped():
+                return
+            entry = stats.setdefault(label, [0, 0])
+            entry[0] += 1
+            try:
+                await self.crawl_hotel(url, province_name, output_dir)
+                entry[1] += 1
+            except asyncio.TimeoutError:
+                self.logger.error(f"Timeout → {url}")
+                await self._blocking(self._save_failed_url_only, url, province_name)
+                incr("hotels_timeout")
+            except Exception as e:
+                self.logger.error(f"Lỗi không xác định → {url} | {str(e)}")
+                incr("hotels_invalid")
+
+    async def run(self, tasks):
+        """tasks: [(label, province, output_dir, url), ...] giống pool driver. Trả về {label: (total, success)}"""
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host_limit)
+        headers = {"User-Agent": USER_AGENT, "Accept-Language": "vi-VN,vi;q=0.9"}
+        hotel_slots = asyncio.Semaphore(self.hotel_concurrency)
+        stats = {}
+        async with aiohttp.ClientSession(connector=connector, headers=headers,
+                                         timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            self.session = session
+            await asyncio.gather(*(self._run_task(task, hotel_slots, stats) for task in tasks))
+        self.session = None
+        flush_parquet_sink()
+        return {label: tuple(v) for label, v in stats.items()}
+
+
+def run_async_engine(tasks, stop_event=None):
+    """Điểm vào đồng bộ cho main.py"""
+    if not tasks:
+        return {}
+    logging.info(f"[ASYNC] {len(tasks)} URL | {ASYNC_MAX_CONNECTIONS} kết nối | {ASYNC_PER_HOST_LIMIT}/host")
+    results = asyncio.run(AsyncBookingEngine(stop_event).run(tasks))
+    for label, (total, success) in sorted(results.items()):
+        logging.info(f"[ASYNC] {label}: {success}/{total} hotels.")
+    return results
@@ -0,0 +1,222 @@
+# core/coordinator.py
+# Coordinator cho crawl phân tán: MỘT process giữ frontier SQLite và phát URL khách sạn qua HTTP/JSON,
+# worker node (main_worker_node.py → core.driver_pool.run_remote_pool) chạy BookingCrawler ở nhiều máy.
+#
+# Giao thức lease / ack (POST JSON, owner = "<host>-<pid>-<worker>"):
+#   /lease     {owner, limit}                        → {tasks: [...], lease_seconds, remaining}
+#   /ack       {owner, url, review_count, output_path} → {accepted}  (False: lease đã hết hạn và trao cho worker khác)
+#   /fail      {owner, url, status, error}           → {accepted}
+#   /release   {owner, url}                          → {accepted}  (trả URL về pending, không tính lượt)
+#   /heartbeat {owner, urls}                         → {renewed}
+#   GET /stats                                       → {stats, by_province}
+# Lease quá hạn (worker / máy chết) được đưa về pending định kỳ trong vòng lặp server.
+# URL không có output_dir không bao giờ được phát (chuyển sang invalid khi server mở frontier).
+#
+# Chạy:  python -m core.coordinator --import-links      (nạp HOTEL_LINKS_DIR rồi phục vụ)
+# --output-dir là thư mục output TRÊN WORKER NODE (mặc định giống mode 2: <OUTPUT_DIR_MODE2>/mode2).
+
+import argparse
+import json
+import logging
+import os
+import socket
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from core.frontier import CrawlFrontier, STATUS_PENDING, STATUS_IN_FLIGHT, STATUS_TIMEOUT
+from config.config import CRAWL_FRONTIER_DB, HOTEL_LINKS_DIR
+from config.settings import FRONTIER_LEASE_SECONDS, COORDINATOR_HOST, COORDINATOR_PORT, OUTPUT_DIR_MODE2
+
+REAP_INTERVAL = 30  # Giây giữa 2 lần trả lease quá hạn về pending
+COMMANDS = ("lease", "ack", "fail", "release", "heartbeat", "stats")
+
+
+class CoordinatorServer(HTTPServer):
+    """
+    HTTPServer một luồng: mọi request (và việc dọn lease) chạy tuần tự trên thread serve_forever
+    → một connection SQLite duy nhất, không cần khóa. Request chỉ là vài câu query nên không nghẽn.
+    """
+
+    def __init__(self, db_path, host=COORDINATOR_HOST, port=COORDINATOR_PORT, lease_seconds=FRONTIER_LEASE_SECONDS):
+        super().__init__((host, port), _CoordinatorHandler)
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._frontier = None
+        self._last_reap = 0.0
+
+    @property
+    def frontier(self):
+        # Mở trên thread phục vụ (connection SQLite gắn với thread tạo ra nó)
+        if self._frontier is None:
+            self._frontier = CrawlFrontier(self.db_path, self.lease_seconds)
+            invalid = self._frontier.invalidate_missing_output_dir()
+            if invalid:
+                logging.warning(f"[COORDINATOR] {invalid} URL không có output_dir → invalid (nạp lại với --output-dir)")
+        return self._frontier
+
+    def service_actions(self):
+        """socketserver gọi mỗi vòng serve_forever (~0.5 s)"""
+        if time.time() - self._last_reap < REAP_INTERVAL:
+            return
+        self._last_reap = time.time()
+        requeued = self.frontier.requeue_expired()
+        if requeued:
+            logging.info(f"[COORDINATOR] {requeued} lease quá hạn → pending")
+
+    def server_close(self):
+        super().server_close()
+        if self._frontier is not None:
+            self._frontier.close()
+            self._frontier = None
+
+    # ---------------- Xử lý lệnh ----------------
+
+    def remaining(self):
+        stats = self.frontier.stats()
+        return stats.get(STATUS_PENDING, 0) + stats.get(STATUS_IN_FLIGHT, 0)
+
+    def handle_command(self, command, body):
+        frontier = self.frontier
+        owner = body.get("owner")
+        if command != "stats" and not owner:
+            raise ValueError("thiếu owner")
+
+        if command == "lease":
+            rows = frontier.lease(owner, int(body.get("limit", 1)))
+            return {
+                "tasks": [dict(r) for r in rows],
+                "lease_seconds": self.lease_seconds,
+                "remaining": self.remaining(),
+            }
+        if command == "ack":
+            return {"accepted": frontier.mark_ok(body["url"], body.get("review_count"), body.get("output_path"), owner)}
+        if command == "fail":
+            return {"accepted": frontier.mark_failed(body["url"], body.get("status") or STATUS_TIMEOUT, body.get("error"), owner)}
+        if command == "release":
+            return {"accepted": frontier.release(body["url"], owner)}
+        if command == "heartbeat":
+            return {"renewed": sum(frontier.renew(url, owner) for url in body.get("urls", []))}
+        if command == "stats":
+            return {"stats": frontier.stats(), "by_province": frontier.stats_by_province()}
+
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    def _reply(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, body):
+        command = self.path.split("?")[0].strip("/")
+        if command not in COMMANDS:
+            self.send_error(404)
+            return
+        try:
+            self._reply(200, self.server.handle_command(command, body))
+        except KeyError as e:
+            self._reply(400, {"error": f"thiếu tham số {e}"})
+        except (ValueError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            logging.error(f"[COORDINATOR] {command} lỗi: {e}")
+            self._reply(500, {"error": str(e)})
+
+    def do_GET(self):
+        self._dispatch({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": "body không phải JSON"})
+            return
+        self._dispatch(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_coordinator(db_path=CRAWL_FRONTIER_DB, host=COORDINATOR_HOST, port=COORDINATOR_PORT,
+                      lease_seconds=FRONTIER_LEASE_SECONDS):
+    """Chạy coordinator tới khi Ctrl+C"""
+    server = CoordinatorServer(db_path, host, port, lease_seconds)
+    logging.info(f"[COORDINATOR] http://{host}:{server.server_port} | {db_path} | {server.frontier.stats()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class CoordinatorClient:
+    """Phía worker node: mỗi process một client (requests.Session giữ kết nối)"""
+
+    def __init__(self, base_url, owner=None, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+        self.timeout = timeout
+        self.lease_seconds = None  # Do coordinator quyết định (--lease-seconds), biết sau lần lease đầu
+        self.session = requests.Session()
+
+    def _post(self, command, **payload):
+        resp = self.session.post(f"{self.base_url}/{command}", json={"owner": self.owner, **payload}, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def lease(self, limit=1):
+        """→ (tasks, remaining): tasks là list dict (url, province, label, output_dir, attempts); cập nhật lease_seconds"""
+        data = self._post("lease", limit=limit)
+        self.lease_seconds = data["lease_seconds"]
+        return data["tasks"], data["remaining"]
+
+    def ack(self, url, review_count=None, output_path=None):
+        return self._post("ack", url=url, review_count=review_count, output_path=output_path)["accepted"]
+
+    def fail(self, url, status=STATUS_TIMEOUT, error=None):
+        return self._post("fail", url=url, status=status, error=error)["accepted"]
+
+    def release(self, url):
+        return self._post("release", url=url)["accepted"]
+
+    def heartbeat(self, urls):
+        return self._post("heartbeat", urls=list(urls))["renewed"]
+
+    def stats(self):
+        resp = self.session.get(f"{self.base_url}/stats", timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def close(self):
+        self.session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coordinator phát URL khách sạn cho worker node")
+    parser.add_argument("--db", default=CRAWL_FRONTIER_DB)
+    parser.add_argument("--host", default=COORDINATOR_HOST)
+    parser.add_argument("--port", type=int, default=COORDINATOR_PORT)
+    parser.add_argument("--lease-seconds", type=int, default=FRONTIER_LEASE_SECONDS)
+    parser.add_argument("--import-links", nargs="?", const=HOTEL_LINKS_DIR, metavar="DIR",
+                        help="Nạp <tỉnh>/<tỉnh>_hotel_links.txt vào frontier trước khi phục vụ")
+    parser.add_argument("--output-dir", default=os.path.join(OUTPUT_DIR_MODE2, "mode2"),
+                        help="output_dir (trên worker node) gán cho URL nạp bằng --import-links")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.import_links:
+        frontier = CrawlFrontier(args.db, args.lease_seconds)
+        count = frontier.import_link_files(args.import_links, args.output_dir)
+        logging.info(f"[COORDINATOR] Nạp {count} URL từ {args.import_links}")
+        frontier.close()
+    serve_coordinator(args.db, args.host, args.port, args.lease_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,6 @@
 
 import os
 import json
-import time
-import random
 import logging
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -11,10 +9,24 @@ from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
 
 from core.driver import create_driver
-from utils.data_extractor import extract_hotel_data, extract_evaluation_categories
-from utils.review_extractor import crawl_all_reviews
-from utils.helpers import delay
+from core.driver_watchdog import recycle_reason, export_cookies, restore_cookies
+from core.session_cache import bootstrap_session, refresh_session, save_session, session_expired, apply_locale
+from core.resource_blocker import collect_block_stats, log_block_stats
+from core.html_archive import begin_crawl, archive_page, complete_crawl, KIND_HOTEL
+from core.parquet_sink import write_hotel, writes_json, flush_parquet_sink
+from utils.data_extractor import HotelPage
+from utils.review_extractor import crawl_all_reviews, ReviewCrawlInterrupted
+from utils.review_checkpoint import ReviewCheckpoint, BACKEND_HTTP, BACKEND_SELENIUM
+from utils.review_http import ReviewHttpFetcher, crawl_all_reviews_http
+from utils.rate_limiter import throttle, report_ok
+from utils.retry_policy import (
+    RetryPolicy, classify_error, page_state, FAILURE_STATUS, TIMEOUT, ELEMENT_TIMEOUT, CAPTCHA, DRIVER_CRASH,
+)
+from utils.telemetry import timed, incr, flush as flush_telemetry
+from utils.file_utils import hotel_json_path
+from utils.incremental import stored_hotel_path, load_stored_hotel, seen_fingerprints, merge_reviews
 from config.config import ERROR_LINK_DIR
+from config.settings import REVIEW_FETCH_BACKEND, INCREMENTAL_REVIEWS, DRIVER_RECYCLE_KEEP_COOKIES
 
 class BookingCrawler:
     def __init__(self, worker_index, output_dir, province_name, stop_event, screen_width=1920, screen_height=1080, cols=3):
@@ -26,7 +38,12 @@ class BookingCrawler:
         self.screen_height = screen_height
         self.cols = cols
         self.driver = None
+        self.pages_crawled = 0
+        self.review_fetcher = None  # Session HTTP dùng chung cho mọi khách sạn (backend "http")
+        self.last_result = {}  # Kết quả crawl_hotel gần nhất (status, review_count, output_path, error)
+        self.session_identity = f"worker-{worker_index}"  # Khóa cache cookie (core/session_cache)
         self.logger = logging.getLogger(f"Worker-{worker_index}-{province_name}")
+        self.retry_policy = RetryPolicy(stop_event, self.logger)
 
         # ← TẠO THƯ MỤC TỈNH + FILE link.txt CHỈ ĐỂ LƯU URL LỖI
         self.error_province_dir = os.path.join(ERROR_LINK_DIR, self.province_name)
@@ -34,18 +51,114 @@ class BookingCrawler:
         self.failed_link_file = os.path.join(self.error_province_dir, "link.txt")
 
     def _init_driver(self):
-        self.driver = create_driver(self.screen_width, self.screen_height, self.cols, self.worker_index)
+        with timed("driver_start"):
+            self.driver = create_driver(self.screen_width, self.screen_height, self.cols, self.worker_index)
+        self.pages_crawled = 0
         self.logger.info(f"Window [{self.worker_index}] initialized.")
 
-    def _save_hotel(self, hotel_data, url):
-        output_folder = os.path.join(self.output_dir, self.province_name)
-        os.makedirs(output_folder, exist_ok=True)
-        hotel_key = url.split('/')[-1].split('.')[0].replace('-', '_')
-        filename = os.path.join(output_folder, f"{hotel_key}.json")
+    def warm_up(self):
+        """Khởi tạo driver (nếu chưa có): nạp cookie đã cache, không có thì vào trang chủ booking.com một lần"""
+        if self.driver is None:
+            self._init_driver()
+            bootstrap_session(self.driver, self.session_identity)
+
+    def set_target(self, province_name, output_dir):
+        """Đổi tỉnh / thư mục output mà KHÔNG khởi tạo lại driver (dùng cho pool driver)"""
+        province_name = province_name.strip()
+        if province_name == self.province_name and output_dir == self.output_dir:
+            return
+        self.province_name = province_name
+        self.output_dir = output_dir
+        self.logger = logging.getLogger(f"Worker-{self.worker_index}-{self.province_name}")
+        self.retry_policy.logger = self.logger
+        self.error_province_dir = os.path.join(ERROR_LINK_DIR, self.province_name)
+        os.makedirs(self.error_province_dir, exist_ok=True)
+        self.failed_link_file = os.path.join(self.error_province_dir, "link.txt")
+
+    def is_driver_alive(self):
+        if self.driver is None:
+            return False
+        try:
+            _ = self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def maybe_recycle(self):
+        """
+        Gọi GIỮA 2 khách sạn: khởi động lại Edge khi driver chết, quá DRIVER_RECYCLE_PAGES trang
+        hoặc RSS vượt DRIVER_RECYCLE_RSS_MB. Cookie được chuyển sang phiên mới nên không cần warm_up() lại.
+        Trả về True nếu đã recycle.
+        """
+        if self.driver is None:
+            return False
+        alive = self.is_driver_alive()
+        reason = recycle_reason(self.driver, self.pages_crawled) if alive else "driver không phản hồi"
+        if not reason:
+            return False
+
+        self.logger.info(f"Recycle driver: {reason}")
+        incr("driver_recycles")
+        cookies = export_cookies(self.driver) if alive and DRIVER_RECYCLE_KEEP_COOKIES else []
+        self._quit_driver()
+        if cookies:
+            self._init_driver()
+            apply_locale(self.driver)
+            if not restore_cookies(self.driver, cookies):
+                self._quit_driver()  # Phiên mới không có cookie → warm_up() vào lại trang chủ như cũ
+        return True
+
+    def _quit_driver(self):
+        if self.driver:
+            try:
+                collect_block_stats(self.driver)
+                log_block_stats(self.logger)
+                self.driver.quit()
+                self.logger.info(f"Worker-{self.worker_index} WEB CLOSED.")
+            except Exception:
+                pass
+        self.driver = None
+
+    def close(self):
+        if self.is_driver_alive():
+            save_session(self.session_identity, self.driver)  # Lần chạy sau dùng cookie mới nhất
+        self._quit_driver()
+        flush_parquet_sink()
+        flush_telemetry()
+        if self.review_fetcher:
+            self.review_fetcher.close()
+            self.review_fetcher = None
+
+    def _crawl_reviews(self, full_url, seen=None, checkpoint=None):
+        """Chọn backend lấy review theo REVIEW_FETCH_BACKEND"""
+        if REVIEW_FETCH_BACKEND == "http":
+            if self.review_fetcher is None:
+                self.review_fetcher = ReviewHttpFetcher()
+            return crawl_all_reviews_http(self.driver, full_url, self.province_name, fetcher=self.review_fetcher,
+                                          seen=seen, checkpoint=checkpoint, stop_event=self.stop_event)
+        return crawl_all_reviews(self.driver, full_url, self.province_name, seen=seen,
+                                 checkpoint=checkpoint, stop_event=self.stop_event)
+
+    def _session_expired(self):
+        try:
+            return session_expired(self.driver.current_url, self.driver.page_source)
+        except Exception:
+            return False
+
+    def _save_hotel(self, hotel_data, url, filename=None, new_reviews=None):
+        """JSON và/hoặc Parquet theo OUTPUT_FORMAT. new_reviews: chỉ các review mới (incremental) cho Parquet"""
+        write_hotel(self.province_name, url, hotel_data, new_reviews)
+        if not writes_json():
+            self.logger.info(f"Saved (parquet): {hotel_data.get('name', 'Unknown')}")
+            return None
+
+        filename = filename or hotel_json_path(self.output_dir, self.province_name, url)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
 
         with open(filename, "w", encoding="utf-8") as f:
             json.dump(hotel_data, f, ensure_ascii=False, indent=4)
         self.logger.info(f"Saved: {hotel_data.get('name', 'Unknown')}")
+        return filename
 
     # ← THAY TOÀN BỘ HÀM NÀY BẰNG HÀM MỚI SIÊU GỌN
     def _save_failed_url_only(self, url):
@@ -55,27 +168,46 @@ class BookingCrawler:
         self.logger.warning(f"FAILED → Ghi vào link.txt: {url}")
 
     def crawl_hotel(self, url):
+        self.last_result = {}
         if self.stop_event.is_set():
             return False
 
         full_url = url + "?lang=vi"
-        retry_count = 0
-        max_retries = 3  # Tăng lên 3 cho chắc ăn hơn
+        stored_path = stored_hotel_path(self.province_name, url) if INCREMENTAL_REVIEWS else None
+        stored = load_stored_hotel(stored_path) if stored_path else None
+        seen = seen_fingerprints(stored) if stored else None
+        attempt = 0
 
-        while retry_count <= max_retries and not self.stop_event.is_set():
+        while not self.stop_event.is_set():
             try:
-                self.driver.get(full_url)
-                time.sleep(random.uniform(0.5, 1.5))
+                self.warm_up()  # Phiên Edge bị tắt sau driver crash → mở lại ở đây
+                self.pages_crawled += 1
+                throttle(self.stop_event)
+                with timed("page_load"):
+                    self.driver.get(full_url)
 
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.XPATH, '//*[@data-testid="review-score-component"]'))
-                )
-                time.sleep(random.uniform(0.8, 1.8))
+                with timed("wait_score"):
+                    WebDriverWait(self.driver, 15).until(
+                        EC.presence_of_element_located((By.XPATH, '//*[@data-testid="review-score-component"]'))
+                    )
 
+                report_ok()
                 html = self.driver.page_source
-                name, address, description, rating, number_rating = extract_hotel_data(html)
-                evaluation_categories = extract_evaluation_categories(html)
-                name_from_reviews, reviews = crawl_all_reviews(self.driver, full_url, self.province_name)
+                begin_crawl(full_url, self.province_name)
+                archive_page(KIND_HOTEL, full_url, html)
+                with timed("parse"):
+                    page = HotelPage(html)
+                    name, address, description, rating, number_rating = page.hotel_data()
+                    evaluation_categories = page.evaluation_categories
+                # Nạp lại mỗi lần thử: timeout giữa chừng đã ghi checkpoint → lần retry tiếp tục từ đó
+                checkpoint = ReviewCheckpoint(self.province_name, full_url,
+                                              BACKEND_HTTP if REVIEW_FETCH_BACKEND == "http" else BACKEND_SELENIUM)
+                resumed = checkpoint.load()  # Review nạp từ checkpoint không nằm trong kho của lần crawl này
+                name_from_reviews, reviews = self._crawl_reviews(full_url, seen, checkpoint)
+                new_reviews = reviews
+                if stored:
+                    self.logger.info(f"Incremental: +{len(reviews)} review mới")
+                    reviews = merge_reviews(reviews, stored.get("reviews"))
 
                 if name_from_reviews:
                     name = name_from_reviews
@@ -90,42 +222,65 @@ class BookingCrawler:
                     "reviews": reviews,
                 }
 
-                self._save_hotel(hotel_data, full_url)
+                with timed("save"):
+                    output_path = self._save_hotel(hotel_data, full_url, filename=stored_path if stored else None,
+                                                   new_reviews=new_reviews)
+                checkpoint.clear()
+                if not stored and not resumed:
+                    complete_crawl(full_url)
+                collect_block_stats(self.driver)  # Xả performance log mỗi khách sạn để log không phình
+                self.last_result = {"status": "ok", "review_count": len(reviews), "output_path": output_path}
+                incr("hotels_ok")
+                incr("reviews_saved", len(new_reviews))
                 return True
 
-            except TimeoutException:
-                retry_count += 1
-                if retry_count <= max_retries:
-                    self.logger.warning(f"Timeout retry {retry_count}/{max_retries}: {url}")
-                    time.sleep(random.uniform(4.0, 8.0))
-                else:
-                    self.logger.error(f"Timeout hết lượt → {url}")
-                    self._save_failed_url_only(url)   # ← GHI VÀO link.txt
-                    return False
+            except ReviewCrawlInterrupted as e:
+                self.logger.info(f"Dừng giữa chừng, đã lưu checkpoint → {e}")
+                incr("hotels_interrupted")
+                return False
 
             except Exception as e:
-                self.logger.error(f"Lỗi không xác định → {url} | {str(e)}")
-                # self._save_failed_url_only(url)       # ← GHI VÀO link.txt
+                # Phân loại → backoff theo loại lỗi (utils/retry_policy), hết lượt → dead-letter
+                error_class = classify_error(e, *page_state(self.driver))
+                if isinstance(e, TimeoutException):
+                    incr("timeouts")
+                attempt += 1
+                retry = self.retry_policy.on_failure(url, error_class, e, attempt, self.province_name)
+                if retry:
+                    self._prepare_retry(error_class)
+                    continue
+                if self.stop_event.is_set():
+                    return False
+
+                status = FAILURE_STATUS[error_class]
+                if status == "timeout":
+                    self._save_failed_url_only(url)   # ← GHI VÀO link.txt (crawl lại sau)
+                self.last_result = {"status": status, "error": f"{error_class}: {e}"[:500], "error_class": error_class}
+                incr(f"hotels_{status}")
                 return False
 
         return False
 
+    def _prepare_retry(self, error_class):
+        """Trước lần thử lại: khởi động lại Edge sau crash, làm mới phiên nếu captcha / phiên hết hạn"""
+        if error_class == DRIVER_CRASH:
+            self._quit_driver()  # Lần thử sau warm_up() lại từ đầu
+        elif error_class == CAPTCHA or (error_class in (TIMEOUT, ELEMENT_TIMEOUT) and self._session_expired()):
+            refresh_session(self.driver, self.session_identity)
+
     def run(self, urls):
         if not urls:
             return 0, 0
 
-        if self.driver is None:
-            self._init_driver()
-            self.driver.get("https://www.booking.com")
-            time.sleep(random.uniform(2.0, 4.0))
+        self.warm_up()
 
         success = 0
         total = len(urls)
-        for idx, url in enumerate(urls):
+        for url in urls:
             if self.stop_event.is_set():
                 break
-            if idx > 0:
-                delay(1.5, 3.5)
+            if self.maybe_recycle():
+                self.warm_up()
             if self.crawl_hotel(url):
                 success += 1
         return total, success
\ No newline at end of file
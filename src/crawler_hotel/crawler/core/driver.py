@@ -2,6 +2,8 @@
 from selenium import webdriver
 from selenium.webdriver.edge.options import Options
 
+from core.resource_blocker import configure_options, apply_blocking
+
 def create_driver(screen_width=1920, screen_height=1080, cols=3, worker_index=0):
     options = Options()
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
@@ -12,10 +14,12 @@ def create_driver(screen_width=1920, screen_height=1080, cols=3, worker_index=0)
     options.add_argument("--log-level=3")
     options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
     options.add_experimental_option('useAutomationExtension', False)
+    configure_options(options)
 
     driver = webdriver.Edge(options=options)
     driver.implicitly_wait(5)
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    apply_blocking(driver)
 
     # Căn cửa sổ
     cell_w = screen_width // cols
@@ -0,0 +1,378 @@
+# core/driver_pool.py
+# Pool driver sống lâu: N process, mỗi process giữ 1 phiên Edge đã warm-up
+# và lấy URL khách sạn từ MỘT hàng đợi chung cho tất cả range / tỉnh.
+# Phiên chỉ bị khởi động lại khi driver crash, sau DRIVER_RECYCLE_PAGES trang hoặc khi RSS vượt
+# DRIVER_RECYCLE_RSS_MB (BookingCrawler.maybe_recycle, giữ cookie → không warm-up lại).
+# Nguồn URL: hàng đợi Manager (run_driver_pool), frontier SQLite cục bộ (run_frontier_pool)
+# hoặc coordinator qua HTTP cho nhiều máy (run_remote_pool, core/coordinator).
+
+import logging
+import os
+import queue
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager
+
+from core.crawler import BookingCrawler
+from core.frontier import CrawlFrontier, STATUS_OK, STATUS_INVALID
+from core.coordinator import CoordinatorClient
+from utils.crawl_cost import longest_first, log_schedule
+from utils.rate_limiter import pool_kwargs
+from utils.retry_policy import RetryPolicy, push_dead_letter, DRIVER_CRASH
+from config.settings import FRONTIER_LEASE_SECONDS, COORDINATOR_POLL_SECONDS
+
+
+def _start_driver(crawler, logger, stop_event):
+    """
+    maybe_recycle + warm_up, thử lại theo backoff DRIVER_CRASH của RETRY_POLICY (msedgedriver bận / cập nhật).
+    False nếu vẫn lỗi sau mọi lượt hoặc đang dừng → worker nên thoát.
+    """
+    policy = RetryPolicy(stop_event, logger)
+    attempt = 0
+    while True:
+        try:
+            crawler.maybe_recycle()
+            crawler.warm_up()
+            return True
+        except Exception as e:
+            crawler.close()
+            attempt += 1
+            if attempt > policy.max_retries(DRIVER_CRASH) or stop_event.is_set():
+                logger.error(f"Không khởi tạo được driver sau {attempt} lần: {e}")
+                return False
+            delay = policy.backoff(DRIVER_CRASH, attempt)
+            logger.warning(f"Không khởi tạo được driver ({e}) → thử lại sau {delay:.1f}s")
+            stop_event.wait(delay)
+
+
+def pool_worker(args):
+    """
+    Worker của pool: lấy (label, province, output_dir, url) từ queue cho đến khi queue rỗng.
+    Trả về (worker_index, {label: [total, success]}).
+    """
+    worker_index, task_queue, stop_event = args
+    logger = logging.getLogger(f"Pool-Worker-{worker_index}")
+    crawler = BookingCrawler(worker_index, None, "", stop_event)  # Tỉnh được gán theo từng URL
+    stats = {}
+
+    try:
+        while not stop_event.is_set():
+            try:
+                item = task_queue.get(timeout=1.0)
+            except queue.Empty:
+                break  # Mọi task đã được nạp sẵn → queue rỗng nghĩa là hết việc
+            label, province_name, output_dir, url = item
+
+            if not _start_driver(crawler, logger, stop_event):
+                task_queue.put(item)  # Trả URL lại cho worker khác; worker cuối thoát → run_driver_pool xử lý phần còn lại
+                break
+
+            crawler.set_target(province_name, output_dir)
+            ok = crawler.crawl_hotel(url)
+            entry = stats.setdefault(label, [0, 0])
+            entry[0] += 1
+            entry[1] += int(ok)
+
+    except Exception as e:
+        logger.error(f"Pool-Worker-{worker_index} error: {e}")
+    finally:
+        crawler.close()
+
+    return worker_index, stats
+
+
+def run_driver_pool(tasks, max_workers, stop_event, manager=None, costs=None):
+    """
+    Chạy toàn bộ tasks [(label, province, output_dir, url), ...] trên một pool driver duy nhất.
+    costs: {url: chi phí ước lượng} (utils/crawl_cost) → hàng đợi longest-job-first.
+    Trả về {label: (total, success)} đã gộp từ mọi worker.
+    """
+    if not tasks:
+        return {}
+    if costs:
+        # Hàng đợi chung + khách sạn đắt nhất trước = LPT: worker rảnh trước lấy việc nhỏ ở cuối
+        tasks = longest_first(tasks, costs)
+        log_schedule(tasks, costs)
+
+    manager = manager or Manager()
+    task_queue = manager.Queue()
+    for task in tasks:
+        task_queue.put(task)
+
+    logging.info(f"[POOL] {len(tasks)} URL | {max_workers} worker")
+    merged = {}
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs()) as executor:
+        futures = {executor.submit(pool_worker, (i, task_queue, stop_event)): i for i in range(max_workers)}
+        for future in as_completed(futures):
+            try:
+                _, stats = future.result()
+            except Exception as e:
+                logging.error(f"[POOL] Worker-{futures[future]} error: {e}")
+                continue
+            for label, (total, success) in stats.items():
+                entry = merged.setdefault(label, [0, 0])
+                entry[0] += total
+                entry[1] += success
+
+    # Mọi worker đã thoát (không mở được driver) mà hàng đợi còn URL → dead-letter, không mất lặng lẽ
+    if not stop_event.is_set():
+        abandoned = _drain_abandoned(task_queue, merged)
+        if abandoned:
+            logging.error(f"[POOL] Không còn worker sống, {abandoned} URL chưa crawl → dead-letter")
+
+    for label, (total, success) in sorted(merged.items()):
+        logging.info(f"[POOL] {label}: {success}/{total} hotels.")
+    return {label: tuple(v) for label, v in merged.items()}
+
+
+def _drain_abandoned(task_queue, merged):
+    """Ghi dead-letter (driver_crash, attempts = 0) cho URL còn trong hàng đợi và tính vào total của label"""
+    count = 0
+    while True:
+        try:
+            label, province_name, _, url = task_queue.get_nowait()
+        except queue.Empty:
+            return count
+        push_dead_letter(url, DRIVER_CRASH, "không còn worker mở được driver", 0, province_name)
+        merged.setdefault(label, [0, 0])[0] += 1
+        count += 1
+
+
+class _LeaseHeartbeat:
+    """
+    Thread daemon gia hạn lease URL đang crawl mỗi lease_seconds / 3 (khách sạn vài nghìn review).
+    connect() chạy TRÊN thread heartbeat và trả về (renew(urls), close): connection SQLite / requests.Session
+    riêng của thread (không dùng chung được giữa các thread). Với coordinator, lease_seconds là giá trị
+    /lease trả về, không phải FRONTIER_LEASE_SECONDS của máy này.
+    """
+
+    def __init__(self, connect, lease_seconds):
+        self.connect = connect
+        self.interval = self._interval(lease_seconds)
+        self.urls = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    @staticmethod
+    def _interval(lease_seconds):
+        return max(lease_seconds / 3, 5)
+
+    def set_lease_seconds(self, lease_seconds):
+        """Coordinator khởi động lại với --lease-seconds khác → nhịp heartbeat theo giá trị mới"""
+        self.interval = self._interval(lease_seconds)
+
+    def _run(self):
+        renew, close = self.connect()
+        try:
+            while not self.stopped.wait(self.interval):
+                with self.lock:
+                    urls = list(self.urls)
+                if not urls:
+                    continue
+                try:
+                    renew(urls)
+                except Exception as e:
+                    logging.warning(f"[LEASE] Heartbeat lỗi: {e}")
+        finally:
+            close()
+
+    def hold(self, url):
+        with self.lock:
+            self.urls.add(url)
+
+    def drop(self, url):
+        with self.lock:
+            self.urls.discard(url)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def _frontier_renewer(db_path, owner, lease_seconds=FRONTIER_LEASE_SECONDS):
+    frontier = CrawlFrontier(db_path, lease_seconds)
+    return (lambda urls: sum(frontier.renew(url, owner) for url in urls)), frontier.close
+
+
+def _coordinator_renewer(client):
+    beat_client = CoordinatorClient(client.base_url, client.owner, client.timeout)
+    return beat_client.heartbeat, beat_client.close
+
+
+def frontier_worker(args):
+    """
+    Giống pool_worker nhưng lease URL từ frontier SQLite và ghi kết quả ngược vào DB.
+    Trả về (worker_index, {label: [total, success]}).
+    """
+    worker_index, db_path, stop_event = args
+    logger = logging.getLogger(f"Frontier-Worker-{worker_index}")
+    frontier = CrawlFrontier(db_path, FRONTIER_LEASE_SECONDS)
+    owner = f"worker-{worker_index}-{os.getpid()}"
+    # Gia hạn lease trong lúc crawl khách sạn lớn → không bị lease lại và crawl 2 lần
+    heartbeat = _LeaseHeartbeat(lambda: _frontier_renewer(db_path, owner), FRONTIER_LEASE_SECONDS)
+    crawler = BookingCrawler(worker_index, None, "", stop_event)
+    stats = {}
+
+    try:
+        while not stop_event.is_set():
+            rows = frontier.lease(owner)
+            if not rows:
+                break
+            row = rows[0]
+            url = row["url"]
+            heartbeat.hold(url)
+
+            if not _start_driver(crawler, logger, stop_event):
+                heartbeat.drop(url)
+                frontier.release(url, owner)  # Vẫn pending trong DB → lần chạy sau
+                break
+
+            crawler.set_target(row["province"], row["output_dir"])
+            ok = crawler.crawl_hotel(url)
+            heartbeat.drop(url)
+            result = crawler.last_result
+            # owner: lease đã hết hạn và trao cho worker khác → không ghi đè kết quả của worker đó
+            if ok:
+                accepted = frontier.mark_ok(url, result.get("review_count"), result.get("output_path"), owner)
+            elif result:
+                accepted = frontier.mark_failed(url, result["status"], result.get("error"), owner)
+            else:
+                accepted = frontier.release(url, owner)  # Bị dừng giữa chừng → để lần chạy sau
+            if not accepted:
+                logger.warning(f"Lease đã hết hạn, kết quả bị bỏ qua: {url}")
+
+            label = row["label"] or row["province"]
+            entry = stats.setdefault(label, [0, 0])
+            entry[0] += 1
+            entry[1] += int(ok)
+
+    except Exception as e:
+        logger.error(f"Frontier-Worker-{worker_index} error: {e}")
+    finally:
+        heartbeat.stop()
+        crawler.close()
+        frontier.close()
+
+    return worker_index, stats
+
+
+def run_frontier_pool(db_path, max_workers, stop_event):
+    """Chạy pool driver trên mọi URL pending của frontier. Trả về {label: (total, success)}"""
+    frontier = CrawlFrontier(db_path, FRONTIER_LEASE_SECONDS)
+    logging.info(f"[FRONTIER] {frontier.stats()} | {max_workers} worker")
+    frontier.close()
+
+    merged = {}
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs()) as executor:
+        futures = {executor.submit(frontier_worker, (i, db_path, stop_event)): i for i in range(max_workers)}
+        for future in as_completed(futures):
+            try:
+                _, stats = future.result()
+            except Exception as e:
+                logging.error(f"[FRONTIER] Worker-{futures[future]} error: {e}")
+                continue
+            for label, (total, success) in stats.items():
+                entry = merged.setdefault(label, [0, 0])
+                entry[0] += total
+                entry[1] += success
+
+    frontier = CrawlFrontier(db_path, FRONTIER_LEASE_SECONDS)
+    for province, counts in sorted(frontier.stats_by_province().items()):
+        logging.info(f"[FRONTIER] {province}: {counts.get(STATUS_OK, 0)}/{sum(counts.values())} ok | {counts}")
+    frontier.close()
+    return {label: tuple(v) for label, v in merged.items()}
+
+
+def remote_worker(args):
+    """
+    Giống frontier_worker nhưng lease / ack qua coordinator (máy khác).
+    output_dir trong task là đường dẫn trên worker node (các máy dùng cùng cấu trúc thư mục).
+    Trả về (worker_index, {label: [total, success]}).
+    """
+    worker_index, coordinator_url, stop_event = args
+    logger = logging.getLogger(f"Remote-Worker-{worker_index}")
+    client = CoordinatorClient(coordinator_url, f"{socket.gethostname()}-{os.getpid()}-{worker_index}")
+    heartbeat = None  # Tạo sau lần lease đầu: nhịp theo lease_seconds của coordinator
+    crawler = BookingCrawler(worker_index, None, "", stop_event)
+    stats = {}
+
+    try:
+        while not stop_event.is_set():
+            tasks, remaining = client.lease()
+            if not tasks:
+                if not remaining:
+                    break  # Không còn pending / in-flight ở bất kỳ máy nào
+                # Máy khác còn in-flight: nếu nó chết, lease hết hạn sẽ quay về pending
+                stop_event.wait(COORDINATOR_POLL_SECONDS)
+                continue
+            if heartbeat is None:
+                heartbeat = _LeaseHeartbeat(lambda: _coordinator_renewer(client), client.lease_seconds)
+            else:
+                heartbeat.set_lease_seconds(client.lease_seconds)
+            task = tasks[0]
+            url = task["url"]
+            if not task["output_dir"]:
+                # Coordinator cũ / DB sửa tay: không có chỗ lưu JSON → invalid (release sẽ quay vòng mãi giữa các worker)
+                logger.error(f"Task không có output_dir (nạp lại với --output-dir): {url}")
+                client.fail(url, STATUS_INVALID, "thiếu output_dir")
+                continue
+            heartbeat.hold(url)
+
+            if not _start_driver(crawler, logger, stop_event):
+                heartbeat.drop(url)
+                client.release(url)  # Máy khác lease tiếp
+                break
+
+            crawler.set_target(task["province"], task["output_dir"])
+            ok = crawler.crawl_hotel(url)
+            heartbeat.drop(url)
+            result = crawler.last_result
+            if ok:
+                accepted = client.ack(url, result.get("review_count"), result.get("output_path"))
+            elif result:
+                accepted = client.fail(url, result["status"], result.get("error"))
+            else:
+                accepted = client.release(url)  # Bị dừng giữa chừng → để worker khác / lần chạy sau
+            if not accepted:
+                logger.warning(f"Lease đã hết hạn, kết quả bị bỏ qua: {url}")
+
+            label = task["label"] or task["province"]
+            entry = stats.setdefault(label, [0, 0])
+            entry[0] += 1
+            entry[1] += int(ok)
+
+    except Exception as e:
+        logger.error(f"Remote-Worker-{worker_index} error: {e}")
+    finally:
+        if heartbeat is not None:
+            heartbeat.stop()
+        crawler.close()
+        client.close()
+
+    return worker_index, stats
+
+
+def run_remote_pool(coordinator_url, max_workers, stop_event):
+    """Worker node: pool driver lấy URL từ coordinator tới khi coordinator hết việc. Trả về {label: (total, success)}"""
+    client = CoordinatorClient(coordinator_url)
+    logging.info(f"[REMOTE] {coordinator_url} | {client.stats()['stats']} | {max_workers} worker")
+    client.close()
+
+    merged = {}
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs()) as executor:
+        futures = {executor.submit(remote_worker, (i, coordinator_url, stop_event)): i for i in range(max_workers)}
+        for future in as_completed(futures):
+            try:
+                _, stats = future.result()
+            except Exception as e:
+                logging.error(f"[REMOTE] Worker-{futures[future]} error: {e}")
+                continue
+            for label, (total, success) in stats.items():
+                entry = merged.setdefault(label, [0, 0])
+                entry[0] += total
+                entry[1] += success
+
+    for label, (total, success) in sorted(merged.items()):
+        logging.info(f"[REMOTE] {label}: {success}/{total} hotels.")
+    return {label: tuple(v) for label, v in merged.items()}
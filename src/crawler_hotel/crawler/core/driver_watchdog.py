@@ -0,0 +1,73 @@
+# core/driver_watchdog.py
+# Theo dõi phiên Edge sống lâu: đo RSS của cả cây process (msedgedriver + msedge + renderer) qua psutil
+# và quyết định khi nào cần khởi động lại giữa 2 khách sạn (quá DRIVER_RECYCLE_PAGES trang hoặc DRIVER_RECYCLE_RSS_MB).
+# Cookie của phiên cũ được chuyển sang phiên mới qua CDP (Network.setCookies) → không phải warm-up trang chủ lại.
+
+import logging
+
+from config.settings import DRIVER_RECYCLE_PAGES, DRIVER_RECYCLE_RSS_MB
+
+try:
+    import psutil
+except ImportError:  # psutil là tùy chọn: thiếu thì chỉ recycle theo số trang
+    psutil = None
+
+_warned_no_psutil = False
+
+
+def driver_memory_mb(driver):
+    """Tổng RSS (MB) của process driver và mọi process con. None nếu không đo được"""
+    global _warned_no_psutil
+    if psutil is None:
+        if not _warned_no_psutil:
+            logging.warning("[WATCHDOG] Chưa cài psutil → chỉ recycle driver theo DRIVER_RECYCLE_PAGES")
+            _warned_no_psutil = True
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        total = root.memory_info().rss
+        for child in root.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+    except (AttributeError, psutil.Error):
+        return None
+
+
+def recycle_reason(driver, pages_crawled):
+    """Lý do cần khởi động lại phiên (chuỗi để log) hoặc None"""
+    if DRIVER_RECYCLE_PAGES and pages_crawled >= DRIVER_RECYCLE_PAGES:
+        return f"{pages_crawled} trang"
+    if DRIVER_RECYCLE_RSS_MB:
+        rss = driver_memory_mb(driver)
+        if rss is not None and rss >= DRIVER_RECYCLE_RSS_MB:
+            return f"RSS {rss:.0f} MB ≥ {DRIVER_RECYCLE_RSS_MB} MB sau {pages_crawled} trang"
+    return None
+
+
+def export_cookies(driver):
+    """Mọi cookie của trình duyệt (không chỉ domain hiện tại). [] nếu driver không còn phản hồi"""
+    try:
+        return driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+    except Exception as e:
+        logging.warning(f"[WATCHDOG] Không đọc được cookie: {e}")
+        return []
+
+
+def restore_cookies(driver, cookies):
+    """Nạp cookie vào phiên mới mà không cần mở trang nào. Trả về True nếu thành công"""
+    params = []
+    for cookie in cookies:
+        param = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+                 if key in cookie}
+        if not cookie.get("session") and cookie.get("expires", -1) > 0:
+            param["expires"] = cookie["expires"]
+        params.append(param)
+    try:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+        return True
+    except Exception as e:
+        logging.warning(f"[WATCHDOG] Không nạp lại được {len(params)} cookie: {e}")
+        return False
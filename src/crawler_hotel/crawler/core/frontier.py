@@ -0,0 +1,247 @@
+# core/frontier.py
+# Crawl frontier trên SQLite (WAL): MỘT dòng cho mỗi URL thay cho link.txt, output_error_link/,
+# errors_detected_* và việc quét thư mục JSON. Worker lease URL trong transaction,
+# "crawl lại" chỉ còn là một câu query theo status.
+
+import os
+import sqlite3
+import time
+
+from utils.crawl_cost import REVIEWS_PER_PAGE
+
+STATUS_PENDING = "pending"
+STATUS_IN_FLIGHT = "in-flight"
+STATUS_OK = "ok"
+STATUS_INVALID = "invalid"
+STATUS_TIMEOUT = "timeout"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url          TEXT PRIMARY KEY,
+    province     TEXT NOT NULL,
+    label        TEXT,
+    output_dir   TEXT,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    lease_owner  TEXT,
+    lease_until  REAL,
+    last_crawl   REAL,
+    review_count INTEGER,
+    output_path  TEXT,
+    error        TEXT,
+    cost         REAL
+);
+CREATE INDEX IF NOT EXISTS idx_urls_province ON urls(province);
+CREATE INDEX IF NOT EXISTS idx_urls_status ON urls(status);
+"""
+
+
+class CrawlFrontier:
+    """Mỗi process mở một CrawlFrontier riêng (connection SQLite không chia sẻ giữa process)"""
+
+    def __init__(self, db_path, lease_seconds=900):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """DB tạo trước khi có cột cost (xếp lịch theo chi phí) / trước khi cost luôn được điền"""
+        columns = {r["name"] for r in self.conn.execute("PRAGMA table_info(urls)")}
+        if "cost" not in columns:
+            self.conn.execute("ALTER TABLE urls ADD COLUMN cost REAL")
+        self._fill_missing_costs()
+        # lease() đi thẳng theo index này: pending, đắt nhất trước, không cần sort cả bảng
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_lease ON urls(status, cost DESC, province, url)")
+
+    def _fill_missing_costs(self):
+        """cost NULL → ước lượng từ số review lần crawl trước (1 + review / trang), không có thì 0"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE urls SET cost = COALESCE(review_count * 1.0 / ? + 1, 0) WHERE cost IS NULL",
+                (REVIEWS_PER_PAGE,),
+            )
+
+    def close(self):
+        self.conn.close()
+
+    # ---------------- Nạp URL ----------------
+
+    def add_tasks(self, tasks, costs=None):
+        """
+        tasks: [(label, province, output_dir, url), ...] – URL đã có thì giữ nguyên trạng thái
+        (chỉ điền output_dir nếu trước đó bị nạp thiếu).
+        costs: {url: chi phí ước lượng} (utils/crawl_cost) – cập nhật cả cho URL đã có.
+        """
+        costs = costs or {}
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO urls (url, province, label, output_dir, cost) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET cost = COALESCE(excluded.cost, cost), "
+                "output_dir = COALESCE(output_dir, excluded.output_dir)",
+                [(url.strip(), province.strip(), label, output_dir, costs.get(url))
+                 for label, province, output_dir, url in tasks],
+            )
+        self._fill_missing_costs()
+
+    def import_link_files(self, hotel_links_dir, output_dir=None):
+        """Nạp mọi <tỉnh>/<tỉnh>_hotel_links.txt (HOTEL_LINKS_DIR)"""
+        tasks = []
+        for province in sorted(os.listdir(hotel_links_dir)):
+            txt_file = os.path.join(hotel_links_dir, province, f"{province}_hotel_links.txt")
+            if not os.path.isfile(txt_file):
+                continue
+            with open(txt_file, "r", encoding="utf-8") as f:
+                tasks.extend((province, province, output_dir, u.strip()) for u in f if u.strip().startswith("http"))
+        self.add_tasks(tasks)
+        return len(tasks)
+
+    def import_timeout_links(self, error_link_dir, output_dir):
+        """
+        Chuyển output_error_link/<tỉnh>/link.txt cũ thành status timeout.
+        output_dir bắt buộc (như --output-dir của coordinator): URL không có output_dir không bao giờ được lease.
+        """
+        if not output_dir:
+            raise ValueError("import_timeout_links cần output_dir")
+        count = 0
+        for province in sorted(os.listdir(error_link_dir)):
+            link_file = os.path.join(error_link_dir, province, "link.txt")
+            if not os.path.isfile(link_file):
+                continue
+            with open(link_file, "r", encoding="utf-8") as f:
+                urls = [u.strip() for u in f if u.strip().startswith("http")]
+            self.add_tasks([(province, province, output_dir, u) for u in urls])
+            for url in urls:
+                self.mark_failed(url, STATUS_TIMEOUT, "Timeout Permanent (link.txt)")
+            count += len(urls)
+        return count
+
+    # ---------------- Lease / kết quả ----------------
+
+    def lease(self, owner, limit=1):
+        """
+        Lấy tối đa `limit` URL pending (lease in-flight đã hết hạn được trả về pending trước) trong MỘT
+        transaction ghi, đắt nhất trước theo cột cost (luôn được điền, xem _fill_missing_costs).
+        URL không có output_dir (không có chỗ lưu JSON) không bao giờ được lease.
+        Trả về list sqlite3.Row (url, province, label, output_dir, attempts).
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                "UPDATE urls SET status = ?, lease_owner = NULL, lease_until = NULL WHERE status = ? AND lease_until < ?",
+                (STATUS_PENDING, STATUS_IN_FLIGHT, now),
+            )
+            rows = self.conn.execute(
+                "SELECT url, province, label, output_dir, attempts FROM urls "
+                "WHERE status = ? AND output_dir IS NOT NULL ORDER BY cost DESC, province, url LIMIT ?",
+                (STATUS_PENDING, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE urls SET status = ?, lease_owner = ?, lease_until = ?, attempts = attempts + 1 WHERE url = ?",
+                [(STATUS_IN_FLIGHT, owner, now + self.lease_seconds, r["url"]) for r in rows],
+            )
+        return rows
+
+    @staticmethod
+    def _owner_clause(owner):
+        """owner != None → chỉ cập nhật khi URL vẫn đang được chính owner lease (worker chậm không ghi đè lease mới)"""
+        return (" AND status = ? AND lease_owner = ?", [STATUS_IN_FLIGHT, owner]) if owner else ("", [])
+
+    def _finish(self, url, status, owner=None, **fields):
+        fields.update(status=status, lease_owner=None, lease_until=None, last_crawl=time.time())
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        where, params = self._owner_clause(owner)
+        with self.conn:
+            cursor = self.conn.execute(f"UPDATE urls SET {columns} WHERE url = ?{where}", (*fields.values(), url.strip(), *params))
+        return cursor.rowcount > 0
+
+    def mark_ok(self, url, review_count=None, output_path=None, owner=None):
+        fields = {"review_count": review_count, "output_path": output_path, "error": None}
+        if review_count is not None:
+            fields["cost"] = review_count / REVIEWS_PER_PAGE + 1  # Số review thật → lần crawl lại xếp đúng chỗ
+        return self._finish(url, STATUS_OK, owner, **fields)
+
+    def mark_failed(self, url, status=STATUS_TIMEOUT, error=None, owner=None):
+        return self._finish(url, status, owner, error=error)
+
+    def release(self, url, owner=None):
+        """Trả URL về pending mà không tính là một lần crawl (ví dụ khi stop_event)"""
+        where, params = self._owner_clause(owner)
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE urls SET status = ?, lease_owner = NULL, lease_until = NULL, attempts = MAX(attempts - 1, 0) "
+                f"WHERE url = ?{where}",
+                (STATUS_PENDING, url.strip(), *params),
+            )
+        return cursor.rowcount > 0
+
+    def renew(self, url, owner):
+        """Gia hạn lease (heartbeat của worker đang crawl khách sạn lớn). False nếu lease đã mất"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE urls SET lease_until = ? WHERE url = ? AND status = ? AND lease_owner = ?",
+                (time.time() + self.lease_seconds, url.strip(), STATUS_IN_FLIGHT, owner),
+            )
+        return cursor.rowcount > 0
+
+    def invalidate_missing_output_dir(self):
+        """URL pending không có output_dir (nạp thiếu --output-dir) → invalid, để không treo trong pending. Trả về số URL"""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE urls SET status = ?, error = ? WHERE status = ? AND output_dir IS NULL",
+                (STATUS_INVALID, "thiếu output_dir", STATUS_PENDING),
+            ).rowcount
+
+    def requeue_expired(self):
+        """Lease quá hạn (worker / máy chết) → pending. Trả về số URL"""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE urls SET status = ?, lease_owner = NULL, lease_until = NULL WHERE status = ? AND lease_until < ?",
+                (STATUS_PENDING, STATUS_IN_FLIGHT, time.time()),
+            ).rowcount
+
+    # ---------------- Query ----------------
+
+    def requeue(self, statuses=(STATUS_INVALID,), province=None, max_attempts=None):
+        """'Crawl lại' = đưa các URL có status trong `statuses` về pending. Trả về số URL"""
+        sql = f"UPDATE urls SET status = ? WHERE status IN ({','.join('?' * len(statuses))})"
+        params = [STATUS_PENDING, *statuses]
+        if province:
+            sql += " AND province = ?"
+            params.append(province)
+        if max_attempts is not None:
+            sql += " AND attempts < ?"
+            params.append(max_attempts)
+        with self.conn:
+            return self.conn.execute(sql, params).rowcount
+
+    def urls_by_status(self, status, province=None):
+        sql = "SELECT url FROM urls WHERE status = ?"
+        params = [status]
+        if province:
+            sql += " AND province = ?"
+            params.append(province)
+        return [r["url"] for r in self.conn.execute(sql + " ORDER BY url", params)]
+
+    def stats(self, province=None):
+        """{status: count} (toàn bộ hoặc một tỉnh)"""
+        sql = "SELECT status, COUNT(*) AS n FROM urls"
+        params = []
+        if province:
+            sql += " WHERE province = ?"
+            params.append(province)
+        return {r["status"]: r["n"] for r in self.conn.execute(sql + " GROUP BY status", params)}
+
+    def stats_by_province(self):
+        """{province: {status: count}} cho báo cáo"""
+        result = {}
+        for r in self.conn.execute("SELECT province, status, COUNT(*) AS n FROM urls GROUP BY province, status"):
+            result.setdefault(r["province"], {})[r["status"]] = r["n"]
+        return result
@@ -0,0 +1,252 @@
+# core/html_archive.py
+# Kho HTML thô (kiểu WARC) cho mọi trang đã tải: trang khách sạn + từng trang review.
+# - Append-only: mỗi process ghi file riêng <archive_dir>/<YYYYMMDD>/<host>-<pid>.warc.gz,
+#   mỗi bản ghi là MỘT gzip member độc lập → đọc ngẫu nhiên theo (offset, length).
+# - Index: <cùng tên>.idx.jsonl, mỗi dòng {url, kind, hotel_url, crawl_id, province, page, fetched_at, file, offset, length}.
+#   Crawl lưu xong (đủ mọi trang review trong kho) ghi thêm một dòng kind "done" không kèm HTML.
+# - Replay: chạy lại HotelPage + extract_reviews_from_page trên kho, song song, KHÔNG cần trình duyệt;
+#   chỉ lấy crawl đã có dòng "done" (crawl bị timeout / dừng giữa chừng không đè bản đầy đủ cũ hơn).
+
+import glob
+import gzip
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from config.config import HTML_ARCHIVE_DIR
+from config.settings import HTML_ARCHIVE
+
+KIND_HOTEL = "hotel"
+KIND_REVIEWS = "reviews"
+KIND_DONE = "done"  # Chỉ có trong index: crawl đã lưu xong
+
+
+def _hotel_key(url):
+    return url.split("#")[0].split("?")[0]
+
+
+class ArchiveWriter:
+    def __init__(self, archive_dir):
+        day_dir = os.path.join(archive_dir, datetime.now().strftime("%Y%m%d"))
+        os.makedirs(day_dir, exist_ok=True)
+        base = os.path.join(day_dir, f"{socket.gethostname()}-{os.getpid()}")
+        self.data_path = base + ".warc.gz"
+        self.index_path = base + ".idx.jsonl"
+        self.crawl_ids = {}  # hotel_key → crawl_id của lần crawl đang chạy
+        # Engine async ghi từ nhiều thread executor: offset lấy bằng tell() phải khớp đúng bản ghi vừa append
+        self._lock = threading.Lock()
+
+    def begin_crawl(self, hotel_url, province=None):
+        crawl_id = uuid.uuid4().hex
+        self.crawl_ids[_hotel_key(hotel_url)] = (crawl_id, province)
+        return crawl_id
+
+    def write(self, kind, url, html, hotel_url=None, page=None):
+        hotel_url = hotel_url or url
+        crawl_id, province = self.crawl_ids.get(_hotel_key(hotel_url), (None, None))
+        fetched_at = time.time()
+        body = html.encode("utf-8")
+        header = (
+            "WARC/1.0\r\n"
+            "WARC-Type: response\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"WARC-Date: {datetime.fromtimestamp(fetched_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            "Content-Type: text/html; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode("utf-8")
+        record = gzip.compress(header + body + b"\r\n\r\n")
+
+        with self._lock:
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                f.write(record)
+            entry = {
+                "url": url, "kind": kind, "hotel_url": _hotel_key(hotel_url), "crawl_id": crawl_id,
+                "province": province, "page": page, "fetched_at": fetched_at,
+                "file": os.path.basename(self.data_path), "offset": offset, "length": len(record),
+            }
+            self._append_index(entry)
+
+    def complete(self, hotel_url):
+        """Đánh dấu lần crawl đang chạy của hotel_url đã lưu xong → được replay"""
+        crawl_id, province = self.crawl_ids.pop(_hotel_key(hotel_url), (None, None))
+        if crawl_id is None:
+            return
+        with self._lock:
+            self._append_index({
+                "url": hotel_url, "kind": KIND_DONE, "hotel_url": _hotel_key(hotel_url), "crawl_id": crawl_id,
+                "province": province, "page": None, "fetched_at": time.time(),
+                "file": None, "offset": None, "length": None,
+            })
+
+    def _append_index(self, entry):
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+_writer = None
+
+
+def get_archive_writer():
+    global _writer
+    if _writer is None and HTML_ARCHIVE:
+        _writer = ArchiveWriter(HTML_ARCHIVE_DIR)
+    return _writer
+
+
+def begin_crawl(hotel_url, province=None):
+    writer = get_archive_writer()
+    return writer.begin_crawl(hotel_url, province) if writer else None
+
+
+def archive_page(kind, url, html, hotel_url=None, page=None):
+    """No-op nếu HTML_ARCHIVE tắt. Lỗi ghi kho không bao giờ làm hỏng lần crawl"""
+    writer = get_archive_writer()
+    if writer is None or not html:
+        return
+    try:
+        writer.write(kind, url, html, hotel_url, page)
+    except OSError as e:
+        logging.warning(f"[ARCHIVE] Không ghi được {url}: {e}")
+
+
+def complete_crawl(hotel_url):
+    """
+    Gọi SAU KHI lưu khách sạn thành công, và chỉ khi kho giữ đủ mọi trang review của lần crawl này
+    (không gọi khi tiếp tục từ checkpoint / crawl incremental: các trang trước đó không nằm trong crawl_id này)
+    """
+    writer = get_archive_writer()
+    if writer is None:
+        return
+    try:
+        writer.complete(hotel_url)
+    except OSError as e:
+        logging.warning(f"[ARCHIVE] Không ghi được dòng done {hotel_url}: {e}")
+
+
+# =============================================================================
+# ĐỌC + REPLAY
+# =============================================================================
+
+def read_record(archive_day_dir, entry):
+    """Trả về HTML của một bản ghi index"""
+    with open(os.path.join(archive_day_dir, entry["file"]), "rb") as f:
+        f.seek(entry["offset"])
+        raw = gzip.decompress(f.read(entry["length"]))
+    _, _, body = raw.partition(b"\r\n\r\n")
+    return body[:-4].decode("utf-8") if body.endswith(b"\r\n\r\n") else body.decode("utf-8")
+
+
+def load_index(archive_dir):
+    """[(day_dir, entry), ...] của toàn bộ kho"""
+    entries = []
+    for index_path in sorted(glob.glob(os.path.join(archive_dir, "*", "*.idx.jsonl"))):
+        day_dir = os.path.dirname(index_path)
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append((day_dir, json.loads(line)))
+    return entries
+
+
+def latest_crawls(archive_dir):
+    """
+    Mỗi khách sạn → bản crawl HOÀN TẤT mới nhất: {hotel_url: {"province", "hotel": (day_dir, entry), "reviews": [...]}}
+    """
+    by_crawl = {}
+    for day_dir, entry in load_index(archive_dir):
+        crawl = by_crawl.setdefault(entry["crawl_id"] or entry["hotel_url"], {
+            "hotel_url": entry["hotel_url"], "province": entry["province"],
+            "fetched_at": entry["fetched_at"], "hotel": None, "reviews": [], "done": False,
+        })
+        if entry["kind"] == KIND_HOTEL:
+            crawl["hotel"] = (day_dir, entry)
+            crawl["fetched_at"] = entry["fetched_at"]
+        elif entry["kind"] == KIND_DONE:
+            crawl["done"] = True
+        else:
+            crawl["reviews"].append((day_dir, entry))
+
+    latest = {}
+    for crawl in by_crawl.values():
+        if crawl["hotel"] is None or not crawl["done"]:
+            continue
+        current = latest.get(crawl["hotel_url"])
+        if current is None or crawl["fetched_at"] > current["fetched_at"]:
+            latest[crawl["hotel_url"]] = crawl
+    return latest
+
+
+def replay_crawl(crawl):
+    """Re-extract một khách sạn từ kho. Trả về (hotel_url, province, hotel_data)"""
+    from utils.data_extractor import HotelPage
+    from utils.html_parser import make_soup
+    from utils.review_extractor import extract_reviews_from_page, extract_hotel_name_from_soup
+
+    page = HotelPage(read_record(*crawl["hotel"]))
+    name, address, description, rating, number_rating = page.hotel_data()
+
+    # Trang được tải lại trong cùng crawl_id (fallback HTTP → Selenium) → chỉ giữ bản tải SAU CÙNG của mỗi trang,
+    # như live crawl. Không bỏ trùng theo nội dung: review ẩn danh / giống hệt nhau vẫn là các review khác nhau
+    latest_pages = {}
+    for day_dir, entry in sorted(crawl["reviews"], key=lambda item: item[1]["fetched_at"]):
+        latest_pages[entry["page"] or 0] = (day_dir, entry)
+
+    reviews = []
+    for i, page_no in enumerate(sorted(latest_pages)):
+        soup = make_soup(read_record(*latest_pages[page_no]))
+        if i == 0:
+            name = extract_hotel_name_from_soup(soup) or name
+        reviews.extend(extract_reviews_from_page(soup))
+
+    hotel_data = {
+        "name": name,
+        "address": address,
+        "description": description,
+        "rating": rating,
+        "total_rating": number_rating,
+        "evaluation_categories": page.evaluation_categories,
+        "reviews": reviews,
+    }
+    return crawl["hotel_url"], crawl["province"], hotel_data
+
+
+def replay_archive(archive_dir, output_dir, max_workers=None):
+    """Chạy lại mọi extractor trên kho → JSON cùng schema với _save_hotel trong output_dir/<tỉnh>/"""
+    from utils.file_utils import hotel_json_path
+
+    crawls = list(latest_crawls(archive_dir).values())
+    logging.info(f"[REPLAY] {len(crawls)} khách sạn trong {archive_dir}")
+    done = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(replay_crawl, crawl): crawl["hotel_url"] for crawl in crawls}
+        for future in as_completed(futures):
+            try:
+                hotel_url, province, hotel_data = future.result()
+            except Exception as e:
+                logging.error(f"[REPLAY] Lỗi {futures[future]}: {e}")
+                continue
+            filename = hotel_json_path(output_dir, province or "unknown", hotel_url)
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(hotel_data, f, ensure_ascii=False, indent=4)
+            done += 1
+    logging.info(f"[REPLAY] HOÀN TẤT {done}/{len(crawls)}")
+    return done
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    replay_archive(
+        sys.argv[1] if len(sys.argv) > 1 else HTML_ARCHIVE_DIR,
+        sys.argv[2] if len(sys.argv) > 2 else "data_replay",
+    )
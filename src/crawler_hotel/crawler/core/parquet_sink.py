@@ -0,0 +1,176 @@
+# core/parquet_sink.py
+# Ghi khách sạn + review thẳng vào dataset Parquet (thay cho / song song với 1 file JSON indent=4 mỗi khách sạn).
+# - Layout hive: <dataset>/{hotels,reviews}/province=<tỉnh>/crawl_date=<YYYY-MM-DD>/part-<host>-<pid>-<uuid>.parquet
+# - Buffer theo partition trong RAM, đủ PARQUET_ROW_GROUP_ROWS review → flush (mỗi partition một file, một row group).
+# - Commit nguyên tử: ghi ".part-*.tmp" (reader bỏ qua file bắt đầu bằng ".") rồi os.replace.
+# - Đọc: pandas.read_parquet(<dataset>/reviews) – xem data_processing/loader/data_loader.load_data_from_parquet.
+
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from multiprocessing.util import Finalize
+from urllib.parse import quote
+
+from config.config import PARQUET_DATASET_DIR
+from config.settings import OUTPUT_FORMAT, PARQUET_ROW_GROUP_ROWS, PARQUET_COMPRESSION
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Chỉ cần khi OUTPUT_FORMAT có "parquet"
+    pa = pq = None
+
+HOTEL_FIELDS = [
+    ("hotel_url", "string"), ("name", "string"), ("address", "string"), ("description", "string"),
+    ("rating", "string"), ("total_rating", "int64"), ("review_count", "int64"),
+    ("evaluation_categories", "string"),  # JSON
+    ("crawled_at", "float64"),
+]
+REVIEW_FIELDS = [
+    ("hotel_url", "string"), ("hotel_name", "string"), ("hotel_rating", "string"),
+    ("reviewer_name", "string"), ("reviewer_country", "string"),
+    ("date", "string"), ("rating", "string"), ("score", "float64"),
+    ("room_type", "string"), ("stay_duration", "string"), ("group_type", "string"),
+    ("comment_positive", "string"), ("comment_negative", "string"),
+    ("crawled_at", "float64"),
+]
+
+
+def writes_json():
+    return OUTPUT_FORMAT in ("json", "both")
+
+
+def writes_parquet():
+    return OUTPUT_FORMAT in ("parquet", "both")
+
+
+def _schema(fields):
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in fields])
+
+
+def _to_int(value):
+    try:
+        return int(str(value).replace(".", "").replace(",", "").strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetSink:
+    def __init__(self, dataset_dir, row_group_rows=PARQUET_ROW_GROUP_ROWS, compression=PARQUET_COMPRESSION):
+        if pa is None:
+            raise ImportError("OUTPUT_FORMAT có 'parquet' nhưng chưa cài pyarrow (pip install pyarrow)")
+        self.dataset_dir = dataset_dir
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self.schemas = {"hotels": _schema(HOTEL_FIELDS), "reviews": _schema(REVIEW_FIELDS)}
+        self.buffers = {}  # (table, province, crawl_date) → [row, ...]
+        self.buffered_reviews = 0
+
+    def add_hotel(self, province, hotel_url, hotel_data, reviews=None):
+        """
+        reviews: review cần APPEND (mặc định toàn bộ hotel_data["reviews"]).
+        Chế độ incremental chỉ truyền review mới để dataset không bị nhân bản.
+        """
+        crawled_at = time.time()
+        key = (province, datetime.fromtimestamp(crawled_at).strftime("%Y-%m-%d"))
+        if reviews is None:
+            reviews = hotel_data.get("reviews") or []
+
+        hotel_rating = None if hotel_data.get("rating") is None else str(hotel_data.get("rating"))
+
+        self.buffers.setdefault(("hotels", *key), []).append({
+            "hotel_url": hotel_url,
+            "name": hotel_data.get("name"),
+            "address": hotel_data.get("address"),
+            "description": hotel_data.get("description"),
+            "rating": hotel_rating,
+            "total_rating": _to_int(hotel_data.get("total_rating")),
+            "review_count": len(hotel_data.get("reviews") or []),
+            "evaluation_categories": json.dumps(hotel_data.get("evaluation_categories") or {}, ensure_ascii=False),
+            "crawled_at": crawled_at,
+        })
+        rows = self.buffers.setdefault(("reviews", *key), [])
+        for review in reviews:
+            reviewer = review.get("reviewer") or {}
+            body = review.get("review") or {}
+            rows.append({
+                "hotel_url": hotel_url,
+                "hotel_name": hotel_data.get("name"),
+                "hotel_rating": hotel_rating,
+                "reviewer_name": reviewer.get("name"),
+                "reviewer_country": reviewer.get("country"),
+                "date": body.get("date"),
+                "rating": body.get("rating"),
+                "score": _to_float(body.get("score")),
+                "room_type": body.get("room_type"),
+                "stay_duration": body.get("stay_duration"),
+                "group_type": body.get("group_type"),
+                "comment_positive": body.get("comment_positive"),
+                "comment_negative": body.get("comment_negative"),
+                "crawled_at": crawled_at,
+            })
+        self.buffered_reviews += len(reviews)
+        if self.buffered_reviews >= self.row_group_rows:
+            self.flush()
+
+    def _commit(self, table_name, province, crawl_date, rows):
+        partition_dir = os.path.join(
+            self.dataset_dir, table_name,
+            f"province={quote(province, safe='')}", f"crawl_date={crawl_date}",
+        )
+        os.makedirs(partition_dir, exist_ok=True)
+        filename = f"part-{self.prefix}-{uuid.uuid4().hex[:12]}.parquet"
+        tmp_path = os.path.join(partition_dir, f".{filename}.tmp")
+        table = pa.Table.from_pylist(rows, schema=self.schemas[table_name])
+        pq.write_table(table, tmp_path, row_group_size=max(len(rows), 1), compression=self.compression)
+        os.replace(tmp_path, os.path.join(partition_dir, filename))
+
+    def flush(self):
+        """Ghi mọi partition đang buffer. Partition lỗi vẫn được giữ lại để lần flush sau thử lại"""
+        for (table_name, province, crawl_date), rows in list(self.buffers.items()):
+            if not rows:
+                del self.buffers[(table_name, province, crawl_date)]
+                continue
+            try:
+                self._commit(table_name, province, crawl_date, rows)
+            except OSError as e:
+                logging.error(f"[PARQUET] Không ghi được {table_name}/{province}/{crawl_date}: {e}")
+                continue
+            del self.buffers[(table_name, province, crawl_date)]
+        self.buffered_reviews = sum(len(rows) for (t, *_), rows in self.buffers.items() if t == "reviews")
+
+
+_sink = None
+
+
+def get_parquet_sink():
+    global _sink
+    if _sink is None and writes_parquet():
+        _sink = ParquetSink(PARQUET_DATASET_DIR)
+        # Worker của ProcessPoolExecutor không chạy atexit → dùng Finalize của multiprocessing để flush lúc thoát
+        Finalize(_sink, _sink.flush, exitpriority=10)
+    return _sink
+
+
+def write_hotel(province, hotel_url, hotel_data, reviews=None):
+    """No-op nếu OUTPUT_FORMAT không có "parquet"."""
+    sink = get_parquet_sink()
+    if sink:
+        sink.add_hotel(province, hotel_url.split("?")[0], hotel_data, reviews)
+
+
+def flush_parquet_sink():
+    if _sink is not None:
+        _sink.flush()
@@ -0,0 +1,92 @@
+# core/resource_blocker.py
+# Chặn ảnh, font, bản đồ và script bên thứ ba trong trình duyệt crawl (CDP Network.setBlockedURLs).
+# Crawler chỉ đọc text → không cần tải gallery ảnh / tracker, trang load nhanh hơn và worker tốn ít RAM hơn.
+# Nếu bật RESOURCE_BLOCK_STATS, đọc performance log để đếm request bị chặn và ước lượng số byte tiết kiệm.
+
+import json
+import logging
+
+from config.settings import RESOURCE_BLOCK_PROFILE, RESOURCE_BLOCK_PROFILES, RESOURCE_BLOCK_STATS
+
+# Kích thước trung bình (byte) mỗi loại tài nguyên trên trang Booking – chỉ để ước lượng byte tiết kiệm
+ESTIMATED_BYTES_BY_TYPE = {
+    "Image": 60_000,
+    "Font": 40_000,
+    "Media": 500_000,
+    "Script": 80_000,
+    "Stylesheet": 30_000,
+    "XHR": 5_000,
+    "Fetch": 5_000,
+    "Other": 10_000,
+}
+
+# Bộ đếm theo profile trong process hiện tại: {profile: {"blocked": n, "bytes_saved": n, "bytes_loaded": n, "by_type": {...}}}
+BLOCK_STATS = {}
+
+
+def blocked_patterns(profile=None):
+    profile = profile or RESOURCE_BLOCK_PROFILE
+    if profile not in RESOURCE_BLOCK_PROFILES:
+        logging.warning(f"Không có profile chặn '{profile}' → không chặn gì")
+        return []
+    return list(RESOURCE_BLOCK_PROFILES[profile])
+
+
+def configure_options(options):
+    """Bật performance log (cần cho bộ đếm) – gọi trước khi tạo webdriver.Edge"""
+    if RESOURCE_BLOCK_STATS:
+        options.set_capability("ms:loggingPrefs", {"performance": "ALL"})
+
+
+def apply_blocking(driver, profile=None):
+    """Gắn danh sách URL bị chặn vào phiên CDP của driver. Trả về số pattern đã áp dụng"""
+    patterns = blocked_patterns(profile)
+    if not patterns:
+        return 0
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        logging.warning(f"Không áp dụng được profile chặn tài nguyên: {e}")
+        return 0
+    driver.resource_block_profile = profile or RESOURCE_BLOCK_PROFILE
+    return len(patterns)
+
+
+def collect_block_stats(driver):
+    """Đọc (và xả) performance log của driver, cộng dồn vào BLOCK_STATS của profile hiện tại"""
+    profile = getattr(driver, "resource_block_profile", None)
+    if not (RESOURCE_BLOCK_STATS and profile):
+        return None
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+
+    stats = BLOCK_STATS.setdefault(profile, {"blocked": 0, "bytes_saved": 0, "bytes_loaded": 0, "by_type": {}})
+    request_types = {}
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            request_types[params.get("requestId")] = params.get("type", "Other")
+        elif method == "Network.loadingFinished":
+            stats["bytes_loaded"] += int(params.get("encodedDataLength") or 0)
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            resource_type = params.get("type") or request_types.get(params.get("requestId"), "Other")
+            stats["blocked"] += 1
+            stats["bytes_saved"] += ESTIMATED_BYTES_BY_TYPE.get(resource_type, ESTIMATED_BYTES_BY_TYPE["Other"])
+            stats["by_type"][resource_type] = stats["by_type"].get(resource_type, 0) + 1
+    return stats
+
+
+def log_block_stats(logger=None):
+    logger = logger or logging.getLogger("ResourceBlocker")
+    for profile, stats in BLOCK_STATS.items():
+        logger.info(
+            f"[BLOCK:{profile}] chặn {stats['blocked']} request | ~{stats['bytes_saved'] / 1_048_576:.1f} MB tiết kiệm "
+            f"| đã tải {stats['bytes_loaded'] / 1_048_576:.1f} MB | {stats['by_type']}"
+        )
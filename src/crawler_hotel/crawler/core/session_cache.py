@@ -0,0 +1,131 @@
+# core/session_cache.py
+# Cache phiên trình duyệt theo danh tính worker: cookie + tùy chọn ngôn ngữ được lưu một lần vào
+# <SESSION_CACHE_DIR>/<identity>.json và nạp thẳng vào phiên Edge mới (CDP) → bỏ qua warm-up trang chủ (2–4 s).
+# Chỉ kiểm tra lại "lười": khi một trang cho thấy phiên hết hạn (captcha, bị đẩy về trang chủ, mất ngôn ngữ vi)
+# thì xóa cache, warm-up trang chủ như cũ và lưu cookie mới.
+
+import json
+import logging
+import os
+import random
+import re
+import time
+
+from core.driver_watchdog import export_cookies, restore_cookies
+from utils.rate_limiter import is_blocked_response
+from utils.telemetry import timed, incr
+from config.config import SESSION_CACHE_DIR
+from config.settings import SESSION_CACHE, SESSION_CACHE_MAX_AGE_HOURS
+
+HOMEPAGE_URL = "https://www.booking.com"
+# Ngôn ngữ cố định cho mọi request của trình duyệt → trang khách sạn ?lang=vi không phải đổi ngôn ngữ lại
+LOCALE = {"lang": "vi", "accept_language": "vi-VN,vi;q=0.9", "locale": "vi-VN"}
+_HTML_LANG_RE = re.compile(r"<html[^>]*\blang=[\"']?([\w-]+)", re.IGNORECASE)
+
+
+def cache_path(identity, cache_dir=SESSION_CACHE_DIR):
+    return os.path.join(cache_dir, f"{identity}.json")
+
+
+def load_session(identity, cache_dir=SESSION_CACHE_DIR):
+    """Cookie còn hạn của danh tính này, hoặc None nếu chưa có / quá SESSION_CACHE_MAX_AGE_HOURS / đổi locale"""
+    path = cache_path(identity, cache_dir)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"[SESSION] Không đọc được {path}: {e}")
+        return None
+    if data.get("locale") != LOCALE:
+        return None
+    if SESSION_CACHE_MAX_AGE_HOURS and time.time() - data.get("saved_at", 0) > SESSION_CACHE_MAX_AGE_HOURS * 3600:
+        return None
+    now = time.time()
+    cookies = [c for c in data.get("cookies", []) if c.get("session") or c.get("expires", -1) <= 0 or c["expires"] > now]
+    return cookies or None
+
+
+def save_session(identity, driver, cache_dir=SESSION_CACHE_DIR):
+    """Ghi nguyên tử cookie hiện tại của driver. Trả về số cookie đã lưu"""
+    if not SESSION_CACHE:
+        return 0
+    cookies = export_cookies(driver)
+    if not cookies:
+        return 0
+    path = cache_path(identity, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time(), "locale": LOCALE, "cookies": cookies}, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logging.warning(f"[SESSION] Không ghi được {path}: {e}")
+        return 0
+    return len(cookies)
+
+
+def invalidate(identity, cache_dir=SESSION_CACHE_DIR):
+    path = cache_path(identity, cache_dir)
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def apply_locale(driver):
+    """Ghim ngôn ngữ vi cho mọi request (header Accept-Language + locale của trình duyệt)"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setExtraHTTPHeaders", {"headers": {"Accept-Language": LOCALE["accept_language"]}})
+        driver.execute_cdp_cmd("Emulation.setLocaleOverride", {"locale": LOCALE["locale"]})
+    except Exception as e:
+        logging.warning(f"[SESSION] Không đặt được locale: {e}")
+
+
+def warm_up_homepage(driver):
+    with timed("page_load"):
+        driver.get(HOMEPAGE_URL)
+    with timed("sleep"):
+        time.sleep(random.uniform(2.0, 4.0))
+
+
+def bootstrap_session(driver, identity):
+    """
+    Chuẩn bị phiên mới: nạp cookie đã cache (không mở trang nào), hoặc warm-up trang chủ rồi lưu cookie.
+    Trả về True nếu dùng được cache.
+    """
+    apply_locale(driver)
+    cookies = load_session(identity) if SESSION_CACHE else None
+    if cookies and restore_cookies(driver, cookies):
+        logging.info(f"[SESSION] {identity}: nạp {len(cookies)} cookie từ cache → bỏ qua warm-up")
+        incr("session_cache_hit")
+        return True
+
+    if SESSION_CACHE:
+        incr("session_cache_miss")
+    warm_up_homepage(driver)
+    save_session(identity, driver)
+    return False
+
+
+def refresh_session(driver, identity):
+    """Phiên hết hạn: bỏ cache, warm-up trang chủ lại và lưu cookie mới"""
+    logging.info(f"[SESSION] {identity}: phiên hết hạn → warm-up lại trang chủ")
+    incr("session_refresh")
+    invalidate(identity)
+    warm_up_homepage(driver)
+    save_session(identity, driver)
+
+
+def session_expired(url, html):
+    """
+    Dấu hiệu phiên không còn dùng được trên trang vừa tải: captcha / chặn, bị chuyển về trang chủ
+    hoặc trang khác thay vì trang khách sạn, hay mất ngôn ngữ vi.
+    """
+    if is_blocked_response(None, html):
+        return True
+    path = (url or "").split("?")[0].split("#")[0]
+    if path and "/hotel/" not in path:
+        return True
+    match = _HTML_LANG_RE.search((html or "")[:2000])
+    return bool(match) and not match.group(1).lower().startswith(LOCALE["lang"])
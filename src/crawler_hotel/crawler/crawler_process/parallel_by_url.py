@@ -2,18 +2,19 @@
 import os
 import json
 import logging
-import time
-import random
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from multiprocessing import Manager
 from utils.driver_utils import create_driver
-from utils.data_extractor import extract_hotel_data, extract_evaluation_categories
+from utils.data_extractor import HotelPage
 from utils.review_extractor import crawl_all_reviews
-from config.settings import OUTPUT_DIR
+from utils.rate_limiter import throttle, create_shared_rate_limiter, pool_kwargs
+from utils.retry_policy import RetryPolicy, classify_error, page_state, DRIVER_CRASH
+from utils.file_utils import chunk_urls
+from utils.crawl_cost import estimate_cost, load_listing_counts
+from config.settings import OUTPUT_DIR, SCHEDULE_BY_COST
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,30 +26,27 @@ logging.basicConfig(
 )
 
 def crawl_hotel_chunk(args):
-    urls_chunk, province_name, output_dir, worker_index, stop_event = args
+    urls_chunk, province_name, output_dir, worker_index, max_workers, stop_event = args
     logger = logging.getLogger(f"Worker-{worker_index}")
-    driver = create_driver(worker_index)
+    policy = RetryPolicy(stop_event, logger)
+    driver = create_driver(worker_index, max_workers)
     success = 0
 
     try:
-        driver.get("https://www.booking.com")
-        time.sleep(random.uniform(2, 4))
-
-        for i, url in enumerate(urls_chunk):
+        # create_driver đã nạp cookie cache / warm-up trang chủ
+        for url in urls_chunk:
             if stop_event.is_set(): break
-            if i > 0: time.sleep(random.uniform(1.5, 3.5))
 
-            retry = 0
-            while retry <= 2 and not stop_event.is_set():
+            attempt = 0
+            while not stop_event.is_set():
                 try:
+                    throttle(stop_event)
                     driver.get(url + "?lang=vi")
-                    time.sleep(1)
                     WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.XPATH, '//*[@data-testid="review-score-component"]')))
-                    time.sleep(1.5)
 
-                    html = driver.page_source
-                    name, addr, desc, rating, total = extract_hotel_data(html)
-                    cats = extract_evaluation_categories(html)
+                    page = HotelPage(driver.page_source)
+                    name, addr, desc, rating, total = page.hotel_data()
+                    cats = page.evaluation_categories
                     name_h, reviews = crawl_all_reviews(driver, url, province_name)
                     if name_h: name = name_h
 
@@ -62,12 +60,18 @@ def crawl_hotel_chunk(args):
                     success += 1
                     logger.info(f"[{success}/{len(urls_chunk)}] Đã lưu: {name}")
                     break
-                except TimeoutException:
-                    retry += 1
-                    time.sleep(random.uniform(3, 6))
                 except Exception as e:
-                    logger.error(f"Lỗi: {url} | {e}")
-                    break
+                    # Chính sách retry chung (utils/retry_policy): backoff theo loại lỗi, hết lượt → dead-letter
+                    error_class = classify_error(e, *page_state(driver))
+                    attempt += 1
+                    if not policy.on_failure(url, error_class, e, attempt, province_name):
+                        break
+                    if error_class == DRIVER_CRASH:
+                        try:
+                            driver.quit()
+                        except Exception:
+                            pass
+                        driver = create_driver(worker_index, max_workers)
     finally:
         driver.quit()
 
@@ -85,13 +89,16 @@ def crawl_province_with_workers(province_path, output_dir, max_workers=3):
 
     if not all_urls: return 0, 0
 
-    chunk_size = (len(all_urls) + max_workers - 1) // max_workers
-    chunks = [all_urls[i:i + chunk_size] for i in range(0, len(all_urls), chunk_size)]
-    while len(chunks) < max_workers:
-        chunks.append([])
+    cost = None
+    if SCHEDULE_BY_COST:
+        # LPT: chia theo chi phí ước lượng thay vì theo số URL → các worker xong gần cùng lúc
+        listing = load_listing_counts(province_path)
+        cost = lambda url: estimate_cost(province_name, url, listing)
+    chunks = chunk_urls(all_urls, max_workers, cost=cost)
 
     manager = Manager()
     stop_event = manager.Event()
+    create_shared_rate_limiter(manager)
 
     def wait_enter():
         input(f"\nĐANG CRAWL {province_name} - NHẤN ENTER ĐỂ DỪNG...\n")
@@ -99,10 +106,10 @@ def crawl_province_with_workers(province_path, output_dir, max_workers=3):
     import threading
     threading.Thread(target=wait_enter, daemon=True).start()
 
-    tasks = [(chunks[i], province_name, output_dir, i, stop_event) for i in range(max_workers) if chunks[i]]
+    tasks = [(chunks[i], province_name, output_dir, i, max_workers, stop_event) for i in range(max_workers) if chunks[i]]
     total, success = 0, 0
 
-    with ProcessPoolExecutor(max_workers=max_workers) as exec:
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs()) as exec:
         for f in as_completed([exec.submit(crawl_hotel_chunk, t) for t in tasks]):
             if stop_event.is_set(): break
             _, t, s = f.result()
@@ -3,17 +3,17 @@ import os
 import json
 import logging
 import time
-import random
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from multiprocessing import Manager, freeze_support
 from utils.driver_utils import create_driver
-from utils.data_extractor import extract_hotel_data, extract_evaluation_categories
+from utils.data_extractor import HotelPage
 from utils.review_extractor import crawl_all_reviews
+from utils.rate_limiter import throttle, create_shared_rate_limiter, pool_kwargs
+from utils.retry_policy import RetryPolicy, classify_error, page_state, DRIVER_CRASH
 from config.settings import OUTPUT_DIR
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +28,7 @@ def crawl_province_task(args):
     province_path, output_dir, max_workers, stop_event, worker_index = args
     province_name = os.path.basename(province_path)
     logger = logging.getLogger(f"Prov-{worker_index}-{province_name}")
+    policy = RetryPolicy(stop_event, logger)
     logger.info(f"Bắt đầu tỉnh: {province_name}")
 
     if stop_event.is_set():
@@ -37,14 +38,12 @@ def crawl_province_task(args):
     if not txt_files:
         return province_name, 0, 0
 
-    driver = create_driver(worker_index)
+    driver = create_driver(worker_index, max_workers)
     total_hotels = 0
     success_count = 0
 
     try:
-        driver.get("https://www.booking.com")
-        time.sleep(random.uniform(2, 4))
-
+        # create_driver đã nạp cookie cache / warm-up trang chủ
         for txt_file in txt_files:
             if stop_event.is_set(): break
             file_path = os.path.join(province_path, txt_file)
@@ -56,22 +55,19 @@ def crawl_province_task(args):
             for url in urls:
                 if stop_event.is_set(): break
                 total_hotels += 1
-                if total_hotels > 1:
-                    time.sleep(random.uniform(1.5, 3.5))
 
-                retry = 0
-                while retry <= 1 and not stop_event.is_set():
+                attempt = 0
+                while not stop_event.is_set():
                     try:
+                        throttle(stop_event)
                         driver.get(url + "?lang=vi")
-                        time.sleep(1)
                         WebDriverWait(driver, 15).until(
                             EC.presence_of_element_located((By.XPATH, '//*[@data-testid="review-score-component"]'))
                         )
-                        time.sleep(1.5)
 
-                        html = driver.page_source
-                        name, addr, desc, rating, total = extract_hotel_data(html)
-                        cats = extract_evaluation_categories(html)
+                        page = HotelPage(driver.page_source)
+                        name, addr, desc, rating, total = page.hotel_data()
+                        cats = page.evaluation_categories
                         name_h, reviews = crawl_all_reviews(driver, url, province_name)
                         if name_h: name = name_h
 
@@ -85,12 +81,18 @@ def crawl_province_task(args):
                         success_count += 1
                         logger.info(f"Đã lưu: {name}")
                         break
-                    except TimeoutException:
-                        retry += 1
-                        time.sleep(random.uniform(3, 6))
                     except Exception as e:
-                        logger.error(f"Lỗi: {url} | {e}")
-                        break
+                        # Chính sách retry chung (utils/retry_policy): backoff theo loại lỗi, hết lượt → dead-letter
+                        error_class = classify_error(e, *page_state(driver))
+                        attempt += 1
+                        if not policy.on_failure(url, error_class, e, attempt, province_name):
+                            break
+                        if error_class == DRIVER_CRASH:
+                            try:
+                                driver.quit()
+                            except Exception:
+                                pass
+                            driver = create_driver(worker_index, max_workers)
     finally:
         driver.quit()
 
@@ -103,6 +105,7 @@ def crawl_all_provinces_parallel(input_dir, output_dir=OUTPUT_DIR, max_workers=3
 
     manager = Manager()
     stop_event = manager.Event()
+    create_shared_rate_limiter(manager)
 
     if max_runtime_minutes:
         def auto_stop():
@@ -119,7 +122,7 @@ def crawl_all_provinces_parallel(input_dir, output_dir=OUTPUT_DIR, max_workers=3
 
     tasks = [(p, output_dir, max_workers, stop_event, i % max_workers) for i, p in enumerate(provinces)]
 
-    with ProcessPoolExecutor(max_workers=max_workers) as exec:
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs()) as exec:
         futures = {exec.submit(crawl_province_task, t): os.path.basename(t[0]) for t in tasks}
         for f in as_completed(futures):
             if stop_event.is_set(): break
@@ -6,11 +6,19 @@ from multiprocessing import Manager, freeze_support
 from config.settings import (
     BASE_INPUT_DIR_MODE1, BASE_INPUT_DIR_MODE2,
     OUTPUT_DIR_MODE1, OUTPUT_DIR_MODE2,
-    MAX_WORKERS, MAX_RUNTIME_MINUTES, LOGS_DIR
+    MAX_WORKERS, MAX_RUNTIME_MINUTES, LOGS_DIR, USE_DRIVER_POOL, CRAWL_ENGINE, USE_FRONTIER, SCHEDULE_BY_COST,
+    PREFLIGHT,
 )
-from modes.mode1 import run_mode1
+from config.config import CRAWL_FRONTIER_DB
+from modes.mode1 import run_mode1, collect_mode1_tasks
+from core.driver_pool import run_driver_pool, run_frontier_pool
+from core.frontier import CrawlFrontier
 from modes.mode2 import run_mode2
 from utils.helpers import setup_auto_stop, setup_manual_stop, show_menu
+from utils.rate_limiter import create_shared_rate_limiter
+from utils.telemetry import start_run, finish_run
+from utils.crawl_cost import task_costs
+from utils.preflight import preflight_tasks, preflight_frontier
 
 def main():
     choice = show_menu()
@@ -50,6 +58,8 @@ def main():
     # Quản lý dừng chương trình
     manager = Manager()
     stop_event = manager.Event()
+    create_shared_rate_limiter(manager)  # Một ngân sách request cho MỌI worker process
+    telemetry_dir = start_run()  # Trước khi tạo pool → worker ghi snapshot vào cùng thư mục run
     setup_auto_stop(MAX_RUNTIME_MINUTES, stop_event)
     setup_manual_stop(stop_event)
 
@@ -57,33 +67,70 @@ def main():
     mode_output_root = os.path.join(OUTPUT_DIR, f"mode{choice}")
     os.makedirs(mode_output_root, exist_ok=True)
 
-    for range_name in range_dirs:
-        if stop_event.is_set():
-            print("Đã nhận tín hiệu dừng. Thoát vòng lặp...")
-            break
-
-        input_dir = os.path.join(BASE_INPUT_DIR, range_name)
-        range_output_dir = os.path.join(mode_output_root, range_name)
-        os.makedirs(range_output_dir, exist_ok=True)
-
-        print(f"\n{'-' * 60}")
-        print(f" BẮT ĐẦU RANGE: {range_name} | MODE {choice}")
-        print(f"   → Input : {input_dir}")
-        print(f"   → Output: {range_output_dir}")
-        print(f"{'-' * 60}\n")
-
-        # Gọi hàm mode tương ứng
-        mode_func(input_dir, range_output_dir, MAX_WORKERS, MAX_RUNTIME_MINUTES, stop_event)
-
-        print(f"\nHOÀN THÀNH RANGE: {range_name}\n")
-        print("=" * 80)
+    if CRAWL_ENGINE == "async":
+        # Engine asyncio: không trình duyệt, mọi range / tỉnh chạy chung một event loop
+        from core.async_engine import run_async_engine  # aiohttp chỉ cần khi chọn engine này
+        tasks = []
+        for range_name in range_dirs:
+            range_output_dir = os.path.join(mode_output_root, range_name)
+            os.makedirs(range_output_dir, exist_ok=True)
+            tasks.extend(collect_mode1_tasks(os.path.join(BASE_INPUT_DIR, range_name), range_output_dir, range_name))
+        print(f"Async engine: {len(tasks)} URL trên {len(range_dirs)} range\n")
+        run_async_engine(tasks, stop_event)
+    elif USE_DRIVER_POOL:
+        # Một pool driver + MỘT hàng đợi cho TẤT CẢ range / tỉnh (cả mode 1 và mode 2)
+        # → không khởi động lại Edge, worker không bao giờ rảnh khi còn URL ở bất kỳ tỉnh nào
+        tasks = []
+        for range_name in range_dirs:
+            range_output_dir = os.path.join(mode_output_root, range_name)
+            os.makedirs(range_output_dir, exist_ok=True)
+            tasks.extend(collect_mode1_tasks(os.path.join(BASE_INPUT_DIR, range_name), range_output_dir, range_name))
+        print(f"Pool driver: {len(tasks)} URL trên {len(range_dirs)} range\n")
+        if PREFLIGHT and not USE_FRONTIER:
+            tasks = preflight_tasks(tasks, stop_event)  # Loại URL chết bằng HTTP trước khi mở Edge
+        # Chi phí ước lượng mỗi khách sạn → longest-job-first (utils/crawl_cost)
+        costs = task_costs(tasks, [BASE_INPUT_DIR]) if SCHEDULE_BY_COST else None
+        if USE_FRONTIER:
+            # URL đã có trong frontier giữ nguyên status → chỉ crawl pending / lease hết hạn
+            frontier = CrawlFrontier(CRAWL_FRONTIER_DB)
+            frontier.add_tasks(tasks, costs)
+            if PREFLIGHT:
+                preflight_frontier(frontier, stop_event)  # Chỉ kiểm tra URL pending, URL chết → invalid
+            frontier.close()
+            run_frontier_pool(CRAWL_FRONTIER_DB, MAX_WORKERS, stop_event)
+        else:
+            run_driver_pool(tasks, MAX_WORKERS, stop_event, manager, costs)
+    else:
+        for range_name in range_dirs:
+            if stop_event.is_set():
+                print("Đã nhận tín hiệu dừng. Thoát vòng lặp...")
+                break
+
+            input_dir = os.path.join(BASE_INPUT_DIR, range_name)
+            range_output_dir = os.path.join(mode_output_root, range_name)
+            os.makedirs(range_output_dir, exist_ok=True)
+
+            print(f"\n{'-' * 60}")
+            print(f" BẮT ĐẦU RANGE: {range_name} | MODE {choice}")
+            print(f"   → Input : {input_dir}")
+            print(f"   → Output: {range_output_dir}")
+            print(f"{'-' * 60}\n")
+
+            # Gọi hàm mode tương ứng
+            mode_func(input_dir, range_output_dir, MAX_WORKERS, MAX_RUNTIME_MINUTES, stop_event)
+
+            print(f"\nHOÀN THÀNH RANGE: {range_name}\n")
+            print("=" * 80)
 
     # Hoàn thành
+    finish_run()
     log_path = os.path.join(LOGS_DIR, "crawler.log")
     print("\n" + "=" * 70)
     print("          HOÀN THÀNH TẤT CẢ!")
     print(f"          Dữ liệu: {os.path.abspath(mode_output_root)}")
     print(f"          Log: {os.path.abspath(log_path)}")
+    if telemetry_dir:
+        print(f"          Metrics: {os.path.abspath(telemetry_dir)}")
     print("=" * 70)
     print("          Thoát trong 5 giây...")
     time.sleep(5)
@@ -0,0 +1,46 @@
+# main_worker_node.py
+# Worker node cho crawl phân tán: chạy MAX_WORKERS trình duyệt, lấy URL từ coordinator (core/coordinator)
+# thay cho hàng đợi cục bộ. Chạy trên mỗi máy:   python main_worker_node.py --coordinator http://<máy-chủ>:8775
+# Thử trên một máy: mở coordinator (python -m core.coordinator --import-links) rồi chạy vài worker node.
+import argparse
+import time
+from multiprocessing import Manager, freeze_support
+
+from config.settings import MAX_WORKERS, MAX_RUNTIME_MINUTES, COORDINATOR_URL
+from core.driver_pool import run_remote_pool
+from utils.helpers import setup_auto_stop, setup_manual_stop, setup_logging
+from utils.rate_limiter import create_shared_rate_limiter
+from utils.telemetry import start_run, finish_run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker node: crawl URL do coordinator phát")
+    parser.add_argument("--coordinator", default=COORDINATOR_URL)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    setup_logging()
+    print(f"Coordinator: {args.coordinator} | Workers: {args.workers} | Dừng bằng phím ENTER")
+    print("=" * 80 + "\n")
+
+    manager = Manager()
+    stop_event = manager.Event()
+    create_shared_rate_limiter(manager)  # Ngân sách request của MÁY này (mỗi máy một IP)
+    start_run()
+    setup_auto_stop(MAX_RUNTIME_MINUTES, stop_event)
+    setup_manual_stop(stop_event)
+
+    results = run_remote_pool(args.coordinator, args.workers, stop_event)
+
+    finish_run()
+    total = sum(t for t, _ in results.values())
+    success = sum(s for _, s in results.values())
+    print("\n" + "=" * 70)
+    print(f"          WORKER NODE XONG: {success}/{total} khách sạn")
+    print("=" * 70)
+    time.sleep(2)
+
+
+if __name__ == "__main__":
+    freeze_support()
+    main()
@@ -2,6 +2,9 @@
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from core.crawler import BookingCrawler
 from utils.file_utils import load_urls_from_province
+from utils.rate_limiter import pool_kwargs
+from utils.crawl_cost import estimate_cost, load_listing_counts
+from config.settings import SCHEDULE_BY_COST
 import os
 import logging
 
@@ -15,18 +18,42 @@ def crawl_province_mode1(args):
         logger.warning(f"No URLs in {province_path}")
         return province_name, 0, 0
 
+    if SCHEDULE_BY_COST:
+        listing = load_listing_counts(province_path)
+        all_urls.sort(key=lambda url: -estimate_cost(province_name, url, listing))
+
     crawler = BookingCrawler(worker_index, output_dir, province_name, stop_event)
     total, success = crawler.run(all_urls)
     return province_name, total, success
 
+def collect_mode1_tasks(input_dir, output_dir, label_prefix=""):
+    """Trả về [(label, province, output_dir, url), ...] của một range cho pool driver"""
+    tasks = []
+    for d in sorted(os.listdir(input_dir)):
+        province_path = os.path.join(input_dir, d)
+        if not os.path.isdir(province_path):
+            continue
+        label = f"{label_prefix}/{d}" if label_prefix else d
+        for url in load_urls_from_province(province_path):
+            tasks.append((label, d, output_dir, url))
+    return tasks
+
+def _province_cost(province_path):
+    province_name = os.path.basename(province_path)
+    listing = load_listing_counts(province_path)
+    return sum(estimate_cost(province_name, url, listing) for url in load_urls_from_province(province_path))
+
 def run_mode1(input_dir, output_dir, max_workers, max_runtime_minutes, stop_event):
     province_dirs = [os.path.join(input_dir, d) for d in os.listdir(input_dir)
                      if os.path.isdir(os.path.join(input_dir, d))]
+    if SCHEDULE_BY_COST:
+        # Mỗi tỉnh là một job của pool → tỉnh đắt nhất (tổng chi phí ước lượng) nộp trước
+        province_dirs.sort(key=lambda p: -_province_cost(p))
 
     tasks = [(p, output_dir, max_workers, stop_event, i % max_workers)
              for i, p in enumerate(province_dirs)]
 
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs()) as executor:
         futures = {executor.submit(crawl_province_mode1, task): os.path.basename(task[0]) for task in tasks}
         for future in as_completed(futures):
             if stop_event.is_set():
@@ -8,7 +8,10 @@ from config.config import (
     SUCCESS_JSON_DIR,
     TIMEOUT_ERROR_DIR_ROOT,
     CRAWLER_AGAIN_ROOT_DIR,
+    CRAWL_FRONTIER_DB,
 )
+from config.settings import USE_FRONTIER
+from core.frontier import CrawlFrontier, STATUS_INVALID, STATUS_PENDING
 from utils.helpers import ensure_dir
 
 
@@ -175,5 +178,55 @@ def generate_crawl_again_final(main_error_dir: str):
     print("="*100)
 
 
+def mark_invalid_in_frontier(frontier: CrawlFrontier, main_error_dir: str) -> int:
+    """JSON lỗi do checker copy ra → status invalid trong frontier (chỉ duyệt thư mục lỗi, không duyệt data)"""
+    count = 0
+    for province in sorted(os.listdir(main_error_dir)):
+        error_dir = os.path.join(main_error_dir, province)
+        if not os.path.isdir(error_dir):
+            continue
+        for json_file in os.listdir(error_dir):
+            if json_file.endswith(".json"):
+                frontier.mark_failed(json_to_url(json_file), STATUS_INVALID, "JSON lỗi (checker)")
+                count += 1
+    return count
+
+
+def generate_crawl_again_from_frontier(main_error_dir: str):
+    """Bản frontier của generate_crawl_again_final: danh sách crawl lại = query status, không quét filesystem"""
+    frontier = CrawlFrontier(CRAWL_FRONTIER_DB)
+    try:
+        if os.path.exists(main_error_dir):
+            print(f"Đánh dấu invalid: {mark_invalid_in_frontier(frontier, main_error_dir):,} URL")
+
+        # Error JSON → bắt buộc crawl lại; timeout giữ nguyên (giống "Timeout Permanent")
+        requeued = frontier.requeue((STATUS_INVALID,))
+        print(f"Đưa về pending: {requeued:,} URL invalid")
+
+        if os.path.exists(CRAWLER_AGAIN_ROOT_DIR):
+            import shutil
+            shutil.rmtree(CRAWLER_AGAIN_ROOT_DIR)
+
+        total_links = 0
+        for province, counts in sorted(frontier.stats_by_province().items()):
+            urls = frontier.urls_by_status(STATUS_PENDING, province)
+            if not urls:
+                continue
+            prov_dir = os.path.join(CRAWLER_AGAIN_ROOT_DIR, province)
+            ensure_dir(prov_dir)
+            with open(os.path.join(prov_dir, f"{province}_hotel_links.txt"), 'w', encoding='utf-8') as f:
+                for url in urls:
+                    f.write(url + "\n")
+            total_links += len(urls)
+            print(f"{province:35} → {len(urls):,} link cần crawl lại | {counts}")
+
+        print(f"TỔNG LINK CẦN CRAWL  : {total_links:,} | {frontier.stats()}")
+    finally:
+        frontier.close()
+
+
 def run_crawl_again_generator(main_error_dir: str):
-    generate_crawl_again_final(main_error_dir)
\ No newline at end of file
+    if USE_FRONTIER:
+        generate_crawl_again_from_frontier(main_error_dir)
+    else:
+        generate_crawl_again_final(main_error_dir)
\ No newline at end of file
@@ -0,0 +1,109 @@
+# utils/crawl_cost.py
+# Ước lượng chi phí crawl mỗi khách sạn (số trang phải tải ≈ 1 trang khách sạn + số trang review)
+# để xếp lịch longest-job-first: khách sạn nhiều review chạy trước, khách sạn nhỏ lấp chỗ trống ở cuối
+# → các worker kết thúc gần như cùng lúc thay vì một worker "xui" ôm mấy khách sạn 2.000 review.
+#
+# Nguồn ước lượng (ưu tiên theo thứ tự):
+#   1. total_rating trong JSON đã crawl trước đó (SUCCESS_JSON_DIR)
+#   2. Số review trên trang kết quả tìm kiếm: <tỉnh>_review_counts.json cạnh file link (crawler_province)
+#   3. SCHEDULE_DEFAULT_REVIEWS
+
+import heapq
+import json
+import logging
+import math
+import os
+import re
+
+from config.config import SUCCESS_JSON_DIR
+from config.settings import SCHEDULE_DEFAULT_REVIEWS
+from utils.file_utils import hotel_json_path
+
+LISTING_COUNTS_SUFFIX = "_review_counts.json"
+REVIEWS_PER_PAGE = 10  # Booking hiển thị 10 review mỗi trang (cả Selenium lẫn reviewlist HTTP)
+_TOTAL_RATING_RE = re.compile(r'"total_rating":\s*"?(\d+)')
+_HEAD_CHARS = 64 * 1024  # total_rating nằm trước "reviews" → không cần parse cả file JSON nhiều MB
+
+
+def _url_key(url):
+    return url.strip().split("?")[0].split("#")[0]
+
+
+def load_listing_counts(directory):
+    """{url: số review} từ mọi *_review_counts.json trong directory (đệ quy)"""
+    counts = {}
+    if not directory or not os.path.isdir(directory):
+        return counts
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(LISTING_COUNTS_SUFFIX):
+                continue
+            path = os.path.join(root, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"[SCHEDULE] Không đọc được {path}: {e}")
+                continue
+            counts.update({_url_key(url): n for url, n in data.items() if isinstance(n, int)})
+    return counts
+
+
+def stored_review_count(province_name, url, json_dir=SUCCESS_JSON_DIR):
+    """total_rating của lần crawl trước, hoặc None"""
+    path = hotel_json_path(json_dir, province_name.strip(), url.strip())
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            head = f.read(_HEAD_CHARS)
+    except (OSError, UnicodeDecodeError):
+        return None
+    match = _TOTAL_RATING_RE.search(head)
+    return int(match.group(1)) if match else None
+
+
+def estimate_cost(province_name, url, listing_counts=None):
+    """Số trang ước lượng: 1 trang khách sạn + ceil(review / số review mỗi trang)"""
+    reviews = stored_review_count(province_name, url)
+    if reviews is None and listing_counts:
+        reviews = listing_counts.get(_url_key(url))
+    if reviews is None:
+        reviews = SCHEDULE_DEFAULT_REVIEWS
+    return 1 + math.ceil(reviews / REVIEWS_PER_PAGE)
+
+
+def task_costs(tasks, listing_dirs=()):
+    """tasks [(label, province, output_dir, url), ...] → {url: chi phí}"""
+    listing = {}
+    for directory in listing_dirs:
+        listing.update(load_listing_counts(directory))
+    return {url: estimate_cost(province, url, listing) for _, province, _, url in tasks}
+
+
+def longest_first(tasks, costs):
+    """Sắp xếp giảm dần theo chi phí (ổn định: cùng chi phí giữ thứ tự file)"""
+    return sorted(tasks, key=lambda t: -costs.get(t[3], 0))
+
+
+def balance_chunks(items, n_chunks, cost):
+    """
+    LPT: gán lần lượt item đắt nhất cho chunk đang nhẹ nhất.
+    Trả về n_chunks list, mỗi list đã sắp xếp giảm dần theo chi phí.
+    """
+    chunks = [[] for _ in range(n_chunks)]
+    heap = [(0, i) for i in range(n_chunks)]
+    for item in sorted(items, key=cost, reverse=True):
+        load, i = heapq.heappop(heap)
+        chunks[i].append(item)
+        heapq.heappush(heap, (load + cost(item), i))
+    return chunks
+
+
+def log_schedule(tasks, costs, logger=None):
+    logger = logger or logging.getLogger("Schedule")
+    if not tasks:
+        return
+    total = sum(costs.get(t[3], 0) for t in tasks)
+    biggest = max(tasks, key=lambda t: costs.get(t[3], 0))
+    logger.info(f"[SCHEDULE] {len(tasks)} khách sạn ≈ {total} trang | lớn nhất ≈ {costs.get(biggest[3], 0)} trang: {biggest[3]}")
@@ -2,8 +2,8 @@
 from selenium import webdriver
 from selenium.webdriver.edge.options import Options
 from config.settings import USER_AGENT, HEADLESS, IMPLICIT_WAIT, SCREEN_WIDTH, SCREEN_HEIGHT
-import time
-import random
+from core.resource_blocker import configure_options, apply_blocking
+from core.session_cache import bootstrap_session
 
 def create_driver(worker_index, max_workers):
     options = Options()
@@ -17,10 +17,12 @@ def create_driver(worker_index, max_workers):
     options.add_argument("--log-level=3")
     options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
     options.add_experimental_option('useAutomationExtension', False)
+    configure_options(options)
 
     driver = webdriver.Edge(options=options)
     driver.implicitly_wait(IMPLICIT_WAIT)
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    apply_blocking(driver)
 
     # === CHIA MÀN HÌNH ===
     cols = min(3, max_workers)
@@ -35,8 +37,7 @@ def create_driver(worker_index, max_workers):
 
     driver.set_window_rect(x=x, y=y, width=cell_w, height=cell_h)
 
-    # === VÀO TRANG CHỦ ===
-    driver.get("https://www.booking.com")
-    time.sleep(random.uniform(2.0, 4.0))
+    # === COOKIE ĐÃ CACHE, KHÔNG CÓ THÌ VÀO TRANG CHỦ ===
+    bootstrap_session(driver, f"worker-{worker_index}")
 
     return driver
\ No newline at end of file
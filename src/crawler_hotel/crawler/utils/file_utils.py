@@ -15,9 +15,18 @@ def load_urls_from_province(province_path):
             print(f"Cannot read {file_path}: {e}")
     return all_urls
 
-def chunk_urls(urls, n_chunks):
+def chunk_urls(urls, n_chunks, cost=None):
+    """Chia đều theo số URL, hoặc theo chi phí ước lượng nếu có cost(url) (utils/crawl_cost, longest-job-first)"""
+    if cost is not None:
+        from utils.crawl_cost import balance_chunks
+        return balance_chunks(urls, n_chunks, cost)
     chunk_size = (len(urls) + n_chunks - 1) // n_chunks
     chunks = [urls[i:i + chunk_size] for i in range(0, len(urls), chunk_size)]
     while len(chunks) < n_chunks:
         chunks.append([])
-    return chunks
\ No newline at end of file
+    return chunks
+
+def hotel_json_path(output_dir, province_name, url):
+    """Đường dẫn JSON của một khách sạn: <output_dir>/<tỉnh>/<hotel_key>.json"""
+    hotel_key = url.split('/')[-1].split('.')[0].replace('-', '_')
+    return os.path.join(output_dir, province_name, f"{hotel_key}.json")
@@ -0,0 +1,46 @@
+# utils/html_parser.py
+# Điểm tạo BeautifulSoup duy nhất cho mọi extractor.
+# Backend lxml (C) nhanh hơn html.parser (Python thuần) nhiều lần trên trang Booking > 1 MB,
+# nhưng vẫn giữ nguyên API BeautifulSoup → các lookup data-testid / class không phải viết lại.
+
+import logging
+
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from config.settings import HTML_PARSER
+
+PARSER_BACKENDS = ("lxml", "html.parser")
+
+
+def available_backends():
+    """Các backend dùng được trong môi trường hiện tại (theo thứ tự ưu tiên)"""
+    backends = []
+    for name in PARSER_BACKENDS:
+        try:
+            BeautifulSoup("", name)
+            backends.append(name)
+        except FeatureNotFound:
+            pass
+    return backends
+
+
+_resolved = {}
+
+
+def resolve_parser(name=None):
+    """'auto' → backend nhanh nhất đã cài. Backend không có → fallback html.parser"""
+    name = name or HTML_PARSER
+    if name not in _resolved:
+        backends = available_backends()
+        if name == "auto":
+            _resolved[name] = backends[0]
+        elif name in backends:
+            _resolved[name] = name
+        else:
+            logging.warning(f"Parser '{name}' chưa được cài → dùng html.parser")
+            _resolved[name] = "html.parser"
+    return _resolved[name]
+
+
+def make_soup(html, parser=None) -> BeautifulSoup:
+    return BeautifulSoup(html, resolve_parser(parser))
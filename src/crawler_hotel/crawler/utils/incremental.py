@@ -0,0 +1,44 @@
+# utils/incremental.py
+# Hỗ trợ crawl incremental: đọc JSON khách sạn đã lưu (SUCCESS_JSON_DIR),
+# dựng tập fingerprint review và gộp review mới vào file cũ.
+
+import json
+import logging
+import os
+
+from config.config import SUCCESS_JSON_DIR
+from utils.file_utils import hotel_json_path
+from utils.review_extractor import review_fingerprint
+
+
+def stored_hotel_path(province_name, url):
+    return hotel_json_path(SUCCESS_JSON_DIR, province_name, url)
+
+
+def load_stored_hotel(path):
+    """JSON khách sạn đã lưu, hoặc None nếu chưa có / file hỏng"""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Không đọc được {path}: {e} → crawl lại toàn bộ")
+        return None
+
+
+def seen_fingerprints(hotel_data):
+    return {review_fingerprint(r) for r in hotel_data.get("reviews") or []}
+
+
+def merge_reviews(new_reviews, stored_reviews):
+    """Review mới (mới nhất) đứng trước review cũ, bỏ trùng theo fingerprint"""
+    merged = []
+    seen = set()
+    for review in list(new_reviews) + list(stored_reviews or []):
+        fp = review_fingerprint(review)
+        if fp in seen:
+            continue
+        seen.add(fp)
+        merged.append(review)
+    return merged
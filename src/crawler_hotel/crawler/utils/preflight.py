@@ -0,0 +1,241 @@
+# utils/preflight.py
+# Kiểm tra sống / chết URL khách sạn bằng HTTP thuần TRƯỚC khi trình duyệt đụng tới hàng đợi:
+# một GET (theo redirect) cho mỗi URL, chạy song song PREFLIGHT_WORKERS luồng qua token bucket RIÊNG
+# (PREFLIGHT_RPS): preflight chạy xong mới tới crawl nên không cộng dồn với RATE_LIMIT_RPS, và bị chặn
+# lúc preflight chỉ giảm rate của preflight, không để lại rate thấp / breaker mở cho crawl.
+# Là một lượt chặn trước crawl (≈ số URL / PREFLIGHT_RPS giây) → mặc định tắt (PREFLIGHT).
+#   - 404 / 410, hoặc bị chuyển về trang không phải /hotel/ (trang chủ, kết quả tìm kiếm) → removed
+#   - bị chuyển sang khách sạn khác (đổi pagename)                                      → redirected
+#   - HTTP 200, CHẮC CHẮN là trang khách sạn (có tên khách sạn) nhưng không có review-score-component → no_score
+#   - captcha / trang thử thách JS (202) / 429 / lỗi mạng / 5xx / trang không nhận ra → unknown:
+#     KHÔNG kết luận, để trình duyệt thử như cũ
+# URL chết bị loại ngay (dead-letter hoặc status invalid trong frontier) thay vì tốn 4 × 15 s WebDriverWait.
+#
+# Test local: python -m utils.preflight  (kiểm tra mọi trường hợp trên với server giả lập; PREFLIGHT_BASE_URL tương tự)
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, urlunparse
+
+import requests
+
+from core.frontier import STATUS_PENDING, STATUS_INVALID
+from utils.rate_limiter import TokenBucket, is_blocked_response
+from utils.retry_policy import push_dead_letter
+from utils.review_http import USER_AGENT, hotel_pagename
+from utils.telemetry import timed, incr
+from config.settings import (
+    PREFLIGHT_WORKERS, PREFLIGHT_TIMEOUT, PREFLIGHT_BASE_URL, PREFLIGHT_SKIP_NO_SCORE,
+    PREFLIGHT_RPS, PREFLIGHT_BURST,
+)
+
+ALIVE = "alive"
+REMOVED = "removed"
+REDIRECTED = "redirected"
+NO_SCORE = "no_score"
+UNKNOWN = "unknown"
+
+REVIEW_SCORE_MARKER = 'data-testid="review-score-component"'
+HOTEL_PAGE_MARKERS = ("hp_hotel_name", "PropertyHeaderName")  # Tên khách sạn: giao diện cũ / mới
+_local = threading.local()
+_bucket = None
+_bucket_lock = threading.Lock()
+
+
+def _preflight_bucket():
+    """Token bucket riêng của preflight (trong process, dùng chung cho các luồng preflight)"""
+    global _bucket
+    with _bucket_lock:
+        if _bucket is None:
+            _bucket = TokenBucket(rps=PREFLIGHT_RPS, burst=PREFLIGHT_BURST, name="PREFLIGHT")
+    return _bucket
+
+
+def _session():
+    """Mỗi luồng một requests.Session (Session không an toàn khi dùng chung giữa các luồng)"""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "vi-VN,vi;q=0.9"})
+    return _local.session
+
+
+def rebase(url, base_url=PREFLIGHT_BASE_URL):
+    """Đổi scheme + host sang base_url (server giả lập); None → giữ nguyên"""
+    if not base_url:
+        return url
+    base = urlparse(base_url)
+    return urlunparse(urlparse(url)._replace(scheme=base.scheme, netloc=base.netloc))
+
+
+def is_dead(verdict):
+    return verdict in (REMOVED, REDIRECTED) or (verdict == NO_SCORE and PREFLIGHT_SKIP_NO_SCORE)
+
+
+def check_url(url, timeout=PREFLIGHT_TIMEOUT, base_url=PREFLIGHT_BASE_URL, session=None):
+    """→ (verdict, chi tiết)"""
+    target = rebase(url.strip(), base_url) + "?lang=vi"
+    bucket = _preflight_bucket()
+    with timed("throttle_wait"):
+        bucket.acquire()
+    try:
+        with timed("preflight"):
+            resp = (session or _session()).get(target, timeout=timeout, allow_redirects=True)
+    except requests.RequestException as e:
+        if isinstance(e, requests.Timeout):
+            bucket.report_throttled("timeout")
+        return UNKNOWN, type(e).__name__
+
+    if is_blocked_response(resp.status_code, resp.text):
+        bucket.report_throttled(f"HTTP {resp.status_code}")
+        return UNKNOWN, f"HTTP {resp.status_code} bị chặn"
+    bucket.report_ok()
+    if resp.status_code in (404, 410):
+        return REMOVED, f"HTTP {resp.status_code}"
+    if resp.status_code >= 400:
+        return UNKNOWN, f"HTTP {resp.status_code}"
+
+    final_path = urlparse(resp.url).path
+    if "/hotel/" not in final_path:
+        return REMOVED, f"chuyển về {final_path or '/'}"
+    if hotel_pagename(resp.url) != hotel_pagename(url):
+        return REDIRECTED, f"chuyển sang {resp.url.split('?')[0]}"
+    if REVIEW_SCORE_MARKER in resp.text:
+        return ALIVE, ""
+    # Thiếu điểm review chỉ có nghĩa trên trang khách sạn thật đã render đủ (không phải trang trung gian / thử thách)
+    if resp.status_code == 200 and any(marker in resp.text for marker in HOTEL_PAGE_MARKERS):
+        return NO_SCORE, "không có review-score-component"
+    return UNKNOWN, f"HTTP {resp.status_code}, không nhận ra trang khách sạn"
+
+
+def run_preflight(urls, stop_event=None, workers=PREFLIGHT_WORKERS, base_url=PREFLIGHT_BASE_URL):
+    """{url: (verdict, chi tiết)} cho mọi URL (URL chưa kịp kiểm tra khi stop_event → không có trong kết quả)"""
+    def check(url):
+        if stop_event is not None and stop_event.is_set():
+            return url, None
+        return url, check_url(url, base_url=base_url)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for url, result in executor.map(check, list(dict.fromkeys(urls))):
+            if result is None:
+                continue
+            results[url] = result
+            incr(f"preflight_{result[0]}")
+
+    counts = {}
+    for verdict, _ in results.values():
+        counts[verdict] = counts.get(verdict, 0) + 1
+    logging.info(f"[PREFLIGHT] {len(results)} URL | {counts}")
+    return results
+
+
+def preflight_tasks(tasks, stop_event=None):
+    """
+    tasks [(label, province, output_dir, url), ...] → chỉ giữ URL chưa chết.
+    URL chết được ghi dead-letter (attempts = 0: trình duyệt chưa thử lần nào).
+    """
+    results = run_preflight([t[3] for t in tasks], stop_event)
+    alive = []
+    for task in tasks:
+        verdict, detail = results.get(task[3], (UNKNOWN, ""))
+        if is_dead(verdict):
+            push_dead_letter(task[3], verdict, f"preflight: {detail}", 0, task[1])
+        else:
+            alive.append(task)
+    logging.info(f"[PREFLIGHT] Loại {len(tasks) - len(alive)}/{len(tasks)} URL chết trước khi crawl")
+    return alive
+
+
+def preflight_frontier(frontier, stop_event=None):
+    """Kiểm tra mọi URL pending của frontier, URL chết → status invalid. Trả về số URL bị loại"""
+    results = run_preflight(frontier.urls_by_status(STATUS_PENDING), stop_event)
+    dead = 0
+    for url, (verdict, detail) in results.items():
+        if is_dead(verdict):
+            frontier.mark_failed(url, STATUS_INVALID, f"preflight {verdict}: {detail}")
+            dead += 1
+    logging.info(f"[PREFLIGHT] Frontier: loại {dead}/{len(results)} URL pending")
+    return dead
+
+
+# =============================================================================
+# SERVER GIẢ LẬP (test local các trường hợp sống / chết)
+# =============================================================================
+
+STAND_IN_PAGES = {
+    "/hotel/vn/alive.html": (200, '<html lang="vi"><h2 data-testid="PropertyHeaderName">Khách sạn A</h2>'
+                                  f'<div {REVIEW_SCORE_MARKER}>8,5</div></html>'),
+    "/hotel/vn/no-score.html": (200, '<html lang="vi"><h2 class="hp_hotel_name">Khách sạn mới</h2></html>'),
+    "/hotel/vn/gone.html": (404, "<title>Page not found</title>"),
+    "/hotel/vn/delisted.html": (301, "/searchresults.vi.html?dest_type=city"),
+    "/hotel/vn/merged.html": (301, "/hotel/vn/alive.html"),
+    "/hotel/vn/blocked.html": (200, "<title>Are you a robot?</title>"),
+    "/hotel/vn/challenge.html": (202, '<html><script src="/challenge.js"></script></html>'),
+    "/hotel/vn/interstitial.html": (200, '<html lang="vi"><div id="app"></div></html>'),
+    "/searchresults.vi.html": (200, "<html>Kết quả tìm kiếm</html>"),
+}
+
+# Verdict mong đợi cho từng trang giả lập (python -m utils.preflight kiểm tra bằng assert)
+STAND_IN_EXPECTED = {
+    "/hotel/vn/alive.html": ALIVE,
+    "/hotel/vn/no-score.html": NO_SCORE,
+    "/hotel/vn/gone.html": REMOVED,
+    "/hotel/vn/delisted.html": REMOVED,
+    "/hotel/vn/merged.html": REDIRECTED,
+    "/hotel/vn/blocked.html": UNKNOWN,
+    "/hotel/vn/challenge.html": UNKNOWN,
+    "/hotel/vn/interstitial.html": UNKNOWN,
+    "/hotel/vn/never-existed.html": REMOVED,
+}
+
+
+def serve_stand_in(pages=None, port=0):
+    """
+    Server local thay cho booking.com: pages {path: (status, body | Location nếu 3xx)}, path lạ → 404.
+    Dùng: đặt PREFLIGHT_BASE_URL = "http://127.0.0.1:<port>" (hoặc truyền base_url) rồi serve_forever().
+    """
+    pages = pages or STAND_IN_PAGES
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, payload = pages.get(urlparse(self.path).path, (404, "<title>404</title>"))
+            if 300 <= status < 400:
+                self.send_response(status)
+                self.send_header("Location", payload)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = payload.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return HTTPServer(("127.0.0.1", port), _Handler)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    server = serve_stand_in()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        results = run_preflight([f"https://www.booking.com{path}" for path in STAND_IN_EXPECTED], base_url=base)
+    finally:
+        server.shutdown()
+    for path, expected in STAND_IN_EXPECTED.items():
+        verdict, detail = results[f"https://www.booking.com{path}"]
+        print(f"{verdict:<11} {path} {detail}")
+        assert verdict == expected, f"{path}: {verdict} != {expected} ({detail})"
+    assert not is_dead(UNKNOWN) and is_dead(REMOVED) and is_dead(REDIRECTED)
+    # Trang bị chặn chỉ giảm bucket của preflight, rate của crawl giữ nguyên
+    from utils.rate_limiter import get_rate_limiter
+    from config.settings import RATE_LIMIT_RPS
+    assert _preflight_bucket().rate < PREFLIGHT_RPS and get_rate_limiter().rate == RATE_LIMIT_RPS
+    print("OK")
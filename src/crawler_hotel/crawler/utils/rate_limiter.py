@@ -0,0 +1,176 @@
+# utils/rate_limiter.py
+# Điểm DUY NHẤT áp dụng delay lịch sự trước mỗi request tới booking.com.
+# Mọi luồng fetch gọi throttle() thay vì tự time.sleep(random.uniform(...)).
+#
+# Token bucket dùng chung cho MỌI process: trạng thái nằm trong Manager().dict() + Manager().Lock(),
+# được gắn vào từng worker qua initializer của ProcessPoolExecutor (xem pool_kwargs()).
+# Khi gặp timeout / 429 / captcha → giảm rate; mỗi request thành công → tăng dần trở lại.
+# Circuit breaker trên cùng bucket: tỉ lệ lỗi (report_throttled / tổng report) trong cửa sổ BREAKER_WINDOW_SECONDS
+# vượt BREAKER_FAILURE_RATE → MỌI worker dừng ở throttle() trong BREAKER_OPEN_SECONDS, sau đó chạy lại từ RATE_LIMIT_MIN_RPS.
+
+import logging
+import random
+import threading
+import time
+
+from utils.telemetry import timed, incr
+from config.settings import (
+    RATE_LIMIT_RPS, RATE_LIMIT_BURST, RATE_LIMIT_MIN_RPS,
+    RATE_LIMIT_BACKOFF, RATE_LIMIT_RECOVER, POLITENESS_JITTER,
+    BREAKER_WINDOW_SECONDS, BREAKER_MIN_REQUESTS, BREAKER_FAILURE_RATE, BREAKER_OPEN_SECONDS,
+)
+
+_MAX_SLEEP = 0.5  # Ngủ từng đoạn ngắn để kịp nhận stop_event
+
+
+class TokenBucket:
+    """
+    state: dict (thường) hoặc DictProxy của Manager; lock: threading.Lock hoặc Manager().Lock().
+    Cùng một class cho cả bản trong process và bản chia sẻ giữa các process.
+    rps / burst / name: bucket riêng cho một giai đoạn khác (ví dụ preflight) không đụng tới bucket crawl.
+    """
+
+    def __init__(self, state=None, lock=None, rps=RATE_LIMIT_RPS, burst=RATE_LIMIT_BURST, name="RATE"):
+        self.state = state if state is not None else {}
+        self.lock = lock or threading.Lock()
+        self.rps = float(rps)
+        self.burst = float(burst)
+        self.name = name
+        with self.lock:
+            if "rate" not in self.state:
+                self.state.update({
+                    "rate": self.rps,
+                    "tokens": self.burst,
+                    "updated": time.time(),
+                    "window_start": time.time(), "window_total": 0, "window_failed": 0,
+                    "open_until": 0.0,
+                })
+
+    def _take(self):
+        """Lấy 1 token nếu có. Trả về số giây phải chờ (0 = đã lấy được)"""
+        with self.lock:
+            now = time.time()
+            rate = self.state["rate"]
+            tokens = min(self.burst, self.state["tokens"] + (now - self.state["updated"]) * rate)
+            if tokens >= 1.0:
+                self.state.update({"tokens": tokens - 1.0, "updated": now})
+                return 0.0
+            self.state.update({"tokens": tokens, "updated": now})
+            return (1.0 - tokens) / rate
+
+    def _record(self, failed):
+        """Đếm kết quả vào cửa sổ hiện tại; gọi khi đang giữ lock. Trả về True nếu vừa mở breaker"""
+        now = time.time()
+        if now - self.state["window_start"] > BREAKER_WINDOW_SECONDS:
+            self.state.update({"window_start": now, "window_total": 0, "window_failed": 0})
+        total = self.state["window_total"] + 1
+        failed_count = self.state["window_failed"] + int(failed)
+        self.state.update({"window_total": total, "window_failed": failed_count})
+        if (failed and BREAKER_OPEN_SECONDS and total >= BREAKER_MIN_REQUESTS
+                and failed_count / total >= BREAKER_FAILURE_RATE and now >= self.state["open_until"]):
+            self.state.update({
+                "open_until": now + BREAKER_OPEN_SECONDS,
+                # Hết thời gian ngắt: 1 token cho request thăm dò, sau đó chạy ở rate sàn và tăng dần (report_ok)
+                "rate": float(RATE_LIMIT_MIN_RPS), "tokens": 1.0, "updated": now + BREAKER_OPEN_SECONDS,
+                "window_start": now + BREAKER_OPEN_SECONDS, "window_total": 0, "window_failed": 0,
+            })
+            return True
+        return False
+
+    def breaker_wait(self):
+        """Số giây còn lại trước khi breaker đóng (0 = đang đóng, được gửi request)"""
+        return max(0.0, self.state["open_until"] - time.time())
+
+    def acquire(self, stop_event=None):
+        while not (stop_event and stop_event.is_set()):
+            wait = self.breaker_wait() or self._take()
+            if wait <= 0:
+                break
+            time.sleep(min(wait, _MAX_SLEEP))
+        if POLITENESS_JITTER:
+            time.sleep(random.uniform(0, POLITENESS_JITTER))
+
+    def report_throttled(self, reason=""):
+        """Timeout / 429 / captcha → giảm rate toàn cục và xả token đang có"""
+        with self.lock:
+            rate = max(float(RATE_LIMIT_MIN_RPS), self.state["rate"] * RATE_LIMIT_BACKOFF)
+            self.state.update({"rate": rate, "tokens": 0.0, "updated": time.time()})
+            opened = self._record(failed=True)
+        incr("throttled")
+        logging.warning(f"[{self.name}] Bị chặn/chậm ({reason}) → giảm còn {rate:.2f} req/s")
+        if opened:
+            incr("breaker_open")
+            logging.error(f"[{self.name}] Tỉ lệ lỗi ≥ {BREAKER_FAILURE_RATE:.0%} → ngắt mạch, mọi worker dừng {BREAKER_OPEN_SECONDS}s")
+
+    def report_ok(self):
+        with self.lock:
+            self._record(failed=False)
+            rate = self.state["rate"]
+            if rate < self.rps:
+                self.state["rate"] = min(self.rps, rate + RATE_LIMIT_RECOVER)
+
+    @property
+    def rate(self):
+        return self.state["rate"]
+
+
+_limiter = None
+_shared = (None, None)
+
+
+def create_shared_rate_limiter(manager):
+    """Gọi MỘT lần ở process chính: tạo bucket trên Manager và dùng luôn cho process chính"""
+    global _shared
+    _shared = (manager.dict(), manager.Lock())
+    install_rate_limiter(*_shared)
+    return _shared
+
+
+def install_rate_limiter(state=None, lock=None):
+    """Initializer của worker: gắn bucket chia sẻ (hoặc bucket riêng nếu state = None)"""
+    global _limiter
+    _limiter = TokenBucket(state, lock)
+
+
+def pool_kwargs():
+    """kwargs cho ProcessPoolExecutor để mọi worker dùng chung bucket của process chính"""
+    return {"initializer": install_rate_limiter, "initargs": _shared}
+
+
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        _limiter = TokenBucket()
+    return _limiter
+
+
+def throttle(stop_event=None):
+    with timed("throttle_wait"):
+        get_rate_limiter().acquire(stop_event)
+
+
+def report_throttled(reason=""):
+    get_rate_limiter().report_throttled(reason)
+
+
+def report_ok():
+    get_rate_limiter().report_ok()
+
+
+# Dấu hiệu CỤ THỂ của trang chặn / thử thách (không dùng chuỗi "captcha" trần: tên khách sạn, script
+# thông thường hay review cũng có thể chứa từ này → retry captcha 30–120 s + làm mới phiên oan)
+_CHALLENGE_MARKERS = (
+    "are you a robot",
+    "awswafintegration", "challenge.js", "/captcha/",      # AWS WAF challenge
+    'id="captcha-container"', "g-recaptcha", "h-captcha", "px-captcha",
+)
+
+
+def is_blocked_response(status_code=None, html=None):
+    """429 / 403 hoặc trang thử thách captcha (chỉ kiểm tra phần đầu HTML cho rẻ)"""
+    if status_code in (403, 429):
+        return True
+    if html:
+        head = html[:5000].lower()
+        return any(marker in head for marker in _CHALLENGE_MARKERS)
+    return False
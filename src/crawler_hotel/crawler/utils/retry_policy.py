@@ -0,0 +1,191 @@
+# utils/retry_policy.py
+# MỘT chính sách retry cho mọi luồng crawl trang khách sạn (BookingCrawler, parallel_by_url, province_worker):
+# - Phân loại lỗi: timeout, element_timeout, captcha, trang đã gỡ, lỗi parse, driver crash (còn lại: unknown)
+# - Mỗi loại có số lần thử + backoff lũy thừa có jitter riêng (settings.RETRY_POLICY)
+# - CHỈ timeout tải trang / mạng và captcha báo về rate_limiter → giảm rate và (nếu tỉ lệ lỗi tăng vọt) ngắt mạch
+#   cho mọi worker. WebDriverWait hết giờ trên trang đã tải xong (element_timeout, ví dụ khách sạn không có
+#   review-score-component) không phải dấu hiệu bị giới hạn → chỉ retry, không đụng tới rate chung
+# - Hết lượt → ghi dead-letter kèm lý do: <DEAD_LETTER_DIR>/dead-<host>-<pid>.jsonl (mỗi process một file, không cần khóa)
+#
+# Dùng:
+#   policy = RetryPolicy(stop_event, logger)
+#   except Exception as e:
+#       error_class = classify_error(e, *page_state(driver))
+#       attempt += 1
+#       if policy.on_failure(url, error_class, e, attempt, province): continue   # đã chờ backoff
+#       ...                                                                    # đã vào dead-letter
+
+import json
+import logging
+import os
+import random
+import re
+import socket
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from utils.rate_limiter import report_throttled, is_blocked_response
+from utils.telemetry import timed, incr
+from config.config import DEAD_LETTER_DIR
+from config.settings import RETRY_POLICY
+
+TIMEOUT = "timeout"
+ELEMENT_TIMEOUT = "element_timeout"
+CAPTCHA = "captcha"
+REMOVED = "removed"
+PARSE_ERROR = "parse_error"
+DRIVER_CRASH = "driver_crash"
+UNKNOWN = "unknown"
+
+# Loại lỗi → status trong frontier / last_result (core/frontier)
+FAILURE_STATUS = {
+    TIMEOUT: "timeout", ELEMENT_TIMEOUT: "timeout", CAPTCHA: "timeout", DRIVER_CRASH: "timeout",
+    REMOVED: "invalid", PARSE_ERROR: "invalid", UNKNOWN: "invalid",
+}
+
+_DRIVER_CRASH_MARKERS = (
+    "invalid session id", "session deleted", "no such window", "target window already closed",
+    "disconnected", "not reachable", "connection refused", "max retries exceeded", "tab crashed",
+)
+# Timeout do chính msedgedriver báo (page load / script / renderer); WebDriverWait raise TimeoutException không kèm msg này
+_DRIVER_TIMEOUT_MARKERS = ("timeout", "timed out")
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+# Tiêu đề trang lỗi của Booking: "404 Not Found", "Page not found", "Không tìm thấy trang"... – khớp ĐẦU tiêu đề,
+# tiêu đề khách sạn luôn bắt đầu bằng tên khách sạn (tên có thể chứa "404" hay "không tìm thấy")
+_REMOVED_TITLE_RE = re.compile(r"^(?:(?:error\s*)?404\b|page not found|không tìm thấy trang)")
+
+
+def page_state(driver):
+    """(current_url, page_source) để phân loại lỗi; (None, None) nếu driver đã chết"""
+    try:
+        return driver.current_url, driver.page_source
+    except Exception:
+        return None, None
+
+
+def is_removed_page(url, html, status_code=None):
+    """
+    Khách sạn đã gỡ: HTTP 404 / 410 (nếu biết status), Booking chuyển về trang kết quả tìm kiếm,
+    hoặc trang lỗi 404 (tiêu đề bắt đầu bằng dấu hiệu trang lỗi)
+    """
+    if status_code in (404, 410):
+        return True
+    path = (url or "").split("?")[0]
+    if "/searchresults" in path:
+        return True
+    match = _TITLE_RE.search((html or "")[:20000])
+    title = " ".join(match.group(1).split()).lower() if match else ""
+    return bool(_REMOVED_TITLE_RE.match(title))
+
+
+def is_element_wait_timeout(exc, html=None):
+    """TimeoutException của WebDriverWait (phần tử không xuất hiện) trên một trang đã tải được HTML"""
+    if not isinstance(exc, TimeoutException) or not html:
+        return False
+    message = (exc.msg or "").lower()
+    return not any(marker in message for marker in _DRIVER_TIMEOUT_MARKERS)
+
+
+def classify_error(exc, url=None, html=None):
+    """Exception + trạng thái trang lúc lỗi → một trong các loại lỗi ở trên"""
+    if isinstance(exc, WebDriverException) and not isinstance(exc, TimeoutException):
+        message = (exc.msg or str(exc)).lower()
+        if any(marker in message for marker in _DRIVER_CRASH_MARKERS):
+            return DRIVER_CRASH
+    if url is None and isinstance(exc, (OSError, WebDriverException)) and not isinstance(exc, TimeoutException):
+        return DRIVER_CRASH  # Không nói chuyện được với msedgedriver / không mở lại được phiên
+    if html and is_blocked_response(None, html):
+        return CAPTCHA
+    if is_removed_page(url, html):
+        return REMOVED
+    if is_element_wait_timeout(exc, html):
+        return ELEMENT_TIMEOUT
+    if isinstance(exc, TimeoutException):
+        return TIMEOUT
+    if isinstance(exc, (ValueError, AttributeError, IndexError, KeyError, TypeError)):
+        return PARSE_ERROR
+    return UNKNOWN
+
+
+def dead_letter_path(directory=DEAD_LETTER_DIR):
+    return os.path.join(directory, f"dead-{socket.gethostname()}-{os.getpid()}.jsonl")
+
+
+def push_dead_letter(url, error_class, error, attempts, province=None, directory=DEAD_LETTER_DIR):
+    record = {
+        "url": url.strip(), "province": province, "error_class": error_class,
+        "error": str(error)[:500], "attempts": attempts, "time": time.time(),
+    }
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(dead_letter_path(directory), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logging.warning(f"[RETRY] Không ghi được dead-letter: {e}")
+
+
+def load_dead_letters(directory=DEAD_LETTER_DIR):
+    """Mọi bản ghi dead-letter (mọi process, mọi lần chạy), bản ghi sau cùng của mỗi URL thắng"""
+    records = {}
+    if not os.path.isdir(directory):
+        return []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl"):
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Dòng ghi dở khi process bị kill
+                if record["url"] not in records or record["time"] >= records[record["url"]]["time"]:
+                    records[record["url"]] = record
+    return sorted(records.values(), key=lambda r: r["time"])
+
+
+class RetryPolicy:
+    def __init__(self, stop_event=None, logger=None, policy=None):
+        self.stop_event = stop_event
+        self.logger = logger or logging.getLogger("Retry")
+        self.policy = policy or RETRY_POLICY
+
+    def max_retries(self, error_class):
+        return self.policy.get(error_class, self.policy[UNKNOWN]).get("retries", 0)
+
+    def backoff(self, error_class, attempt):
+        """Giây chờ trước lần thử lại thứ `attempt` (1, 2, ...): ngẫu nhiên trong [base, min(cap, base * 2^(attempt-1))]"""
+        rule = self.policy.get(error_class, self.policy[UNKNOWN])
+        base = rule.get("base", 0.0)
+        return random.uniform(base, min(rule.get("cap", base), base * 2 ** (attempt - 1)))
+
+    def _sleep(self, seconds):
+        with timed("sleep"):
+            if self.stop_event is not None:
+                self.stop_event.wait(seconds)
+            else:
+                time.sleep(seconds)
+
+    def on_failure(self, url, error_class, error, attempt, province=None):
+        """
+        Ghi nhận lần thất bại thứ `attempt` của url. True → đã chờ backoff, gọi lại;
+        False → hết lượt (đã ghi dead-letter) hoặc đang dừng.
+        """
+        incr(f"error_{error_class}")
+        if error_class in (TIMEOUT, CAPTCHA):
+            # Giảm rate + nuôi circuit breaker. ELEMENT_TIMEOUT cố ý không báo: trang đã tải, chỉ thiếu phần tử
+            report_throttled(f"{error_class} {url}")
+
+        retries = self.max_retries(error_class)
+        if attempt <= retries and not (self.stop_event and self.stop_event.is_set()):
+            delay = self.backoff(error_class, attempt)
+            self.logger.warning(f"{error_class} retry {attempt}/{retries} sau {delay:.1f}s: {url}")
+            self._sleep(delay)
+            return True
+
+        if self.stop_event and self.stop_event.is_set():
+            return False
+        self.logger.error(f"{error_class} hết lượt ({attempt} lần) → dead-letter: {url} | {error}")
+        incr("dead_letters")
+        push_dead_letter(url, error_class, error, attempt, province)
+        return False
@@ -0,0 +1,106 @@
+# utils/review_checkpoint.py
+# Checkpoint phân trang review cho từng khách sạn: trang / offset đã xong, bộ lọc (ngôn ngữ + sắp xếp)
+# và toàn bộ review đã thu thập. Ghi mỗi REVIEW_CHECKPOINT_EVERY trang và khi timeout / stop_event,
+# lần retry hoặc worker khởi động lại tiếp tục từ checkpoint thay vì quay về trang 1.
+# File: <REVIEW_CHECKPOINT_DIR>/<tỉnh>/<hotel_key>.json – xóa khi khách sạn đã lưu xong.
+
+import json
+import logging
+import os
+import time
+
+from config.config import REVIEW_CHECKPOINT_DIR, SELECT_LANGUAGE
+from config.settings import REVIEW_CHECKPOINT_EVERY, REVIEW_LIST_PARAMS
+from utils.file_utils import hotel_json_path
+from utils.review_extractor import review_fingerprint, REVIEW_SORT
+
+BACKEND_SELENIUM = "selenium"
+BACKEND_HTTP = "http"
+
+
+class ReviewCheckpoint:
+    """every = 0 → không đọc / ghi file, chỉ giữ review trong RAM (hành vi cũ)"""
+
+    def __init__(self, province_name, url, backend=BACKEND_SELENIUM,
+                 every=REVIEW_CHECKPOINT_EVERY, checkpoint_dir=REVIEW_CHECKPOINT_DIR):
+        self.path = hotel_json_path(checkpoint_dir, province_name, url)
+        self.url = url.split("#")[0].split("?")[0]
+        self.backend = backend
+        self.every = every
+        self.filters = {"language": SELECT_LANGUAGE, "sort": REVIEW_SORT, "http_params": REVIEW_LIST_PARAMS}
+        self.page = 0        # Số trang đã xong với backend hiện tại
+        self.offset = 0      # Số review đã đi qua (kể cả review cũ khi incremental) – dùng cho backend HTTP
+        self.reviews = []
+        self.restored = set()  # Fingerprint review nạp từ checkpoint → bỏ trùng khi trang bị dịch do review mới
+        self._pending_pages = 0
+
+    @property
+    def enabled(self):
+        return bool(self.every)
+
+    def load(self):
+        """Nạp checkpoint nếu cùng bộ lọc. Trả về True nếu có gì để tiếp tục"""
+        if not self.enabled or not os.path.isfile(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"[CHECKPOINT] Không đọc được {self.path}: {e} → crawl từ trang 1")
+            return False
+        if data.get("filters") != self.filters:
+            logging.info(f"[CHECKPOINT] Bộ lọc review đã đổi → bỏ checkpoint {self.path}")
+            self.clear()
+            return False
+
+        self.reviews = data.get("reviews") or []
+        self.restored = {review_fingerprint(r) for r in self.reviews}
+        if data.get("backend") == self.backend:
+            self.page = data.get("page", 0)
+            self.offset = data.get("offset", 0)
+        logging.info(f"[CHECKPOINT] Tiếp tục {self.url}: {len(self.reviews)} review, trang {self.page}")
+        return bool(self.reviews or self.page)
+
+    def switch_backend(self, backend):
+        """Đổi backend giữa chừng (HTTP lỗi → Selenium): giữ review, phân trang bắt đầu lại"""
+        self.backend = backend
+        self.page = 0
+        self.offset = 0
+        self.restored = {review_fingerprint(r) for r in self.reviews}
+
+    def add_page(self, page_reviews, consumed=None):
+        """
+        Ghi nhận một trang đã xong. consumed: số review trang trả về (mặc định len(page_reviews)).
+        Trả về các review thực sự mới (bỏ review đã có trong checkpoint).
+        """
+        fresh = [r for r in page_reviews if review_fingerprint(r) not in self.restored] if self.restored else page_reviews
+        self.reviews.extend(fresh)
+        self.page += 1
+        self.offset += len(page_reviews) if consumed is None else consumed
+        self._pending_pages += 1
+        if self.enabled and self._pending_pages >= self.every:
+            self.save()
+        return fresh
+
+    def save(self):
+        """Ghi nguyên tử (file tạm + os.replace). Không làm gì nếu chưa có trang mới từ lần ghi trước"""
+        if not self.enabled or not self._pending_pages:
+            return
+        data = {
+            "url": self.url, "backend": self.backend, "filters": self.filters,
+            "page": self.page, "offset": self.offset, "updated_at": time.time(),
+            "reviews": self.reviews,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._pending_pages = 0
+        except OSError as e:
+            logging.warning(f"[CHECKPOINT] Không ghi được {self.path}: {e}")
+
+    def clear(self):
+        if self.enabled and os.path.isfile(self.path):
+            os.remove(self.path)
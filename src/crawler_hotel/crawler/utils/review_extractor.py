@@ -2,9 +2,9 @@
 # Module for extracting reviews from Booking.com with robust pagination & language filtering
 
 import re
-import time
+import hashlib
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
@@ -12,7 +12,18 @@ from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, ElementNotInteractableException
 
+from utils.html_parser import make_soup
+from utils.rate_limiter import throttle
+from utils.telemetry import timed
+from core.html_archive import archive_page, KIND_REVIEWS
 from config.config import SELECT_LANGUAGE  # Giữ nguyên tên biến bạn đang dùng
+from config.settings import REVIEW_PAGE_TIMEOUT, REVIEW_FILTER_TIMEOUT
+
+REVIEW_SORT = "NEWEST_FIRST"  # Giá trị option của #reviewListSorters
+
+
+class ReviewCrawlInterrupted(Exception):
+    """stop_event được set giữa lúc phân trang review (checkpoint đã được ghi)"""
 
 
 # =============================================================================
@@ -42,10 +53,48 @@ def convert_vietnamese_date_to_standard(date_str: Optional[str]) -> Optional[str
     return None
 
 
+def review_fingerprint(review: Dict) -> Tuple:
+    """(reviewer name, date, title, text hash) – khóa nhận diện review đã lưu"""
+    reviewer = review.get("reviewer") or {}
+    body = review.get("review") or {}
+    text = f"{body.get('comment_positive') or ''}\n{body.get('comment_negative') or ''}"
+    return (
+        reviewer.get("name"),
+        body.get("date"),
+        body.get("rating"),
+        hashlib.sha1(text.encode("utf-8")).hexdigest(),
+    )
+
+
+def split_new_reviews(page_reviews: List[Dict], seen: Optional[Set[Tuple]]) -> Tuple[List[Dict], bool]:
+    """
+    Lọc review chưa có trong `seen`. Trả về (review_mới, trang_toàn_review_cũ).
+    seen = None → không incremental, giữ nguyên cả trang.
+    """
+    if seen is None:
+        return page_reviews, False
+    fresh = [r for r in page_reviews if review_fingerprint(r) not in seen]
+    return fresh, bool(page_reviews) and not fresh
+
+
 # =============================================================================
 # EXTRACT HOTEL NAME
 # =============================================================================
 
+def _hotel_name_from_title(full_text: str) -> Optional[str]:
+    """'Đánh giá của khách về Khách sạn ABC – ...' → 'Khách sạn ABC'"""
+    match = re.search(r"về\s+([^–\-]+)", full_text)
+    if not match:
+        return None
+    return re.sub(r"[.,\s]+$", "", match.group(1).strip())
+
+
+def extract_hotel_name_from_soup(soup: BeautifulSoup) -> Optional[str]:
+    """Bản offline của extract_hotel_name_dynamic (dùng khi replay kho HTML)"""
+    h2 = soup.select_one("h2[id$='-title']")
+    return _hotel_name_from_title(h2.get_text(strip=True)) if h2 else None
+
+
 def extract_hotel_name_dynamic(driver, timeout: int = 20) -> Optional[str]:
     """Extract hotel name from dynamic h2[id$='-title'] in reviews tab."""
     try:
@@ -57,10 +106,8 @@ def extract_hotel_name_dynamic(driver, timeout: int = 20) -> Optional[str]:
         full_text = h2.text.strip()
         logging.info(f"Tiêu đề tìm thấy: '{full_text}'")
 
-        match = re.search(r"về\s+([^–\-]+)", full_text)
-        if match:
-            name = match.group(1).strip()
-            name = re.sub(r"[.,\s]+$", "", name)
+        name = _hotel_name_from_title(full_text)
+        if name:
             logging.info(f"→ Tên khách sạn: {name}")
             return name
 
@@ -73,18 +120,68 @@ def extract_hotel_name_dynamic(driver, timeout: int = 20) -> Optional[str]:
         return None
 
 
+# =============================================================================
+# DOM SIGNALS: chờ danh sách review đổi thay vì sleep cố định
+# =============================================================================
+
+# Đánh dấu review card đầu tiên + trả về chữ ký (text) của nó, cùng trang hiện tại của pager
+_SNAPSHOT_JS = """
+const card = document.querySelector("div[data-testid='review-card']");
+const current = document.querySelector("[aria-current='page']");
+if (card) card.setAttribute('data-crawler-seen', '1');
+return [card ? card.innerText.slice(0, 300) : null, current ? current.innerText : null];
+"""
+
+# Đổi khi: card đầu là node mới (mất dấu), text card đầu khác, hoặc aria-current của pager đã chuyển
+_CHANGED_JS = """
+const [oldText, oldPage] = arguments;
+const card = document.querySelector("div[data-testid='review-card']");
+const current = document.querySelector("[aria-current='page']");
+if (!card) return false;
+if (oldText === null) return true;
+if (!card.hasAttribute('data-crawler-seen') || card.innerText.slice(0, 300) !== oldText) return true;
+return oldPage !== null && current !== null && current.innerText !== oldPage;
+"""
+
+
+def _review_list_snapshot(driver):
+    return driver.execute_script(_SNAPSHOT_JS)
+
+
+def _wait_review_list_changed(driver, snapshot, timeout: float) -> bool:
+    """True nếu danh sách review đã đổi so với snapshot trong `timeout` giây"""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: d.execute_script(_CHANGED_JS, *snapshot)
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
 # =============================================================================
 # FILTERS: Language + Sorter
 # =============================================================================
 
+def _select_and_wait(driver, select_element, value: str) -> bool:
+    """Chọn option rồi chờ danh sách review tải lại. False nếu option đã được chọn sẵn"""
+    select = Select(select_element)
+    if select.first_selected_option.get_attribute("value") == value:
+        return False
+    snapshot = _review_list_snapshot(driver)
+    select.select_by_value(value)
+    if not _wait_review_list_changed(driver, snapshot, REVIEW_FILTER_TIMEOUT):
+        logging.info(f"Danh sách review không đổi sau {REVIEW_FILTER_TIMEOUT}s (có thể không có review phù hợp)")
+    return True
+
+
 def _select_review_language(driver) -> None:
     """Select Vietnamese reviews (value = 'vi')"""
     try:
         dropdown = WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "select[data-testid='languages']"))
         )
-        Select(dropdown).select_by_value(SELECT_LANGUAGE)
-        time.sleep(2)
+        _select_and_wait(driver, dropdown, SELECT_LANGUAGE)
         logging.info(f"Đã chọn ngôn ngữ đánh giá: {SELECT_LANGUAGE.upper()}")
     except Exception as e:
         logging.warning(f"Không thể chọn ngôn ngữ đánh giá: {e}")
@@ -96,8 +193,7 @@ def _select_newest_first(driver) -> None:
         sorter = WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.ID, "reviewListSorters"))
         )
-        Select(sorter).select_by_value("NEWEST_FIRST")
-        time.sleep(2)
+        _select_and_wait(driver, sorter, REVIEW_SORT)
         logging.info("Đã sắp xếp theo 'Mới nhất'")
     except Exception as e:
         logging.warning(f"Không thể thay đổi bộ lọc sắp xếp: {e}")
@@ -115,6 +211,14 @@ def apply_review_filters(driver) -> None:
 
 def extract_reviews_from_page(soup: BeautifulSoup) -> List[Dict]:
     """Extract all review cards from current page source"""
+    return extract_review_page(soup)[0]
+
+
+def extract_review_page(soup: BeautifulSoup) -> Tuple[List[Dict], int]:
+    """
+    (reviews, số review-card trong trang). Card parse lỗi bị bỏ khỏi reviews nhưng vẫn được đếm
+    → phân trang theo số card, không lệch offset / dừng sớm vì một card hỏng.
+    """
     reviews = []
     cards = soup.find_all("div", {"data-testid": "review-card"})
 
@@ -123,7 +227,7 @@ def extract_reviews_from_page(soup: BeautifulSoup) -> List[Dict]:
         if review:
             reviews.append(review)
 
-    return reviews
+    return reviews, len(cards)
 
 
 def _extract_single_review(card) -> Optional[Dict]:
@@ -198,18 +302,22 @@ def _click_next_page(driver) -> bool:
         )
 
         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_btn)
-        time.sleep(0.8)
 
         if not next_btn.is_enabled():
             logging.info("Nút 'Trang sau' bị disable → hết trang")
             return False
 
-        try:
-            next_btn.click()
-        except ElementNotInteractableException:
-            driver.execute_script("arguments[0].click();", next_btn)
-
-        time.sleep(2)
+        snapshot = _review_list_snapshot(driver)
+        throttle()
+        with timed("review_page_load"):
+            try:
+                next_btn.click()
+            except ElementNotInteractableException:
+                driver.execute_script("arguments[0].click();", next_btn)
+
+            changed = _wait_review_list_changed(driver, snapshot, REVIEW_PAGE_TIMEOUT)
+        if not changed:
+            logging.warning(f"Trang review không đổi sau {REVIEW_PAGE_TIMEOUT}s → vẫn đọc trang hiện tại")
         return True
 
     except TimeoutException:
@@ -221,42 +329,129 @@ def _click_next_page(driver) -> bool:
 # MAIN CRAWL FUNCTION
 # =============================================================================
 
+# Danh sách review đã render: có review-card, hoặc khối "chưa có đánh giá" của Booking
+_REVIEW_LIST_READY_CSS = (
+    "div[data-testid='review-card'], [data-testid='reviews-empty-state'], [data-testid='review-list-empty']"
+)
+
+
+def _wait_review_list_ready(driver) -> bool:
+    """Chờ danh sách review render xong (trước mọi snapshot / parse). False nếu hết REVIEW_PAGE_TIMEOUT"""
+    try:
+        WebDriverWait(driver, REVIEW_PAGE_TIMEOUT, poll_frequency=0.1).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, _REVIEW_LIST_READY_CSS))
+        )
+        return True
+    except TimeoutException:
+        logging.info(f"Không thấy review-card sau {REVIEW_PAGE_TIMEOUT}s (có thể khách sạn chưa có đánh giá)")
+        return False
+
+
+def open_reviews_tab(driver, base_url: str) -> Optional[str]:
+    """Mở tab đánh giá, lấy tên khách sạn và áp dụng bộ lọc (ngôn ngữ + mới nhất)"""
+    with timed("review_tab"):
+        driver.get(f"{base_url}#tab-reviews")
+        # Thay cho sleep cố định: snapshot của bộ lọc / trang 1 chỉ có nghĩa khi danh sách đã có card
+        _wait_review_list_ready(driver)
+
+        hotel_name = extract_hotel_name_dynamic(driver)
+        apply_review_filters(driver)
+    return hotel_name
+
+
+def _resume_over_http(driver, base_url: str, checkpoint, max_pages: Optional[int] = None,
+                      seen: Optional[Set[Tuple]] = None, stop_event=None) -> bool:
+    """
+    Tiếp tục checkpoint bằng fragment reviewlist từ checkpoint.offset (cookie của trình duyệt)
+    thay vì bấm "Trang sau" checkpoint.page lần. False nếu HTTP lỗi → quay về bấm (_skip_pages);
+    các trang đã tải qua HTTP vẫn nằm trong checkpoint nên lần bấm chỉ đi tiếp từ đó.
+    """
+    import requests
+    from utils.review_http import ReviewHttpFetcher  # Import muộn: review_http import module này
+
+    fetcher = ReviewHttpFetcher()
+    try:
+        fetcher.load_cookies_from_driver(driver)
+        logging.info(f"Tiếp tục checkpoint qua HTTP từ offset {checkpoint.offset} (trang {checkpoint.page})")
+        fetcher.crawl_from_offset(base_url, checkpoint.offset, max_pages, start_page=checkpoint.page,
+                                  seen=seen, checkpoint=checkpoint, stop_event=stop_event)
+        return True
+    except requests.RequestException as e:
+        logging.warning(f"[HTTP] Không tiếp tục được qua reviewlist ({e}) → bấm 'Trang sau'")
+        return False
+    finally:
+        fetcher.close()
+
+
+def _skip_pages(driver, pages: int) -> int:
+    """
+    Selenium không nhảy thẳng tới trang N được → bấm "Trang sau" N lần, không parse / archive.
+    Chỉ dùng khi _resume_over_http thất bại.
+    Trả về số trang đã bỏ qua (ít hơn N nếu danh sách review giờ ngắn hơn).
+    """
+    for skipped in range(pages):
+        if not _click_next_page(driver):
+            return skipped
+    if pages:
+        logging.info(f"Đã bỏ qua {pages} trang có trong checkpoint")
+    return pages
+
+
 def crawl_all_reviews(
     driver,
     base_url: str,
     province: str,
-    max_pages: Optional[int] = None
+    max_pages: Optional[int] = None,
+    seen: Optional[Set[Tuple]] = None,
+    checkpoint=None,
+    stop_event=None,
 ) -> Tuple[Optional[str], List[Dict]]:
     """
     Main function: crawl all Vietnamese newest reviews of a hotel.
+    seen: fingerprint các review đã lưu → dừng ở trang đầu tiên toàn review cũ (incremental).
+    checkpoint: ReviewCheckpoint (đã load) → tải tiếp từ offset đã lưu qua HTTP, giữ review đã thu thập.
+    Timeout / lỗi / stop_event giữa chừng → ghi checkpoint trước khi raise.
     Returns (hotel_name, list_of_reviews)
     """
-    all_reviews = []
-    driver.get(f"{base_url}#tab-reviews")
-    time.sleep(3)
+    if checkpoint is None:
+        from utils.review_checkpoint import ReviewCheckpoint
+        checkpoint = ReviewCheckpoint(province, base_url, every=0)
+    hotel_name = open_reviews_tab(driver, base_url)
 
-    hotel_name = extract_hotel_name_dynamic(driver)
-    apply_review_filters(driver)
-
-    page_count = 0
-    while True:
-        page_count += 1
-        logging.info(f"Đang crawl trang {page_count}...")
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        page_reviews = extract_reviews_from_page(soup)
-        all_reviews.extend(page_reviews)
-        logging.info(f"Trang {page_count}: {len(page_reviews)} reviews → Tổng: {len(all_reviews)}")
-
-        if max_pages and page_count >= max_pages:
-            logging.info(f"Đã đạt giới hạn max_pages = {max_pages}")
-            break
-
-        if not _click_next_page(driver):
-            break
-
-        # Optional: small break to be gentle
-        time.sleep(1)
-
-    logging.info(f"HOÀN TẤT! Tổng cộng thu thập được {len(all_reviews)} đánh giá.")
-    return hotel_name, all_reviews
\ No newline at end of file
+    try:
+        if checkpoint.page and _resume_over_http(driver, base_url, checkpoint, max_pages, seen, stop_event):
+            logging.info(f"HOÀN TẤT! Tổng cộng thu thập được {len(checkpoint.reviews)} đánh giá.")
+            return hotel_name, checkpoint.reviews
+        page_count = _skip_pages(driver, checkpoint.page)
+        checkpoint.page = page_count
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                raise ReviewCrawlInterrupted(f"Dừng ở trang {page_count}: {base_url}")
+            page_count += 1
+            logging.info(f"Đang crawl trang {page_count}...")
+
+            with timed("review_parse"):
+                html = driver.page_source
+                archive_page(KIND_REVIEWS, base_url, html, hotel_url=base_url, page=page_count)
+                soup = make_soup(html)
+                page_reviews, cards = extract_review_page(soup)
+                page_reviews, page_all_seen = split_new_reviews(page_reviews, seen)
+            page_reviews = checkpoint.add_page(page_reviews, consumed=cards)  # offset theo card → tiếp tục được qua HTTP
+            logging.info(f"Trang {page_count}: {len(page_reviews)} reviews → Tổng: {len(checkpoint.reviews)}")
+
+            if page_all_seen:
+                logging.info("Trang toàn review đã lưu → dừng (incremental)")
+                break
+
+            if max_pages and page_count >= max_pages:
+                logging.info(f"Đã đạt giới hạn max_pages = {max_pages}")
+                break
+
+            if not _click_next_page(driver):
+                break
+    except Exception:
+        checkpoint.save()
+        raise
+
+    logging.info(f"HOÀN TẤT! Tổng cộng thu thập được {len(checkpoint.reviews)} đánh giá.")
+    return hotel_name, checkpoint.reviews
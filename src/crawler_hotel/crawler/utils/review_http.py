@@ -0,0 +1,207 @@
+# review_http.py
+# Backend lấy review qua HTTP thuần: trình duyệt chỉ dùng cho trang 1 + lấy cookie,
+# các trang sau tải fragment reviewlist bằng requests.Session (pool kết nối) rồi
+# đưa vào extract_reviews_from_page như luồng Selenium.
+
+import logging
+import os
+import re
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Optional, Set, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.settings import (
+    REVIEW_LIST_URL, REVIEW_LIST_PARAMS, REVIEW_HTTP_ROWS,
+    REVIEW_HTTP_TIMEOUT, REVIEW_HTTP_POOL_SIZE, USER_AGENT,
+)
+from utils.html_parser import make_soup
+from core.html_archive import archive_page, KIND_REVIEWS
+from utils.rate_limiter import throttle, report_throttled, report_ok, is_blocked_response
+from utils.telemetry import timed
+from utils.review_extractor import (
+    open_reviews_tab, extract_review_page, crawl_all_reviews, split_new_reviews, ReviewCrawlInterrupted,
+)
+from utils.review_checkpoint import ReviewCheckpoint, BACKEND_HTTP, BACKEND_SELENIUM
+
+
+def hotel_pagename(hotel_url: str) -> str:
+    """'https://www.booking.com/hotel/vn/abc-xyz.html?lang=vi' → 'abc-xyz'"""
+    path = hotel_url.split("?")[0].split("#")[0]
+    return re.sub(r"\.[\w-]*\.?html$|\.html$", "", path.rstrip("/").split("/")[-1])
+
+
+class ReviewHttpFetcher:
+    """Tải các trang reviewlist qua HTTP, dùng lại cookie của phiên Selenium"""
+
+    def __init__(self, list_url: str = REVIEW_LIST_URL, rows: int = REVIEW_HTTP_ROWS,
+                 timeout: float = REVIEW_HTTP_TIMEOUT, pool_size: int = REVIEW_HTTP_POOL_SIZE):
+        self.list_url = list_url
+        self.rows = rows
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "vi-VN,vi;q=0.9"})
+
+    def load_cookies_from_driver(self, driver) -> int:
+        """Copy cookie của driver vào session. Trả về số cookie đã copy"""
+        cookies = driver.get_cookies()
+        for c in cookies:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+        return len(cookies)
+
+    def fetch_page(self, hotel_url: str, offset: int) -> str:
+        params = dict(REVIEW_LIST_PARAMS)
+        params.update({"pagename": hotel_pagename(hotel_url), "offset": offset, "rows": self.rows})
+        throttle()
+        try:
+            with timed("review_page_http"):
+                resp = self.session.get(self.list_url, params=params, timeout=self.timeout)
+        except requests.Timeout:
+            report_throttled("HTTP timeout")
+            raise
+        if is_blocked_response(resp.status_code, resp.text):
+            report_throttled(f"HTTP {resp.status_code}")
+        else:
+            report_ok()
+        resp.raise_for_status()
+        archive_page(KIND_REVIEWS, resp.url, resp.text, hotel_url=hotel_url, page=offset // self.rows + 1)
+        return resp.text
+
+    def fetch_review_page(self, hotel_url: str, offset: int) -> Tuple[List[Dict], int]:
+        """(reviews, số review-card trong fragment)"""
+        return extract_review_page(make_soup(self.fetch_page(hotel_url, offset)))
+
+    def crawl_from_offset(self, hotel_url: str, offset: int, max_pages: Optional[int] = None,
+                          start_page: int = 1, seen: Optional[Set[Tuple]] = None,
+                          checkpoint: Optional[ReviewCheckpoint] = None, stop_event=None) -> List[Dict]:
+        """
+        Tải tuần tự từ offset (mỗi trang tiến `rows`) cho tới khi một fragment không còn review-card nào,
+        hoặc (khi có `seen`) một trang chỉ toàn review đã lưu.
+        checkpoint: ghi nhận từng trang (review + offset) để có thể tiếp tục nếu bị ngắt.
+        """
+        reviews = []
+        page_count = start_page
+        while True:
+            if max_pages and page_count >= max_pages:
+                logging.info(f"Đã đạt giới hạn max_pages = {max_pages}")
+                break
+            if stop_event is not None and stop_event.is_set():
+                raise ReviewCrawlInterrupted(f"Dừng ở offset {offset}: {hotel_url}")
+            page_count += 1
+            page_reviews, cards = self.fetch_review_page(hotel_url, offset)
+            if not cards:
+                break
+            offset += self.rows
+            fresh, page_all_seen = split_new_reviews(page_reviews, seen)
+            if checkpoint is not None:
+                fresh = checkpoint.add_page(fresh, consumed=self.rows)
+            reviews.extend(fresh)
+            logging.info(f"[HTTP] Trang {page_count}: {len(fresh)} reviews → Offset: {offset}")
+            if page_all_seen:
+                logging.info("[HTTP] Trang toàn review đã lưu → dừng (incremental)")
+                break
+        return reviews
+
+    def close(self):
+        self.session.close()
+
+
+def crawl_all_reviews_http(
+    driver,
+    base_url: str,
+    province: str,
+    max_pages: Optional[int] = None,
+    fetcher: Optional[ReviewHttpFetcher] = None,
+    seen: Optional[Set[Tuple]] = None,
+    checkpoint: Optional[ReviewCheckpoint] = None,
+    stop_event=None,
+) -> Tuple[Optional[str], List[Dict]]:
+    """
+    Giống crawl_all_reviews nhưng chỉ trang 1 đi qua trình duyệt.
+    checkpoint đã có trang → bỏ qua trang 1, tải tiếp thẳng từ offset đã lưu.
+    Nếu HTTP lỗi giữa chừng → quay lại crawl bằng Selenium để không lưu thiếu review.
+    """
+    own_fetcher = fetcher is None
+    fetcher = fetcher or ReviewHttpFetcher()
+    checkpoint = checkpoint or ReviewCheckpoint(province, base_url, BACKEND_HTTP, every=0)
+    try:
+        hotel_name = open_reviews_tab(driver, base_url)
+        if checkpoint.page == 0:
+            html = driver.page_source
+            archive_page(KIND_REVIEWS, base_url, html, hotel_url=base_url, page=1)
+            first_page, first_cards = extract_review_page(make_soup(html))
+            fresh, page_all_seen = split_new_reviews(first_page, seen)
+            fresh = checkpoint.add_page(fresh, consumed=first_cards)
+            logging.info(f"Trang 1: {len(fresh)} reviews (trình duyệt)")
+            if not first_cards or page_all_seen or (max_pages and max_pages <= 1):
+                return hotel_name, checkpoint.reviews
+
+        fetcher.load_cookies_from_driver(driver)
+        try:
+            fetcher.crawl_from_offset(base_url, checkpoint.offset, max_pages, start_page=checkpoint.page,
+                                      seen=seen, checkpoint=checkpoint, stop_event=stop_event)
+        except requests.RequestException as e:
+            logging.warning(f"[HTTP] Lỗi tải reviewlist ({e}) → chuyển sang Selenium")
+            checkpoint.switch_backend(BACKEND_SELENIUM)
+            return crawl_all_reviews(driver, base_url, province, max_pages, seen=seen,
+                                     checkpoint=checkpoint, stop_event=stop_event)
+        except Exception:
+            checkpoint.save()
+            raise
+
+        logging.info(f"HOÀN TẤT! Tổng cộng thu thập được {len(checkpoint.reviews)} đánh giá.")
+        return hotel_name, checkpoint.reviews
+    finally:
+        if own_fetcher:
+            fetcher.close()
+
+
+# =============================================================================
+# SERVER GIẢ LẬP (test local bằng fragment đã ghi lại)
+# =============================================================================
+
+def serve_recorded_fragments(fixture_dir: str, port: int = 8765) -> HTTPServer:
+    """
+    Server local thay cho booking.com/reviewlist: trả file '{pagename}_{offset}.html' trong fixture_dir,
+    không có file → fragment rỗng (0 review, kết thúc phân trang).
+    Dùng: đặt REVIEW_LIST_URL = "http://127.0.0.1:8765/reviewlist.vi.html" rồi gọi server.serve_forever().
+    """
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            pagename = query.get("pagename", [""])[0]
+            offset = query.get("offset", ["0"])[0]
+            path = os.path.join(fixture_dir, f"{pagename}_{offset}.html")
+            body = b""
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return HTTPServer(("127.0.0.1", port), _Handler)
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    fixture_dir = sys.argv[1] if len(sys.argv) > 1 else "fixtures/reviewlist"
+    server = serve_recorded_fragments(fixture_dir)
+    logging.info(f"Phục vụ fragment từ {fixture_dir} tại http://127.0.0.1:{server.server_port}/reviewlist.vi.html")
+    server.serve_forever()
@@ -0,0 +1,264 @@
+# utils/telemetry.py
+# Đo thời gian từng giai đoạn crawl (histogram) + bộ đếm thông lượng, gộp qua mọi worker process.
+# - Mỗi process giữ Metrics riêng trong RAM, định kỳ (TELEMETRY_FLUSH_SECONDS) ghi snapshot
+#   <TELEMETRY_DIR>/<run_id>/worker-<host>-<pid>.json (ghi đè, nguyên tử) → không cần Manager / initializer.
+# - Process chính gộp các snapshot thành metrics.json + metrics.prom (định dạng text của Prometheus),
+#   và (nếu TELEMETRY_HTTP_PORT) phục vụ /metrics, /metrics.json trên localhost.
+#
+# Dùng:  with timed("page_load"): driver.get(url)      incr("hotels_ok")      observe("parse", seconds)
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from multiprocessing.util import Finalize
+
+from config.settings import TELEMETRY, TELEMETRY_DIR, TELEMETRY_FLUSH_SECONDS, TELEMETRY_HTTP_PORT
+
+# Cận trên (giây) của các bucket histogram; bucket cuối là +Inf
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RUN_ID_ENV = "CRAWL_TELEMETRY_RUN"  # Process con (spawn) kế thừa os.environ → ghi cùng thư mục run
+
+
+def _empty_histogram():
+    return {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(BUCKETS) + 1)}
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}  # stage → {"count", "sum", "max", "buckets"}
+        self.counters = {}
+        self.started = time.time()
+        self.lock = threading.Lock()  # Async engine parse trong thread pool
+
+    def observe(self, stage, seconds):
+        index = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+        with self.lock:
+            hist = self.histograms.setdefault(stage, _empty_histogram())
+            hist["count"] += 1
+            hist["sum"] += seconds
+            hist["max"] = max(hist["max"], seconds)
+            hist["buckets"][index] += 1
+
+    def incr(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "pid": os.getpid(), "host": socket.gethostname(),
+                "started": self.started, "updated": time.time(),
+                "histograms": json.loads(json.dumps(self.histograms)),
+                "counters": dict(self.counters),
+            }
+
+
+# =============================================================================
+# API TRONG WORKER
+# =============================================================================
+
+_metrics = None
+_metrics_pid = None
+_last_flush = time.time()
+
+
+def get_metrics():
+    """Metrics của process HIỆN TẠI – process fork ra không kế thừa số liệu của process cha"""
+    global _metrics, _metrics_pid
+    if _metrics_pid != os.getpid():
+        _metrics, _metrics_pid = Metrics(), os.getpid()
+        # Worker của ProcessPoolExecutor không chạy atexit → Finalize của multiprocessing (đăng ký trong chính worker)
+        Finalize(_metrics, flush, exitpriority=10)
+    return _metrics
+
+
+def run_dir():
+    return os.path.join(TELEMETRY_DIR, os.environ.get(RUN_ID_ENV, "default"))
+
+
+def observe(stage, seconds):
+    if TELEMETRY:
+        get_metrics().observe(stage, seconds)
+        _maybe_flush()
+
+
+def incr(name, n=1):
+    if TELEMETRY:
+        get_metrics().incr(name, n)
+        _maybe_flush()
+
+
+@contextmanager
+def timed(stage):
+    """Đo cả khi khối bên trong raise (timeout vẫn là dữ liệu hữu ích)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def _maybe_flush():
+    if time.time() - _last_flush >= TELEMETRY_FLUSH_SECONDS:
+        flush()
+
+
+def flush():
+    """Ghi snapshot của process hiện tại (ghi đè file cũ của chính nó)"""
+    global _last_flush
+    _last_flush = time.time()
+    metrics = _metrics if _metrics_pid == os.getpid() else None
+    if not TELEMETRY or metrics is None or not (metrics.histograms or metrics.counters):
+        return
+    directory = run_dir()
+    path = os.path.join(directory, f"worker-{socket.gethostname()}-{os.getpid()}.json")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(metrics.snapshot(), f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logging.warning(f"[TELEMETRY] Không ghi được {path}: {e}")
+
+
+# =============================================================================
+# GỘP + XUẤT (process chính)
+# =============================================================================
+
+def aggregate(directory=None):
+    """Gộp mọi snapshot worker của một run → {"workers", "elapsed", "histograms", "counters", "rates"}"""
+    directory = directory or run_dir()
+    histograms, counters = {}, {}
+    workers, started = 0, None
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith("worker-") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                    snap = json.load(f)
+            except (OSError, ValueError):
+                continue
+            workers += 1
+            started = snap["started"] if started is None else min(started, snap["started"])
+            for key, value in snap["counters"].items():
+                counters[key] = counters.get(key, 0) + value
+            for stage, hist in snap["histograms"].items():
+                total = histograms.setdefault(stage, _empty_histogram())
+                total["count"] += hist["count"]
+                total["sum"] += hist["sum"]
+                total["max"] = max(total["max"], hist["max"])
+                total["buckets"] = [a + b for a, b in zip(total["buckets"], hist["buckets"])]
+
+    elapsed = time.time() - started if started else 0.0
+    for hist in histograms.values():
+        hist["avg"] = hist["sum"] / hist["count"] if hist["count"] else 0.0
+        hist["p50"] = _quantile(hist, 0.5)
+        hist["p95"] = _quantile(hist, 0.95)
+    rates = {f"{key}_per_min": value * 60 / elapsed for key, value in counters.items()} if elapsed else {}
+    return {"workers": workers, "elapsed": elapsed, "histograms": histograms, "counters": counters, "rates": rates}
+
+
+def _quantile(hist, q):
+    """Ước lượng quantile = cận trên của bucket chứa nó (bucket +Inf → max)"""
+    target = q * hist["count"]
+    seen = 0
+    for bound, n in zip(list(BUCKETS) + [None], hist["buckets"]):
+        seen += n
+        if n and seen >= target:
+            return bound if bound is not None else hist["max"]
+    return 0.0
+
+
+def to_prometheus(report):
+    lines = []
+    for name, value in sorted(report["counters"].items()):
+        lines += [f"# TYPE crawler_{name}_total counter", f"crawler_{name}_total {value}"]
+    lines.append("# TYPE crawler_stage_seconds histogram")
+    for stage, hist in sorted(report["histograms"].items()):
+        cumulative = 0
+        for bound, n in zip(list(BUCKETS) + ["+Inf"], hist["buckets"]):
+            cumulative += n
+            lines.append(f'crawler_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'crawler_stage_seconds_sum{{stage="{stage}"}} {hist["sum"]:.6f}')
+        lines.append(f'crawler_stage_seconds_count{{stage="{stage}"}} {hist["count"]}')
+    lines.append(f"crawler_workers {report['workers']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(directory=None):
+    """metrics.json + metrics.prom trong thư mục run. Trả về report"""
+    flush()  # Gồm cả số liệu của process chính (async engine / pool chạy trong process chính)
+    directory = directory or run_dir()
+    report = aggregate(directory)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "metrics.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(directory, "metrics.prom"), "w", encoding="utf-8") as f:
+        f.write(to_prometheus(report))
+    return report
+
+
+def log_report(report, logger=None):
+    logger = logger or logging.getLogger("Telemetry")
+    logger.info(f"[TELEMETRY] {report['workers']} worker | {report['elapsed'] / 60:.1f} phút | {report['counters']}")
+    for stage, hist in sorted(report["histograms"].items(), key=lambda item: -item[1]["sum"]):
+        logger.info(
+            f"[TELEMETRY] {stage:<16} n={hist['count']:<7} tổng={hist['sum']:9.1f}s avg={hist['avg']:6.2f}s "
+            f"p50≤{hist['p50']}s p95≤{hist['p95']}s max={hist['max']:.1f}s"
+        )
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        report = aggregate()
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(report, ensure_ascii=False).encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = to_prometheus(report).encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port=TELEMETRY_HTTP_PORT):
+    """HTTP /metrics (Prometheus) + /metrics.json trên 127.0.0.1, chạy trong thread daemon"""
+    server = HTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"[TELEMETRY] http://127.0.0.1:{port}/metrics")
+    return server
+
+
+def start_run():
+    """Gọi ở process chính TRƯỚC khi tạo pool: đặt run id cho mọi worker, mở endpoint nếu cấu hình"""
+    if not TELEMETRY:
+        return None
+    os.environ[RUN_ID_ENV] = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if TELEMETRY_HTTP_PORT:
+        try:
+            serve_metrics(TELEMETRY_HTTP_PORT)
+        except OSError as e:
+            logging.warning(f"[TELEMETRY] Không mở được cổng {TELEMETRY_HTTP_PORT}: {e}")
+    return run_dir()
+
+
+def finish_run():
+    if not TELEMETRY:
+        return None
+    report = write_report()
+    log_report(report)
+    return report
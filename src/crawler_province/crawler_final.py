@@ -4,11 +4,73 @@ from selenium.webdriver.edge.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
+import requests
 import logging
+import json
 import os
+import queue
+import re
+import threading
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+# Parser HTML: lxml (C) nhanh hơn nhiều so với html.parser, không có thì fallback
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# === THU LINK TĂNG DẦN ===
+# Chỉ đọc các card kết quả MỚI được nối vào trang: card đã đọc được đánh dấu data-harvested,
+# nên mỗi vòng scroll chỉ tốn công cho batch vừa tải thay vì parse lại toàn bộ page_source.
+HARVEST_NEW_CARDS_JS = """
+const out = [];
+document.querySelectorAll('h3.a97d37cded:not([data-harvested])').forEach(h3 => {
+    h3.setAttribute('data-harvested', '1');
+    const a = h3.querySelector('a.bd77474a8e');
+    if (!a || !a.getAttribute('href')) return;
+    const card = h3.closest('[data-testid="property-card"]');
+    const score = card ? card.querySelector('[data-testid="review-score"]') : null;
+    out.push([a.getAttribute('href'), score ? score.textContent : '']);
+});
+return out;
+"""
+
+
+def clean_link(href):
+    """Bỏ query string, tránh dư https://www.booking.com"""
+    href = href.split("?")[0]
+    if href.startswith("http"):
+        return href
+    return "https://www.booking.com" + href if href.startswith("/") else "https://www.booking.com/" + href
+
+
+def parse_review_count(text):
+    """'Scored 8.6 ... 1,234 reviews' → 1234 (None nếu card chưa có đánh giá)"""
+    match = re.search(r'([\d,.]+)\s+(?:reviews?|đánh giá)', text or "")
+    return int(re.sub(r'[.,]', '', match.group(1))) if match else None
+
+
+def parse_max_properties(h1_text):
+    """Hỗ trợ cả "1,133 properties found" và "209 properties found" """
+    match = re.search(r'([\d,]+)\s+properties?\s+found', h1_text or "", re.IGNORECASE)
+    return int(match.group(1).replace(',', '')) if match else None  # Loại bỏ dấu phẩy
+
+
+def harvest_new_links(driver, hotel_links, review_counts):
+    """Thêm link của các card mới vào hotel_links / review_counts. Trả về số link mới"""
+    before = len(hotel_links)
+    for href, score_text in driver.execute_script(HARVEST_NEW_CARDS_JS) or []:
+        url = clean_link(href)
+        hotel_links.add(url)
+        count = parse_review_count(score_text)
+        if count is not None:
+            review_counts[url] = count
+    return len(hotel_links) - before
 
 # === TẮT LOG ===
 logging.getLogger('selenium').setLevel(logging.CRITICAL + 1)
@@ -18,6 +80,32 @@ os.environ['WDM_LOG_LEVEL'] = '0'
 URLS_FILE = "provinces_2.txt"
 MAIN_FOLDER = "hotel_links_city"
 
+# === CHẠY SONG SONG ===
+DISCOVERY_WORKERS = 4     # Số driver Edge chạy song song trên danh sách tỉnh (1 = tuần tự như cũ)
+# Ngân sách RIÊNG của bước thu link, KHÔNG dùng utils/rate_limiter của crawler_hotel: script này chạy độc lập
+# (thư mục làm việc riêng, không có config/settings của crawler_hotel trên sys.path) và là một process khác,
+# nên không thể chung bucket Manager của pool crawl. Hai ngân sách CỘNG DỒN trên cùng IP:
+# chạy song song với crawl khách sạn → tổng ≈ RATE_LIMIT_RPS ở đây + RATE_LIMIT_RPS của crawler_hotel (+ PREFLIGHT_RPS
+# nếu bật preflight). Thông thường thu link chạy XONG rồi mới crawl khách sạn (crawl đọc hotel_links_city) → không cộng.
+# Nếu buộc phải chạy cùng lúc: hạ RATE_LIMIT_RPS của crawler_hotel đi đúng phần này.
+RATE_LIMIT_RPS = 0.5      # Ngân sách request/giây dùng chung cho MỌI driver (mở trang tìm kiếm, scroll, bấm "Load more")
+RATE_LIMIT_BURST = 2
+NEW_CARDS_TIMEOUT = 10    # Chờ tối đa N giây cho batch card mới sau khi bấm "Load more" (thay cho sleep cố định)
+SCROLL_CARDS_TIMEOUT = 3  # ... sau khi chỉ scroll xuống cuối trang
+
+# === CHIẾN LƯỢC THU LINK ===
+# "offset": tải thẳng từng trang kết quả (searchresults?...&offset=N) qua HTTP, song song, mỗi trang parse độc lập;
+#           trang đầu không có card nào (bị chặn / chỉ render bằng JS) → tự quay về "scroll"
+# "scroll": trình duyệt + scroll / bấm "Load more"
+DISCOVERY_STRATEGY = "offset"
+SEARCH_PAGE_WORKERS = 8   # Số trang offset tải đồng thời cho một tỉnh (vẫn qua rate_limiter chung)
+SEARCH_HTTP_TIMEOUT = 20
+SEARCH_PAGE_RETRIES = 2   # Trang offset lỗi trong lượt song song → thử lại tuần tự N lần; vẫn lỗi → quay về "scroll"
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
 if not os.path.exists(URLS_FILE):
     print(f"KHÔNG TÌM THẤY: {URLS_FILE}")
     input("Nhấn Enter để thoát...")
@@ -80,126 +168,241 @@ options.add_argument("--silent")
 options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
 options.add_experimental_option('useAutomationExtension', False)
 
-service = Service(log_path=os.devnull)
+LOAD_MORE_XPATH = "//button[.//span[contains(text(), 'Load more results') or contains(text(), 'Tải thêm kết quả')]]"
+CARD_COUNT_JS = "return document.querySelectorAll('h3.a97d37cded').length"
 
-# === XỬ LÝ TỪNG TỈNH ===
-for search_url, display_name, folder_name in urls_list:
-    print(f"\n{'='*60}")
-    print(f"ĐANG XỬ LÝ: {display_name.upper()}")
-    print(f"URL: {search_url}")
-    print(f"{'='*60}")
 
-    folder_path = os.path.join(MAIN_FOLDER, folder_name)
-    os.makedirs(folder_path, exist_ok=True)
-    
-    driver = webdriver.Edge(options=options, service=service)
-    wait = WebDriverWait(driver, 15)
-    
-    try:
-        # Bước 1: Mở trang
-        search_url = search_url + "&lang=en-us"
-        driver.get(search_url)
-        time.sleep(4)
+class RateLimiter:
+    """
+    Token bucket dùng chung cho mọi thread driver → tổng số request tới booking.com không tăng theo số driver.
+    Chỉ trong process này (thread), không giảm tốc / ngắt mạch như utils/rate_limiter.TokenBucket:
+    thu link ít request, trang offset lỗi đã có retry tuần tự + quay về scroll. Xem ghi chú ở RATE_LIMIT_RPS.
+    """
 
-        # Bước 2: Tắt popup
-        try:
-            close = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[aria-label='Dismiss sign-in info.']")))
-            close.click()
-            time.sleep(1)
-        except:
-            pass
-        
-        
-        # Bước 3: Load hết kết quả – NHƯNG KHÔNG VƯỢT QUÁ max_properties
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        load_more_clicked = 0
-        collected_links = 0
-                # === BƯỚC MỚI: LẤY SỐ LƯỢNG TỪ <h1> ===
-        max_properties = None
-        try:
-            h1 = wait.until(EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "h1[aria-live='assertive']")
-            ))
-            h1_text = h1.text.strip()
-            print(f"Tiêu đề tìm kiếm: {h1_text}")
-
-            # Trích xuất số: hỗ trợ cả "1,133 properties found" và "209 properties found"
-            import re
-            match = re.search(r'([\d,]+)\s+properties?\s+found', h1_text, re.IGNORECASE)
-            if match:
-                count_str = match.group(1).replace(',', '')  # Loại bỏ dấu phẩy
-                max_properties = int(count_str)
-                print(f"Số lượng tối đa: {max_properties}")
-            else:
-                print("Không tìm thấy số lượng trong tiêu đề.")
-                max_properties = None
+    def __init__(self, rps, burst):
+        self.rps = rps
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self.lock = threading.Lock()
 
-        except Exception as e:
-            print(f"Không đọc được <h1>: {e}")
-            max_properties = None
-            
+    def acquire(self):
         while True:
-            # Kiểm tra số link đã thu thập (từ soup tạm thời)
-            soup_temp = BeautifulSoup(driver.page_source, 'html.parser')
-            current_links = len([
-                h3.find("a", class_="bd77474a8e") for h3 in soup_temp.find_all("h3", class_="a97d37cded")
-                if h3.find("a", class_="bd77474a8e") and h3.find("a", class_="bd77474a8e").get("href")
-            ])
-
-            print(f"Đã thu thập tạm: {current_links} link", end="\r")
-
-            # DỪNG nếu đã đủ (hoặc vượt nhẹ do load batch)
-            if max_properties and current_links >= max_properties:
-                print(f"\nĐÃ ĐỦ {max_properties} → Dừng load more.")
-                break
+            with self.lock:
+                now = time.time()
+                self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rps)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rps
+            time.sleep(wait)
+
+
+rate_limiter = RateLimiter(RATE_LIMIT_RPS, RATE_LIMIT_BURST)
+save_lock = threading.Lock()  # Nhiều URL tìm kiếm có thể cùng ghi vào một file <tỉnh>_hotel_links.txt
+
+
+def create_driver():
+    return webdriver.Edge(options=options, service=Service(log_path=os.devnull))
+
+
+def wait_for_more_cards(driver, previous, timeout):
+    """Chờ tới khi số card kết quả vượt `previous`. Trả về True nếu có card mới"""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.3).until(
+            lambda d: d.execute_script(CARD_COUNT_JS) > previous
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def read_max_properties(driver, log):
+    """Số kết quả trong <h1>"""
+    try:
+        h1 = WebDriverWait(driver, 15).until(EC.presence_of_element_located(
+            (By.CSS_SELECTOR, "h1[aria-live='assertive']")
+        ))
+        h1_text = h1.text.strip()
+        log(f"Tiêu đề tìm kiếm: {h1_text}")
+        max_properties = parse_max_properties(h1_text)
+        if max_properties:
+            log(f"Số lượng tối đa: {max_properties}")
+            return max_properties
+        log("Không tìm thấy số lượng trong tiêu đề.")
+    except Exception as e:
+        log(f"Không đọc được <h1>: {e}")
+    return None
 
-            # Scroll xuống
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
-
-            # Click "Load more" nếu có
-            try:
-                load_btn = wait.until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[.//span[contains(text(), 'Load more results') or contains(text(), 'Tải thêm kết quả')]]"))
-                )
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", load_btn)
-                time.sleep(1)
-                driver.execute_script("arguments[0].click();", load_btn)
-                load_more_clicked += 1
-                print(f"\nĐã click 'Load more' ({load_more_clicked})")
-                time.sleep(3)
-            except:
-                # Không có nút → kiểm tra có thay đổi chiều cao không
-                current_height = driver.execute_script("return document.body.scrollHeight")
-                if current_height == last_height:
-                    print("\nKhông còn kết quả mới → Dừng.")
-                    break
-                last_height = current_height
-                time.sleep(1)
-
-        # Bước 4: LẤY CHỈ LINK SẠCH TỪ <h3 class="a97d37cded">
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        hotel_links = set()  # Dùng set để tránh trùng
-
-        for h3 in soup.find_all("h3", class_="a97d37cded"):
-            a_tag = h3.find("a", class_="bd77474a8e")
-            if not a_tag or not a_tag.get("href"):
-                continue
 
-            href = a_tag["href"].split("?")[0]  # Lấy phần trước dấu ?
+def harvest_province(driver, search_url, log):
+    """Mở trang tìm kiếm và load hết kết quả (không vượt quá max_properties). Trả về (hotel_links, review_counts)"""
+    # Bước 1: Mở trang
+    rate_limiter.acquire()
+    driver.get(search_url + "&lang=en-us")
 
-            # XỬ LÝ LINK SẠCH: tránh dư https://www.booking.com
-            if href.startswith("http"):
-                clean_url = href
-            else:
-                clean_url = "https://www.booking.com" + href if href.startswith("/") else "https://www.booking.com/" + href
+    # Bước 2: Lấy số lượng từ <h1> (cũng là tín hiệu trang đã tải xong)
+    max_properties = read_max_properties(driver, log)
 
-            hotel_links.add(clean_url)
+    # Bước 3: Tắt popup (nếu có)
+    try:
+        close = WebDriverWait(driver, 3).until(EC.element_to_be_clickable(
+            (By.CSS_SELECTOR, "button[aria-label='Dismiss sign-in info.']")
+        ))
+        close.click()
+    except Exception:
+        pass
+
+    # Bước 4: Load hết kết quả – chờ theo số card thay vì sleep cố định
+    hotel_links = set()  # Tập link chạy dần qua mọi vòng scroll (set → tự loại trùng)
+    review_counts = {}   # Số review trên card kết quả → crawler xếp lịch khách sạn lớn trước (utils/crawl_cost)
+    load_more_clicked = 0
+    while True:
+        # Chỉ đọc card mới nối thêm từ vòng trước
+        harvest_new_links(driver, hotel_links, review_counts)
+
+        # DỪNG nếu đã đủ (hoặc vượt nhẹ do load batch)
+        if max_properties and len(hotel_links) >= max_properties:
+            log(f"ĐÃ ĐỦ {max_properties} → Dừng load more.")
+            break
+
+        cards = driver.execute_script(CARD_COUNT_JS)
+        rate_limiter.acquire()  # Scroll xuống cuối trang làm Booking tải thêm kết quả = một request
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        if wait_for_more_cards(driver, cards, SCROLL_CARDS_TIMEOUT):
+            continue  # Trang tự tải thêm khi scroll
+
+        # Click "Load more" nếu có
+        buttons = driver.find_elements(By.XPATH, LOAD_MORE_XPATH)
+        if not buttons:
+            log("Không còn kết quả mới → Dừng.")
+            break
+        rate_limiter.acquire()
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", buttons[0])
+        driver.execute_script("arguments[0].click();", buttons[0])
+        load_more_clicked += 1
+        if not wait_for_more_cards(driver, cards, NEW_CARDS_TIMEOUT):
+            log(f"'Load more' ({load_more_clicked}) không trả thêm kết quả → Dừng.")
+            break
+        log(f"Đã click 'Load more' ({load_more_clicked}) → {len(hotel_links)} link")
+
+    # Card của batch cuối cùng
+    harvest_new_links(driver, hotel_links, review_counts)
+    return hotel_links, review_counts
+
+
+_http = threading.local()
+
+
+def http_session():
+    """Mỗi thread một requests.Session (Session không an toàn khi dùng chung giữa các thread)"""
+    if not hasattr(_http, "session"):
+        _http.session = requests.Session()
+        _http.session.headers.update(HTTP_HEADERS)
+    return _http.session
+
+
+def fetch_search_page(search_url, offset):
+    rate_limiter.acquire()
+    resp = http_session().get(f"{search_url}&lang=en-us&offset={offset}", timeout=SEARCH_HTTP_TIMEOUT)
+    resp.raise_for_status()
+    return resp.text
+
+
+def parse_search_page(html):
+    """Một trang kết quả → (links, review_counts, max_properties). Mỗi trang parse độc lập"""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    links, review_counts = [], {}
+    for a_tag in soup.select("h3.a97d37cded a.bd77474a8e[href]"):
+        url = clean_link(a_tag["href"])
+        links.append(url)
+        card = a_tag.find_parent(attrs={"data-testid": "property-card"})
+        score = card.find(attrs={"data-testid": "review-score"}) if card else None
+        count = parse_review_count(score.get_text(" ")) if score else None
+        if count is not None:
+            review_counts[url] = count
+    h1 = soup.select_one("h1[aria-live='assertive']") or soup.find("h1")
+    return links, review_counts, parse_max_properties(h1.get_text(" ", strip=True) if h1 else "")
+
+
+def harvest_province_offsets(search_url, log):
+    """
+    Trang offset=0 cho số kết quả + kích thước trang → tải mọi offset còn lại trong MỘT lượt song song,
+    offset lỗi được thử lại tuần tự (SEARCH_PAGE_RETRIES lần, vẫn qua rate_limiter).
+    Trả về (hotel_links, review_counts, complete); links rỗng nếu trang đầu không có card,
+    complete = False nếu còn offset không tải được → bên gọi quay về "scroll" thay vì lưu thiếu link.
+    """
+    first_links, review_counts, max_properties = parse_search_page(fetch_search_page(search_url, 0))
+    hotel_links = set(first_links)
+    if not first_links:
+        return hotel_links, review_counts, True
+    page_size = len(first_links)
+    log(f"Số lượng tối đa: {max_properties} | {page_size} kết quả / trang")
+
+    def fetch(offset):
+        try:
+            return offset, parse_search_page(fetch_search_page(search_url, offset))
+        except Exception as e:
+            return offset, e
 
-                # Bước 5: LƯU FILE – CHỈ GIỚI HẠN KHI CÀO, FILE TXT THÌ GIỮ HẾT MÃI MÃI
-        filename = f"{folder_name}_hotel_links.txt"
-        filepath = os.path.join(folder_path, filename)
+    def fetch_with_retry(offset):
+        """Thử lại tuần tự (sau lượt song song): rate_limiter giãn các lần thử"""
+        _, result = fetch(offset)
+        for attempt in range(1, SEARCH_PAGE_RETRIES + 1):
+            if not isinstance(result, Exception):
+                break
+            log(f"Thử lại offset={offset} ({attempt}/{SEARCH_PAGE_RETRIES}) sau lỗi: {result}")
+            _, result = fetch(offset)
+        return result
+
+    if max_properties:
+        offsets = list(range(page_size, max_properties, page_size))
+        failed = []
+        with ThreadPoolExecutor(max_workers=SEARCH_PAGE_WORKERS) as executor:
+            for offset, result in executor.map(fetch, offsets):
+                if isinstance(result, Exception):
+                    failed.append(offset)
+                    log(f"Lỗi trang offset={offset}: {result}")
+                    continue
+                hotel_links.update(result[0])
+                review_counts.update(result[1])
+        still_failed = []
+        for offset in failed:
+            result = fetch_with_retry(offset)
+            if isinstance(result, Exception):
+                still_failed.append(offset)
+                continue
+            hotel_links.update(result[0])
+            review_counts.update(result[1])
+        log(f"{len(offsets) + 1} trang offset → {len(hotel_links)} link"
+            + (f" | lỗi offset {still_failed} (đã thử lại {SEARCH_PAGE_RETRIES} lần)" if still_failed else ""))
+        return hotel_links, review_counts, not still_failed
+
+    # Không đọc được tổng số → tải tuần tự tới trang không còn link mới
+    offset = page_size
+    while True:
+        result = fetch_with_retry(offset)
+        if isinstance(result, Exception):
+            log(f"Lỗi offset={offset} sau {SEARCH_PAGE_RETRIES} lần thử lại: {result}")
+            return hotel_links, review_counts, False
+        if not set(result[0]) - hotel_links:
+            break
+        hotel_links.update(result[0])
+        review_counts.update(result[1])
+        offset += page_size
+    log(f"Tải tuần tự tới offset={offset} → {len(hotel_links)} link")
+    return hotel_links, review_counts, True
+
+
+def save_province_links(folder_name, hotel_links, review_counts, log):
+    """Gộp vào <tỉnh>_hotel_links.txt – CHỈ GIỚI HẠN KHI CÀO, FILE TXT THÌ GIỮ HẾT MÃI MÃI"""
+    folder_path = os.path.join(MAIN_FOLDER, folder_name)
+    os.makedirs(folder_path, exist_ok=True)
+    filepath = os.path.join(folder_path, f"{folder_name}_hotel_links.txt")
+    counts_path = os.path.join(folder_path, f"{folder_name}_review_counts.json")
 
+    with save_lock:
         # 1. Đọc toàn bộ link cũ (nếu có)
         old_links = set()
         if os.path.exists(filepath):
@@ -208,9 +411,9 @@ for search_url, display_name, folder_name in urls_list:
                     ln = line.strip()
                     if ln.startswith("http"):
                         old_links.add(ln)
-            print(f"Đã tìm thấy file cũ → {len(old_links)} link hiện có")
+            log(f"Đã tìm thấy file cũ → {len(old_links)} link hiện có")
         else:
-            print("Chưa có file cũ → tạo mới")
+            log("Chưa có file cũ → tạo mới")
 
         # 2. Thêm tất cả link mới thu thập được (loại trùng tự động)
         before = len(old_links)
@@ -219,24 +422,84 @@ for search_url, display_name, folder_name in urls_list:
 
         # 3. GHI LẠI TOÀN BỘ – KHÔNG BAO GIỜ CẮT, KHÔNG BAO GIỜ GIỚI HẠN
         final_links = sorted(old_links)  # sắp xếp lại cho đẹp (tùy chọn)
-
         with open(filepath, "w", encoding="utf-8") as f:
             for link in final_links:
                 f.write(link + "\n")
 
-        print(f"HOÀN TẤT! → Đã thêm {new_added} link mới")
-        print(f"Tổng cộng hiện tại: {len(final_links)} link (không giới hạn)")
-        print(f"File: {filepath}")
+        # 4. Số review theo link (gộp với lần chạy trước, số mới ghi đè)
+        if review_counts:
+            old_counts = {}
+            if os.path.exists(counts_path):
+                with open(counts_path, "r", encoding="utf-8") as f_old:
+                    old_counts = json.load(f_old)
+            old_counts.update(review_counts)
+            with open(counts_path, "w", encoding="utf-8") as f:
+                json.dump(old_counts, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    log(f"HOÀN TẤT! → Đã thêm {new_added} link mới | Tổng cộng: {len(final_links)} link | File: {filepath}")
+    if new_added == 0:
+        log("→ Không có link mới (đã cào hết từ trước hoặc Booking.com đang hiển thị ít hơn thực tế)")
+
+
+def discovery_worker(worker_index, task_queue):
+    """Một driver sống suốt cả lượt: lấy tỉnh tiếp theo từ hàng đợi chung cho tới khi hết"""
+    driver = None
+    done = 0
+    while True:
+        try:
+            search_url, display_name, folder_name = task_queue.get_nowait()
+        except queue.Empty:
+            break
 
-        if new_added == 0:
-            print("→ Không có link mới (đã cào hết từ trước hoặc Booking.com đang hiển thị ít hơn thực tế)")
-    except Exception as e:
-        print(f"LỖI KHI XỬ LÝ {display_name}: {e}")
-    finally:
+        def log(msg, prefix=f"[W{worker_index}] {display_name}"):
+            print(f"{prefix}: {msg}")
+
+        log(f"ĐANG XỬ LÝ → {search_url}")
+        try:
+            hotel_links, review_counts, complete = set(), {}, False
+            if DISCOVERY_STRATEGY == "offset":
+                try:
+                    hotel_links, review_counts, complete = harvest_province_offsets(search_url, log)
+                except requests.RequestException as e:
+                    log(f"Tải trang offset lỗi: {e}")
+                if not hotel_links:
+                    log("Trang offset không có kết quả → dùng trình duyệt (scroll)")
+                elif not complete:
+                    log("Còn trang offset không tải được → dùng trình duyệt (scroll) để không thiếu link")
+            if not hotel_links or not complete:
+                if driver is None:
+                    driver = create_driver()
+                scroll_links, scroll_counts = harvest_province(driver, search_url, log)
+                hotel_links |= scroll_links  # Giữ cả link đã lấy được qua offset
+                review_counts.update(scroll_counts)
+            save_province_links(folder_name, hotel_links, review_counts, log)
+            done += 1
+        except Exception as e:
+            log(f"LỖI KHI XỬ LÝ: {e}")
+            if driver is not None:  # Driver có thể đã hỏng → tạo lại cho tỉnh tiếp theo
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                driver = None
+
+    if driver is not None:
         driver.quit()
+    return done
+
+
+# === XỬ LÝ MỌI TỈNH (pool driver, hàng đợi chung) ===
+task_queue = queue.Queue()
+for item in urls_list:
+    task_queue.put(item)
+
+workers = max(1, min(DISCOVERY_WORKERS, len(urls_list)))
+print(f"{len(urls_list)} URL tìm kiếm | {workers} worker | {DISCOVERY_STRATEGY} | {RATE_LIMIT_RPS} req/s dùng chung")
+with ThreadPoolExecutor(max_workers=workers) as executor:
+    done = sum(executor.map(discovery_worker, range(workers), [task_queue] * workers))
 
 # === HOÀN TẤT ===
 print(f"\n{'='*60}")
-print("TẤT CẢ TỈNH ĐÃ XỬ LÝ XONG!")
+print(f"TẤT CẢ TỈNH ĐÃ XỬ LÝ XONG! ({done}/{len(urls_list)} thành công)")
 print(f"{'='*60}")
 input("Nhấn Enter để thoát...")
@@ -4,6 +4,9 @@ from typing import Dict
 
 # Thư mục data đầu vào
 BASE_FOLDER = r"D:\private\data"
+# Dataset Parquet do crawler ghi (crawler/config: PARQUET_DATASET_DIR, OUTPUT_FORMAT = "parquet" | "both").
+# Đặt đường dẫn → collect_master_stats đọc thẳng dataset, bỏ qua việc quét JSON trong BASE_FOLDER. None = đọc JSON
+PARQUET_DATASET_DIR = None
 # Thư mục data đầu ra
 DATA_DIR = r"D:\private\crawler-booking-2025\src\data_processing\data"
 
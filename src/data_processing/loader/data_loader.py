@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import Dict, List, Any
 import pandas as pd
 import logging
-from config.config import BASE_FOLDER, PROVINCE_MAPPING, EXPECTED_COLUMNS
+from config.config import BASE_FOLDER, PROVINCE_MAPPING, EXPECTED_COLUMNS, PARQUET_DATASET_DIR
 from utils.vietnamese_filter import is_vietnamese_improved
 from utils.normalize_stay import normalize_stay_duration
 import numpy as np
@@ -36,7 +36,12 @@ def _extract_province_from_path(file_path: Path, base_folder: Path) -> str:
     if len(relative.parts) < 2:
         return "Khác"
 
-    folder_name = relative.parts[0].lower()
+    return _normalize_province_name(relative.parts[0])
+
+
+def _normalize_province_name(folder_name: str) -> str:
+    """Tên thư mục tỉnh (vd "ha-noi") → tên chuẩn. Dùng chung cho JSON và partition Parquet."""
+    folder_name = folder_name.lower()
     key = folder_name.replace("_", "-")
 
     # Ưu tiên lấy từ mapping để có tên chuẩn (có dấu, đẹp)
@@ -189,26 +194,18 @@ def _process_single_review(
     records.append(record)
     return records
 
-def collect_master_stats(top_provinces: int = 15) -> Dict[str, Any]:
-    """
-    Hàm chính: Thu thập và xử lý toàn bộ dữ liệu review từ các file JSON trong thư mục.
+def _parse_hotel_avg(hotel_avg_raw: Any) -> float:
+    """Điểm trung bình khách sạn dạng "8,5" / 8.5 / None → float (0.0 nếu không parse được)."""
+    if isinstance(hotel_avg_raw, str):
+        hotel_avg_raw = hotel_avg_raw.replace(',', '.')
+    try:
+        return float(hotel_avg_raw)
+    except (ValueError, TypeError):
+        return 0.0  # hoặc None nếu bạn muốn
 
-    Đọc tất cả file JSON theo cấu trúc thư mục tỉnh → khách sạn → reviews,
-    xử lý từng review, chuẩn hóa dữ liệu và tổng hợp thống kê.
 
-    Args:
-        top_provinces: Số lượng tỉnh/thành phổ biến nhất để giữ nguyên tên,
-                       các tỉnh còn lại sẽ gộp vào "Khác" (mặc định 15).
-
-    Returns:
-        Dictionary chứa:
-            - df: DataFrame đầy đủ đã xử lý
-            - top_provinces: Danh sách tên các tỉnh top
-            - province_counts: Series đếm số lượng review theo tỉnh gốc
-            - total_reviews: Tổng số review
-            - vietnamese_ratio: Tỷ lệ review tiếng Việt
-    """
-    base_folder = Path(BASE_FOLDER)
+def _collect_records_from_json(base_folder: Path) -> List[Dict[str, Any]]:
+    """Quét toàn bộ file JSON (tỉnh → khách sạn) và trả về danh sách record review."""
     print(f"Đang đọc dữ liệu từ: {base_folder}")
 
     json_files = list(base_folder.rglob("*.json"))
@@ -223,16 +220,7 @@ def collect_master_stats(top_provinces: int = 15) -> Dict[str, Any]:
 
             province = _extract_province_from_path(fp, base_folder)
             hotel_name = data.get("name", "Không tên")
-
-            # Hotel rating
-            hotel_avg_raw = data.get("rating", "0")
-            hotel_avg = 0.0
-            if isinstance(hotel_avg_raw, str):
-                hotel_avg_raw = hotel_avg_raw.replace(',', '.')
-            try:
-                hotel_avg = float(hotel_avg_raw)
-            except (ValueError, TypeError):
-                hotel_avg = 0.0  # hoặc None nếu bạn muốn
+            hotel_avg = _parse_hotel_avg(data.get("rating", "0"))
 
             reviews = data.get("reviews", [])
             for rev in reviews:
@@ -242,6 +230,84 @@ def collect_master_stats(top_provinces: int = 15) -> Dict[str, Any]:
             print(f"Lỗi khi đọc {fp}: {e}")
             continue  # tiếp tục với file khác
 
+    return all_records
+
+
+def _collect_records_from_parquet(dataset_dir: Path) -> List[Dict[str, Any]]:
+    """
+    Đọc bảng reviews của dataset Parquet (partition province=/crawl_date=) do crawler ghi.
+
+    Cùng một review có thể xuất hiện ở nhiều lần crawl (crawl lại toàn bộ khách sạn)
+    → giữ bản mới nhất theo crawled_at trước khi chuẩn hóa bằng _process_single_review.
+    """
+    reviews_dir = dataset_dir / "reviews"
+    print(f"Đang đọc dataset Parquet: {reviews_dir}")
+
+    df = pd.read_parquet(reviews_dir)
+    print(f"Phát hiện {len(df):,} dòng review trong dataset\n")
+    if df.empty:
+        return []
+
+    df["province"] = df["province"].astype(str)
+    df = df.sort_values("crawled_at").drop_duplicates(
+        subset=["hotel_url", "reviewer_name", "date", "rating", "comment_positive", "comment_negative"],
+        keep="last",
+    )
+    df = df.astype(object).where(df.notna(), None)  # NaN → None như khi đọc JSON
+
+    all_records = []
+    for row in df.itertuples(index=False):
+        # Bỏ key None để _process_single_review dùng giá trị mặc định giống khi đọc JSON
+        reviewer = {"name": row.reviewer_name, "country": row.reviewer_country}
+        review_data = {
+            "reviewer": {k: v for k, v in reviewer.items() if v is not None},
+            "review": {
+                "date": row.date,
+                "rating": row.rating,
+                "score": row.score,
+                "room_type": row.room_type,
+                "stay_duration": row.stay_duration,
+                "group_type": row.group_type,
+                "comment_positive": row.comment_positive,
+                "comment_negative": row.comment_negative,
+            },
+        }
+        all_records.extend(_process_single_review(
+            review_data,
+            row.hotel_name or "Không tên",
+            _parse_hotel_avg(row.hotel_rating),
+            _normalize_province_name(row.province),
+        ))
+    return all_records
+
+
+def collect_master_stats(top_provinces: int = 15, parquet_dir: str | None = PARQUET_DATASET_DIR) -> Dict[str, Any]:
+    """
+    Hàm chính: Thu thập và xử lý toàn bộ dữ liệu review.
+
+    Nguồn dữ liệu:
+        - parquet_dir (mặc định config.PARQUET_DATASET_DIR): đọc thẳng dataset Parquet của crawler.
+        - Ngược lại: đọc tất cả file JSON theo cấu trúc thư mục tỉnh → khách sạn → reviews.
+    Sau đó xử lý từng review, chuẩn hóa dữ liệu và tổng hợp thống kê.
+
+    Args:
+        top_provinces: Số lượng tỉnh/thành phổ biến nhất để giữ nguyên tên,
+                       các tỉnh còn lại sẽ gộp vào "Khác" (mặc định 15).
+        parquet_dir: Thư mục gốc dataset Parquet (chứa reviews/), None = đọc JSON.
+
+    Returns:
+        Dictionary chứa:
+            - df: DataFrame đầy đủ đã xử lý
+            - top_provinces: Danh sách tên các tỉnh top
+            - province_counts: Series đếm số lượng review theo tỉnh gốc
+            - total_reviews: Tổng số review
+            - vietnamese_ratio: Tỷ lệ review tiếng Việt
+    """
+    if parquet_dir:
+        all_records = _collect_records_from_parquet(Path(parquet_dir))
+    else:
+        all_records = _collect_records_from_json(Path(BASE_FOLDER))
+
     if not all_records:
         print("Không có dữ liệu review nào!")
         return {"df": pd.DataFrame(), "top_provinces": [], "total_reviews": 0}